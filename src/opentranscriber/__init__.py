@@ -3,11 +3,12 @@ import os
 import sys
 
 
-def setup_logging(level=logging.INFO):
+def setup_logging(level=logging.INFO, stream=None):
     """
     Configures the root logger with a professional format.
+    Logs go to `stream`, stdout by default.
     """
-    handler = logging.StreamHandler(sys.stdout)
+    handler = logging.StreamHandler(stream or sys.stdout)
     formatter = logging.Formatter("[%(asctime)s] [%(levelname)s] %(name)s: %(message)s", datefmt="%Y-%m-%d %H:%M:%S")
     handler.setFormatter(formatter)
 
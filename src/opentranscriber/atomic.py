@@ -0,0 +1,29 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+
+@contextmanager
+def atomic_write(path, mode="w", suffix=".tmp", fsync=False):
+    """
+    Opens a temporary file next to `path` and moves it over `path` once the block
+    completes, so readers never see a partial file. On any error (or interrupt)
+    the temporary file is removed and `path` is left as it was. Text modes use
+    UTF-8; with `fsync`, the data reaches the disk before the rename.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=suffix)
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+            if fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
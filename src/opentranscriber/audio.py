@@ -0,0 +1,6 @@
+# Whisper's input format. These mirror the constants in `whisper.audio`, which
+# cannot be imported without importing whisper and torch as a whole.
+SAMPLE_RATE = 16000
+HOP_LENGTH = 160
+CHUNK_LENGTH = 30  # seconds per model window
+N_SAMPLES = CHUNK_LENGTH * SAMPLE_RATE
@@ -0,0 +1,209 @@
+import glob
+import logging
+import math
+import os
+import time
+from concurrent.futures import as_completed
+
+from opentranscriber import cli, pipeline, pool, streaming
+
+logger = logging.getLogger(__name__)
+
+
+def has_glob(pattern):
+    return glob.has_magic(pattern)
+
+
+def collect_inputs(patterns, manifest=None):
+    """
+    Expands paths, glob patterns and an optional manifest file into an ordered
+    list of media files without duplicates.
+    Manifest entries are one path or glob per line, relative to the manifest;
+    blank lines and lines starting with '#' are ignored.
+    """
+    entries = list(patterns)
+
+    if manifest:
+        base_dir = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest, encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    entries.append(os.path.join(base_dir, os.path.expanduser(line)))
+
+    files = []
+    seen = set()
+    for entry in entries:
+        if has_glob(entry):
+            matches = sorted(glob.glob(entry, recursive=True))
+            if not matches:
+                logger.warning(f"Pattern matched no files: {entry}")
+        else:
+            matches = [entry]
+
+        for path in matches:
+            key = os.path.abspath(path)
+            if key not in seen:
+                seen.add(key)
+                files.append(path)
+
+    return files
+
+
+def _run_job(file_path, model_type, output_format, options):
+    """
+    Transcribes one file with the worker's warm model.
+    Returns (audio_seconds, wall_seconds).
+    """
+    start = time.perf_counter()
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    result = cli.transcribe_media(file_path, model_type, output_format, **options)
+    return audio_seconds(file_path, result), time.perf_counter() - start
+
+
+def audio_seconds(file_path, result):
+    """
+    Duration of the input of `result`: the one recorded in the result, else (for
+    transcripts cached before durations were recorded) the one ffprobe reports.
+    """
+    if "duration" in result:
+        return result["duration"]
+    return streaming.probe_duration(file_path) or 0.0
+
+
+def _run_group(file_paths, model_type, output_format, options):
+    """
+    Transcribes a group of files with the worker's warm model: with a `prefetch`
+    option one after another through `pipeline.run_pipelined`, otherwise with
+    their windows sharing batched forward passes. Returns
+    [(file_path, audio_seconds, error)] and the wall time of the whole group.
+    """
+    start = time.perf_counter()
+    if options.get("prefetch"):
+        options = dict(options)
+        prefetch, max_mb = options.pop("prefetch"), options.pop("prefetch_mb", pipeline.DEFAULT_PREFETCH_MB)
+        options.pop("stream_window", None)
+        transcripts = pipeline.run_pipelined(
+            file_paths, model_type, output_format, prefetch=prefetch, max_mb=max_mb, **options
+        )
+    else:
+        transcripts = cli.transcribe_media_batched(file_paths, model_type, output_format, **options)
+
+    outcomes = []
+    for file_path, result, error in transcripts:
+        outcomes.append((file_path, audio_seconds(file_path, result) if result else 0.0, error))
+    return outcomes, time.perf_counter() - start
+
+
+def run_batch(files, model_type, output_format, workers=1, **options):
+    """
+    Fans the files out over a pool of worker processes.
+    A failing file is reported and skipped; the batch always runs to the end.
+    `options` are passed on to `cli.transcribe_media` for every file.
+    With a `batch_size` option, every job is a group of that many files whose
+    windows the worker decodes together (see `cli.transcribe_media_batched`).
+    With a `prefetch` option, every job is a group of files the worker transcribes
+    while it decodes the next ones ahead (see `pipeline.run_pipelined`).
+    Returns the list of (file_path, error) pairs that failed.
+    """
+    if options.get("batch_size") or options.get("prefetch"):
+        return _run_groups(files, model_type, output_format, workers, **options)
+
+    if not files:
+        logger.warning("Batch: No input files found.")
+        return []
+
+    workers = max(1, min(workers, len(files)))
+    logger.info(f"Batch: {len(files)} file(s) on {workers} worker(s) with model '{model_type}'.")
+
+    failures = []
+    total_audio = 0.0
+    batch_start = time.perf_counter()
+
+    with pool.worker_pool(model_type, workers, options.get("dtype", "float32")) as executor:
+        futures = {executor.submit(_run_job, path, model_type, output_format, options): path for path in files}
+
+        for done, future in enumerate(as_completed(futures), start=1):
+            path = futures[future]
+            try:
+                audio_seconds, wall_seconds = future.result()
+            except Exception as e:
+                failures.append((path, e))
+                logger.error(f"[{done}/{len(files)}] FAILED {path}: {e}")
+                continue
+
+            total_audio += audio_seconds
+            rtf = wall_seconds / max(audio_seconds, 1e-9)
+            logger.info(
+                f"[{done}/{len(files)}] OK {path} ({audio_seconds:.1f}s audio in {wall_seconds:.1f}s, RTF {rtf:.2f})"
+            )
+
+    _log_summary(len(files), failures, total_audio, time.perf_counter() - batch_start)
+    return failures
+
+
+def _run_groups(files, model_type, output_format, workers, **options):
+    if not files:
+        logger.warning("Batch: No input files found.")
+        return []
+
+    if options.get("batch_size"):
+        group_size = options["batch_size"]
+        mode = f"{group_size} window(s) per forward pass"
+    else:
+        # A few groups per worker keep the workers evenly loaded; each group needs
+        # more files than it prefetches for the prefetching to overlap anything.
+        group_size = max(options["prefetch"] + 1, math.ceil(len(files) / (max(1, workers) * 4)))
+        mode = f"prefetching {options['prefetch']} file(s) ahead"
+    groups = [files[i : i + group_size] for i in range(0, len(files), group_size)]
+    workers = max(1, min(workers, len(groups)))
+    logger.info(
+        f"Batch: {len(files)} file(s) in {len(groups)} group(s) on {workers} worker(s) with model '{model_type}', "
+        f"{mode}."
+    )
+
+    failures = []
+    total_audio = 0.0
+    done = 0
+    batch_start = time.perf_counter()
+
+    with pool.worker_pool(model_type, workers, options.get("dtype", "float32")) as executor:
+        futures = {executor.submit(_run_group, group, model_type, output_format, options): group for group in groups}
+
+        for future in as_completed(futures):
+            try:
+                outcomes, wall_seconds = future.result()
+            except Exception as e:
+                outcomes = [(path, 0.0, e) for path in futures[future]]
+                wall_seconds = 0.0
+
+            for path, audio_seconds, error in outcomes:
+                done += 1
+                if error:
+                    failures.append((path, error))
+                    logger.error(f"[{done}/{len(files)}] FAILED {path}: {error}")
+                else:
+                    total_audio += audio_seconds
+                    logger.info(f"[{done}/{len(files)}] OK {path} ({audio_seconds:.1f}s audio)")
+            if wall_seconds:
+                group_audio = sum(audio_seconds for _, audio_seconds, _ in outcomes)
+                logger.info(
+                    f"Batch: Group of {len(outcomes)} file(s) done in {wall_seconds:.1f}s "
+                    f"(RTF {wall_seconds / max(group_audio, 1e-9):.2f})."
+                )
+
+    _log_summary(len(files), failures, total_audio, time.perf_counter() - batch_start)
+    return failures
+
+
+def _log_summary(total, failures, total_audio, wall):
+    logger.info(
+        f"Batch finished: {total - len(failures)} succeeded, {len(failures)} failed. "
+        f"{total_audio:.1f}s of audio in {wall:.1f}s "
+        f"({total_audio / max(wall, 1e-9):.2f} audio-seconds per wall-second)."
+    )
+    for path, error in failures:
+        logger.error(f"Failed: {path}: {error}")
@@ -0,0 +1,222 @@
+import logging
+from collections import defaultdict, deque
+
+import numpy as np
+
+from opentranscriber import chunking, profiling
+from opentranscriber.audio import HOP_LENGTH, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SIZE = 8
+WINDOW_LENGTH = 24.0  # seconds; split points move up to SEARCH_WINDOW to land in a pause
+SEARCH_WINDOW = 5.0
+OVERLAP = 0.5  # seconds of context on both sides, so a window never exceeds 30 s
+
+# The quality checks and fallback temperatures of `whisper.transcribe`.
+TEMPERATURES = (0.0, 0.2, 0.4, 0.6, 0.8, 1.0)
+COMPRESSION_RATIO_THRESHOLD = 2.4
+LOGPROB_THRESHOLD = -1.0
+NO_SPEECH_THRESHOLD = 0.6
+
+
+def plan_windows(audio):
+    """Splits the audio at pauses into chunks (`chunking.Chunk`) that each fit in one 30-second window."""
+    overlap_samples = int(OVERLAP * SAMPLE_RATE)
+    points = chunking.find_split_points(audio, int(WINDOW_LENGTH * SAMPLE_RATE), int(SEARCH_WINDOW * SAMPLE_RATE))
+    return [
+        chunking.Chunk(
+            start=max(0, own_start - overlap_samples),
+            end=min(len(audio), own_end + overlap_samples),
+            own_start=own_start,
+            own_end=own_end,
+        )
+        for own_start, own_end in zip(points[:-1], points[1:])
+        if own_end > own_start
+    ]
+
+
+def needs_fallback(decoded):
+    """Whether `whisper.transcribe` would decode this window again at a higher temperature."""
+    if is_silence(decoded):
+        return False
+    return decoded.compression_ratio > COMPRESSION_RATIO_THRESHOLD or decoded.avg_logprob < LOGPROB_THRESHOLD
+
+
+def is_silence(decoded):
+    return decoded.no_speech_prob > NO_SPEECH_THRESHOLD and decoded.avg_logprob < LOGPROB_THRESHOLD
+
+
+def window_segments(decoded, tokenizer, duration):
+    """
+    Splits the tokens of one decoded window into segments at its timestamp tokens,
+    like `whisper.transcribe` does. Times are relative to the window start.
+    """
+    if is_silence(decoded):
+        return []
+
+    tokens = np.asarray(decoded.tokens, dtype=np.int64)
+    is_timestamp = tokens >= tokenizer.timestamp_begin
+    precision = HOP_LENGTH * 2 / SAMPLE_RATE  # the encoder halves the mel frame rate
+
+    def segment(start, end, segment_tokens):
+        text = tokenizer.decode([int(t) for t in segment_tokens if t < tokenizer.eot])
+        return {
+            "seek": 0,
+            "start": min(start, duration),
+            "end": min(end, duration),
+            "text": text,
+            "tokens": [int(t) for t in segment_tokens],
+            "temperature": decoded.temperature,
+            "avg_logprob": decoded.avg_logprob,
+            "compression_ratio": decoded.compression_ratio,
+            "no_speech_prob": decoded.no_speech_prob,
+        }
+
+    segments = []
+    consecutive = np.flatnonzero(is_timestamp[:-1] & is_timestamp[1:]) + 1
+    if len(consecutive):
+        slices = consecutive.tolist()
+        if is_timestamp[-2:].tolist() == [False, True]:
+            slices.append(len(tokens))
+        last = 0
+        for current in slices:
+            piece = tokens[last:current]
+            start = (piece[0] - tokenizer.timestamp_begin) * precision
+            end = (piece[-1] - tokenizer.timestamp_begin) * precision
+            segments.append(segment(float(start), float(end), piece))
+            last = current
+    else:
+        end = duration
+        timestamps = tokens[is_timestamp]
+        if len(timestamps) and timestamps[-1] != tokenizer.timestamp_begin:
+            end = float((timestamps[-1] - tokenizer.timestamp_begin) * precision)
+        segments.append(segment(0.0, end, tokens))
+
+    return [s for s in segments if s["end"] > s["start"] and s["text"].strip()]
+
+
+class _Recording:
+    """One input being transcribed: its audio, windows, language and the decoded windows so far."""
+
+    def __init__(self, key, audio, language):
+        self.key = key
+        self.audio = audio
+        self.chunks = plan_windows(audio)
+        self.language = language
+        self.results = [None] * len(self.chunks)
+        self.remaining = len(self.chunks)
+
+    def mel(self, window, n_mels):
+        import whisper
+
+        chunk = self.chunks[window]
+        return whisper.log_mel_spectrogram(whisper.pad_or_trim(self.audio[chunk.start : chunk.end]), n_mels)
+
+    def result(self):
+        return chunking.stitch_results(self.results, self.chunks)
+
+
+def transcribe_many(model, sources, batch_size=DEFAULT_BATCH_SIZE, language=None, beam_size=None, best_of=None):
+    """
+    Transcribes several recordings at once: their 30-second windows are pooled and
+    pushed through the encoder and the decoder `batch_size` windows at a time,
+    instead of one window per forward pass.
+
+    `sources` is an iterable of (key, audio) pairs; it is read lazily, only as far
+    as needed to fill the next batch. Yields (key, result) for each recording once
+    all its windows are decoded, which is not necessarily in input order. Each
+    `result` is a Whisper-style dict, like `model.transcribe` returns.
+
+    Every recording is cut at pauses into windows of at most 30 seconds, which are
+    decoded independently: unlike `model.transcribe`, a window is not conditioned
+    on the text of the previous one. Windows that fail Whisper's quality checks
+    are queued again at the next fallback temperature. A batch holds windows of
+    one language and temperature; the language is detected per recording, on its
+    first window, unless `language` is given.
+    """
+    import torch
+    import whisper
+
+    tokenizers = {}
+    pending = defaultdict(deque)  # (language, temperature index) -> [(recording, window)]
+    sources = iter(sources)
+    exhausted = False
+
+    def queued():
+        return sum(len(queue) for queue in pending.values())
+
+    while True:
+        while not exhausted and queued() < batch_size:
+            try:
+                key, audio = next(sources)
+            except StopIteration:
+                exhausted = True
+                break
+            recording = _Recording(key, audio, language)
+            if not recording.chunks:
+                yield key, {"text": "", "segments": [], "language": language or "en"}
+                continue
+            if recording.language is None:
+                recording.language = _detect_language(model, recording)
+            for window in range(len(recording.chunks)):
+                pending[(recording.language, 0)].append((recording, window))
+
+        if not queued():
+            return
+
+        # The fullest queue first, so batches stay full while input keeps coming.
+        group = max(pending, key=lambda k: len(pending[k]))
+        queue = pending[group]
+        items = [queue.popleft() for _ in range(min(batch_size, len(queue)))]
+        if not queue:
+            del pending[group]
+
+        window_language, temperature_index = group
+        temperature = TEMPERATURES[temperature_index]
+        options = whisper.DecodingOptions(
+            task="transcribe",
+            language=window_language,
+            temperature=temperature,
+            beam_size=beam_size if temperature == 0 else None,
+            best_of=best_of if temperature > 0 else None,
+            fp16=False,
+        )
+        mel = torch.stack([recording.mel(window, model.dims.n_mels) for recording, window in items])
+        with profiling.span("batch", windows=len(items), temperature=temperature):
+            decoded = model.decode(mel.to(model.device), options)
+
+        if window_language not in tokenizers:
+            tokenizers[window_language] = whisper.tokenizer.get_tokenizer(
+                model.is_multilingual, num_languages=model.num_languages, language=window_language, task="transcribe"
+            )
+        tokenizer = tokenizers[window_language]
+
+        for (recording, window), result in zip(items, decoded):
+            if needs_fallback(result) and temperature_index + 1 < len(TEMPERATURES):
+                profiling.count("temperature_fallbacks")
+                pending[(window_language, temperature_index + 1)].append((recording, window))
+                continue
+
+            chunk = recording.chunks[window]
+            segments = window_segments(result, tokenizer, (chunk.end - chunk.start) / SAMPLE_RATE)
+            recording.results[window] = {"segments": segments, "language": recording.language}
+            recording.remaining -= 1
+            if recording.remaining == 0:
+                yield recording.key, recording.result()
+
+
+def _detect_language(model, recording):
+    if not model.is_multilingual:
+        return "en"
+    with profiling.span("language_detection"):
+        _, probs = model.detect_language(recording.mel(0, model.dims.n_mels).to(model.device))
+    language = max(probs, key=probs.get)
+    logger.info(f"Batched: Detected language '{language}' for {recording.key}.")
+    return language
+
+
+def transcribe(model, audio, batch_size=DEFAULT_BATCH_SIZE, **options):
+    """Transcribes one recording, decoding `batch_size` of its windows per forward pass (see `transcribe_many`)."""
+    for _, result in transcribe_many(model, [(0, audio)], batch_size=batch_size, **options):
+        return result
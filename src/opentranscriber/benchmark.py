@@ -0,0 +1,355 @@
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import wave
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from opentranscriber import atomic, cache, export, models, setup_logging
+from opentranscriber.audio import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+FIXTURE_KINDS = ["tone", "noise", "silence", "speechlike"]
+FIXTURE_LENGTHS = [30, 300, 1800, 7200]  # seconds
+DEFAULT_LENGTHS = [30, 300]
+DEFAULT_MODELS = ["tiny", "base"]
+SEED = 20240101
+BLOCK_SECONDS = 60  # fixtures are generated block by block, so 2 h never sits in memory
+
+# Metrics compared between two result files. Lower is better for all of them.
+COMPARED_METRICS = [
+    "model_load_s",
+    "decode_s",
+    "transcribe_s",
+    "write_s",
+    "cache_s",
+    "wall_s",
+    "rtf",
+    "peak_rss_mb",
+]
+DEFAULT_THRESHOLD = 0.10  # relative slowdown flagged as a regression
+NOISE_FLOOR = {
+    "model_load_s": 0.05,
+    "decode_s": 0.05,
+    "transcribe_s": 0.05,
+    "write_s": 0.05,
+    "cache_s": 0.05,
+    "wall_s": 0.1,
+}
+
+STARTUP_TARGET = 0.5  # seconds for `opentranscriber-cli --help`
+STARTUP_RUNS = 5
+# Modules that must not be imported just by loading the CLI or the GUI.
+HEAVY_MODULES = ["pygame", "torch", "whisper"]
+
+
+def fixtures_dir():
+    return os.path.join(cache.cache_root(), "benchmark-fixtures")
+
+
+def _block(kind, block_index, samples):
+    """One block of a fixture. Each block has its own seed, so blocks do not depend on each other."""
+    rng = np.random.default_rng([SEED, FIXTURE_KINDS.index(kind), block_index])
+    t = (block_index * BLOCK_SECONDS * SAMPLE_RATE + np.arange(samples)) / SAMPLE_RATE
+
+    if kind == "silence":
+        return np.zeros(samples, dtype=np.float32)
+    if kind == "tone":
+        return (0.3 * np.sin(2 * np.pi * 440.0 * t) + 0.1 * np.sin(2 * np.pi * 880.0 * t)).astype(np.float32)
+    if kind == "noise":
+        return (0.1 * rng.standard_normal(samples)).astype(np.float32)
+    if kind == "speechlike":
+        return _speechlike(rng, t)
+    raise ValueError(f"Unknown fixture kind: {kind}")
+
+
+def _speechlike(rng, t):
+    """
+    Syllable-like bursts: a harmonic stack with a gliding pitch, shaped by a
+    4-6 Hz envelope, in phrases separated by pauses. Not speech, but it exercises
+    the decoder the way speech does (voiced segments, pauses, no long silences).
+    """
+    samples = len(t)
+    audio = np.zeros(samples, dtype=np.float32)
+    position = 0
+    while position < samples:
+        phrase = int(rng.uniform(1.5, 6.0) * SAMPLE_RATE)
+        pause = int(rng.uniform(0.2, 1.2) * SAMPLE_RATE)
+        end = min(position + phrase, samples)
+        span = t[position:end]
+
+        pitch = rng.uniform(90, 220) * (1 + 0.15 * np.sin(2 * np.pi * rng.uniform(0.3, 1.0) * span))
+        phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+        voiced = sum(np.sin(k * phase) / k for k in range(1, 6))
+        envelope = np.clip(np.sin(2 * np.pi * rng.uniform(4.0, 6.0) * span), 0, None) ** 2
+        audio[position:end] = 0.2 * voiced * envelope + 0.01 * rng.standard_normal(len(span))
+
+        position = end + pause
+    return audio
+
+
+def ensure_fixture(kind, seconds, directory=None):
+    """Path of the fixture WAV (16 kHz mono, 16-bit), generating it on first use."""
+    directory = directory or fixtures_dir()
+    path = os.path.join(directory, f"{kind}-{seconds}s.wav")
+    if os.path.exists(path):
+        return path
+
+    with atomic.atomic_write(path, "wb") as f, wave.open(f, "wb") as out:
+        out.setnchannels(1)
+        out.setsampwidth(2)
+        out.setframerate(SAMPLE_RATE)
+        total = seconds * SAMPLE_RATE
+        for block_index, start in enumerate(range(0, total, BLOCK_SECONDS * SAMPLE_RATE)):
+            audio = _block(kind, block_index, min(BLOCK_SECONDS * SAMPLE_RATE, total - start))
+            out.writeframes((np.clip(audio, -1, 1) * 32767).astype("<i2").tobytes())
+
+    logger.info(f"Benchmark: Generated fixture {path}")
+    return path
+
+
+def _peak_rss_mb():
+    try:
+        import resource
+    except ImportError:  # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _run_case(fixture, model_type, output_format):
+    """
+    Times `cli.transcribe_media` on the fixture, with a fresh transcript cache, and
+    splits the wall time into its stages with the profiler. Executed in a fresh
+    process per case, so model load is cold and peak RSS belongs to this case alone.
+    """
+    from opentranscriber import cli, profiling
+
+    profiler = profiling.Profiler()
+    with tempfile.TemporaryDirectory() as directory:
+        # Outputs are written next to the input, and the cache must start empty.
+        media = os.path.join(directory, os.path.basename(fixture))
+        try:
+            os.symlink(fixture, media)
+        except OSError:
+            shutil.copyfile(fixture, media)
+        os.environ["OPENTRANSCRIBER_CACHE_DIR"] = os.path.join(directory, "cache")
+
+        start = time.perf_counter()
+        with profiling.activate(profiler):
+            result = cli.transcribe_media(media, model_type, output_format)
+        wall = time.perf_counter() - start
+
+    stages = {name: total for name, (_, total, _) in profiler.totals().items()}
+    model_load = stages.get("model_load", 0.0)
+    decode = stages.get("ffmpeg_decode", 0.0)
+    write = stages.get("write", 0.0)
+    cache_time = sum(stages.get(name, 0.0) for name in ("cache_key", "cache_lookup", "cache_store"))
+    audio_seconds = result["duration"]
+    return {
+        "audio_seconds": audio_seconds,
+        "model_load_s": round(model_load, 4),
+        "decode_s": round(decode, 4),
+        "transcribe_s": round(wall - model_load - decode - write - cache_time, 4),
+        "write_s": round(write, 4),
+        "cache_s": round(cache_time, 4),
+        "wall_s": round(wall, 4),
+        "rtf": round((wall - model_load) / audio_seconds, 5),
+        "peak_rss_mb": _peak_rss_mb(),
+        "segments": len(result["segments"]),
+    }
+
+
+def _environment():
+    versions = {}
+    for name in ("torch", "whisper", "numpy"):
+        try:
+            versions[name] = getattr(__import__(name), "__version__", "unknown")
+        except ImportError:
+            versions[name] = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "versions": versions,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def run(model_types=DEFAULT_MODELS, lengths=DEFAULT_LENGTHS, kinds=FIXTURE_KINDS, output_format="srt"):
+    """Benchmarks every (model, fixture) combination. Returns the JSON-serializable report."""
+    fixtures = [(kind, seconds, ensure_fixture(kind, seconds)) for seconds in lengths for kind in kinds]
+    results = []
+
+    # One process per case: 'spawn' and max_tasks_per_child=1 give each case a cold start.
+    context = multiprocessing.get_context("spawn")
+    for model_type in model_types:
+        for kind, seconds, path in fixtures:
+            name = f"{kind}-{seconds}s"
+            with ProcessPoolExecutor(max_workers=1, mp_context=context, max_tasks_per_child=1) as executor:
+                case = executor.submit(_run_case, path, model_type, output_format).result()
+            results.append({"model": model_type, "fixture": name, **case})
+            logger.info(
+                f"Benchmark: {model_type:<6} {name:<18} RTF {case['rtf']:.4f}, "
+                f"load {case['model_load_s']:.2f}s, wall {case['wall_s']:.1f}s, peak RSS {case['peak_rss_mb']} MB"
+            )
+
+    return {"environment": _environment(), "results": results}
+
+
+def compare(baseline, candidate, threshold=DEFAULT_THRESHOLD):
+    """
+    Lists the metrics that got worse by more than `threshold` (relative) between
+    two reports, as (model, fixture, metric, old, new) tuples. Differences below
+    the metric's noise floor are ignored.
+    """
+    old_cases = {(case["model"], case["fixture"]): case for case in baseline["results"]}
+    regressions = []
+
+    for case in candidate["results"]:
+        old = old_cases.get((case["model"], case["fixture"]))
+        if old is None:
+            continue
+        for metric in COMPARED_METRICS:
+            before, after = old.get(metric), case.get(metric)
+            if before is None or after is None:
+                continue
+            if after - before <= NOISE_FLOOR.get(metric, 0):
+                continue
+            if after > before * (1 + threshold):
+                regressions.append((case["model"], case["fixture"], metric, before, after))
+
+    return regressions
+
+
+def startup(runs=STARTUP_RUNS):
+    """
+    Median wall time of `opentranscriber-cli --help` in a fresh interpreter, and
+    the heavy modules that importing the CLI and GUI modules pulls in.
+    """
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-m", "opentranscriber.cli", "--help"], check=True, stdout=subprocess.DEVNULL)
+        times.append(time.perf_counter() - start)
+
+    probe = (
+        "import json, sys\n"
+        "import opentranscriber.cli, opentranscriber.gui\n"
+        f"print(json.dumps([m for m in {HEAVY_MODULES!r} if m in sys.modules]))"
+    )
+    process = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True)
+    if process.returncode != 0:
+        raise RuntimeError(f"Import probe failed: {process.stderr.strip()}")
+
+    return {
+        "help_s": round(statistics.median(times), 4),
+        "runs": [round(t, 4) for t in times],
+        "heavy_modules": json.loads(process.stdout.strip().splitlines()[-1]),
+    }
+
+
+def main():
+    # Logs go to stderr: the report may be written to stdout.
+    setup_logging(stream=sys.stderr)
+
+    parser = argparse.ArgumentParser(description="OpenTranscriber real-time-factor benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Run the benchmarks and write a JSON report")
+    run_parser.add_argument(
+        "--models",
+        nargs="+",
+        default=DEFAULT_MODELS,
+        choices=models.MODEL_NAMES,
+        help="Model sizes (default: tiny base)",
+    )
+    run_parser.add_argument(
+        "--lengths",
+        nargs="+",
+        type=int,
+        default=DEFAULT_LENGTHS,
+        choices=FIXTURE_LENGTHS,
+        help="Fixture lengths in seconds (default: 30 300)",
+    )
+    run_parser.add_argument("--kinds", nargs="+", default=FIXTURE_KINDS, choices=FIXTURE_KINDS, help="Fixture kinds")
+    run_parser.add_argument(
+        "--format", default="srt", choices=export.FORMATS, help="Output format written by the writer stage"
+    )
+    run_parser.add_argument("--output", default="-", help="Report path (default: stdout)")
+
+    compare_parser = commands.add_parser("compare", help="Flag regressions between two reports")
+    compare_parser.add_argument("baseline", help="Report of the reference run")
+    compare_parser.add_argument("candidate", help="Report of the run to check")
+    compare_parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Relative slowdown flagged as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+
+    startup_parser = commands.add_parser("startup", help="Check that the CLI starts without heavy imports")
+    startup_parser.add_argument("--runs", type=int, default=STARTUP_RUNS, help=f"(default: {STARTUP_RUNS})")
+    startup_parser.add_argument(
+        "--target",
+        type=float,
+        default=STARTUP_TARGET,
+        help=f"Maximum median seconds for --help (default: {STARTUP_TARGET})",
+    )
+
+    args = parser.parse_args()
+
+    if args.command == "startup":
+        report = startup(args.runs)
+        logger.info(f"Startup: --help took {report['help_s']:.3f}s (median of {args.runs}).")
+        failed = False
+        if report["heavy_modules"]:
+            logger.error(f"Startup: Importing the CLI/GUI loads {', '.join(report['heavy_modules'])}.")
+            failed = True
+        if report["help_s"] > args.target:
+            logger.error(f"Startup: --help is slower than the {args.target:.2f}s target.")
+            failed = True
+        if failed:
+            sys.exit(1)
+        return
+
+    if args.command == "run":
+        report = run(args.models, args.lengths, args.kinds, args.format)
+        text = json.dumps(report, indent=2)
+        if args.output == "-":
+            print(text)
+        else:
+            with open(args.output, "w", encoding="utf-8") as f:
+                f.write(text + "\n")
+            logger.info(f"Benchmark: Report saved to {os.path.abspath(args.output)}")
+        return
+
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding="utf-8") as f:
+        candidate = json.load(f)
+
+    regressions = compare(baseline, candidate, args.threshold)
+    for model_type, fixture, metric, before, after in regressions:
+        change = f" ({after / before - 1:+.0%})" if before else ""
+        logger.error(f"REGRESSION {model_type} {fixture} {metric}: {before} -> {after}{change}")
+    if regressions:
+        sys.exit(1)
+    logger.info(f"No regressions above {args.threshold:.0%}.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from opentranscriber import atomic
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_CACHE_MB = int(os.getenv("OPENTRANSCRIBER_CACHE_MB", "1024"))
+CACHE_FORMAT_VERSION = 1
+
+
+def cache_root():
+    """Base directory for everything OpenTranscriber caches on disk."""
+    if os.getenv("OPENTRANSCRIBER_CACHE_DIR"):
+        return os.environ["OPENTRANSCRIBER_CACHE_DIR"]
+    default = os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(os.getenv("XDG_CACHE_HOME", default), "opentranscriber")
+
+
+# In-process memo of content hashes, keyed by (path, size, mtime_ns), so a file is
+# hashed once per process even when several features ask for its digest.
+_digests = {}
+_digests_lock = threading.Lock()
+
+# Approximate total size of each transcript cache directory: measured by one walk
+# in this process, then kept up to date on every put, so the walk only runs again
+# when the total crosses the budget (writes of other processes are counted then).
+_sizes = {}
+_sizes_lock = threading.Lock()
+
+
+def file_digest(path):
+    """SHA-256 of the file contents, as a hex string."""
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+    with _digests_lock:
+        if memo_key in _digests:
+            return _digests[memo_key]
+
+    with open(path, "rb") as f:
+        digest = hashlib.file_digest(f, "sha256").hexdigest()
+
+    with _digests_lock:
+        _digests[memo_key] = digest
+    return digest
+
+
+def cache_key(digest, model_type, options=None):
+    """Key of a transcript: media content hash + model name + the options that change the output."""
+    payload = json.dumps(
+        {"v": CACHE_FORMAT_VERSION, "media": digest, "model": model_type, "options": options or {}},
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def transcript_options(dtype="float32", chunk_length=None, stream_window=None, vad=False, batched=False, cascade=None):
+    """The decoding options that change a transcript, as they go into its cache key."""
+    options = {}
+    if cascade:
+        options["cascade"] = cascade
+    if dtype != "float32":
+        options["dtype"] = dtype
+    if vad:
+        options["vad"] = True
+    if batched:
+        # Independently decoded windows (see `batched`); the batch size itself doesn't change the text.
+        options["batched"] = True
+    if chunk_length:
+        options["chunk_length"] = chunk_length
+    elif stream_window:
+        options["stream_window"] = stream_window
+    return options
+
+
+class TranscriptCache:
+    """
+    Content-addressed store of raw Whisper `result` dicts, as gzip-compressed JSON.
+
+    Entries are evicted least-recently-used first (by file mtime, refreshed on every
+    hit) once the total size exceeds `max_mb`. The total is tracked in memory, so a
+    put only walks the cache directory when it crosses the budget.
+    """
+
+    def __init__(self, directory=None, max_mb=DEFAULT_MAX_CACHE_MB):
+        self.directory = directory or os.path.join(cache_root(), "transcripts")
+        self.max_bytes = max_mb * 1024 * 1024
+
+    def _path(self, key):
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def get(self, key):
+        """Returns the cached result or None. A corrupt entry is removed and treated as a miss."""
+        path = self._path(key)
+        try:
+            with gzip.open(path, "rt", encoding="utf-8") as f:
+                result = json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Cache: Discarding unreadable entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return result
+
+    def put(self, key, result):
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        with atomic.atomic_write(path, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8"))
+
+        with _sizes_lock:
+            total = _sizes.get(self.directory)
+            if total is not None:
+                total = _sizes[self.directory] = total + os.path.getsize(path) - replaced
+        if total is None or total > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        """Deletes least recently used entries until the cache fits its size budget."""
+        entries = []
+        total = 0
+        for dirpath, _, filenames in os.walk(self.directory):
+            for name in filenames:
+                if not name.endswith(".json.gz"):
+                    continue
+                path = os.path.join(dirpath, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total += stat.st_size
+
+        entries.sort()
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            logger.info(f"Cache: Evicting {os.path.basename(path)}")
+            self._remove(path)
+            total -= size
+
+        with _sizes_lock:
+            _sizes[self.directory] = total
+
+    def _remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
@@ -0,0 +1,28 @@
+from contextlib import contextmanager
+
+
+class TranscriptionCancelled(InterruptedError):
+    """Raised from inside the model when a running transcription is cancelled."""
+
+
+@contextmanager
+def cancellable(model, cancel_event):
+    """
+    Makes a running `model.transcribe` abort promptly once `cancel_event` is set.
+
+    Whisper only reports progress once per 30-second window, so the check is
+    installed as a forward pre-hook on every encoder and decoder block instead:
+    it runs many times per decoded token and stops the decode mid-window.
+    """
+
+    def check(module, args):
+        if cancel_event.is_set():
+            raise TranscriptionCancelled()
+
+    blocks = [*model.encoder.blocks, *model.decoder.blocks]
+    handles = [block.register_forward_pre_hook(check) for block in blocks]
+    try:
+        yield
+    finally:
+        for handle in handles:
+            handle.remove()
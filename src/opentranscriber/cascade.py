@@ -0,0 +1,163 @@
+import logging
+from contextlib import nullcontext
+from typing import NamedTuple
+
+from opentranscriber import cancellation, models, profiling, vad
+from opentranscriber.audio import HOP_LENGTH, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+MERGE_GAP = 1.0  # seconds; weak segments closer than this are re-transcribed together
+MARGIN = 0.5  # seconds of context added on both sides of an escalated span
+
+
+class Thresholds(NamedTuple):
+    """
+    A segment is weak, and escalated to the larger model, if its window's average
+    log-probability is below `logprob`, its no-speech probability above
+    `no_speech` (text where the model heard no speech is often hallucinated), or
+    its compression ratio above `compression_ratio` (repetitive text).
+    """
+
+    logprob: float = -0.7
+    no_speech: float = 0.5
+    compression_ratio: float = 2.0
+
+
+DEFAULT_THRESHOLDS = Thresholds()
+
+
+def is_weak(segment, thresholds):
+    return (
+        segment.get("avg_logprob", 0.0) < thresholds.logprob
+        or segment.get("no_speech_prob", 0.0) > thresholds.no_speech
+        or segment.get("compression_ratio", 0.0) > thresholds.compression_ratio
+    )
+
+
+def weak_spans(segments, thresholds, gap=MERGE_GAP):
+    """
+    Groups the weak segments into spans of (start, end, first index, last index),
+    merging neighbours less than `gap` seconds apart.
+    """
+    spans = []
+    for index, segment in enumerate(segments):
+        if not is_weak(segment, thresholds):
+            continue
+        if spans and segment["start"] - spans[-1][1] < gap:
+            start, _, first, _ = spans[-1]
+            spans[-1] = (start, max(segment["end"], spans[-1][1]), first, index)
+        else:
+            spans.append((segment["start"], segment["end"], index, index))
+    return spans
+
+
+def _escalate(model, audio, start, end, language):
+    """Transcribes [start, end) seconds (plus a margin) with `model`; returns the segments inside it."""
+    clip_start = max(0.0, start - MARGIN)
+    clip_end = min(len(audio) / SAMPLE_RATE, end + MARGIN)
+    clip = audio[int(clip_start * SAMPLE_RATE) : int(clip_end * SAMPLE_RATE)]
+    result = model.transcribe(clip, fp16=False, language=language)
+
+    segments = []
+    for segment in result["segments"]:
+        segment_start, segment_end = segment["start"] + clip_start, segment["end"] + clip_start
+        # Segments in the margin belong to the fast model's neighbouring segments.
+        if not start <= (segment_start + segment_end) / 2 < end:
+            continue
+        segments.append(
+            {
+                **segment,
+                "start": segment_start,
+                "end": min(segment_end, clip_end),
+                "seek": segment["seek"] + int(clip_start * SAMPLE_RATE) // HOP_LENGTH,
+            }
+        )
+    return segments
+
+
+def refine(result, audio, model_type, dtype="float32", thresholds=DEFAULT_THRESHOLDS, cancel_event=None):
+    """
+    Re-transcribes the weak segments of `result` (see `Thresholds`) with the
+    larger model `model_type`, on just their audio, and merges the new segments
+    into a copy of the result in place of the weak ones. The larger model is only
+    loaded if there is anything to escalate. Setting `cancel_event` aborts the
+    escalation like `cancellation.cancellable` does.
+
+    If the larger model finds no speech in a span, the fast model's segments are
+    kept, unless they were all weak for their no-speech probability (likely
+    hallucinated text); "kept_spans" in the report counts those fallbacks.
+
+    The returned result has a "cascade" report: the escalated model, number of
+    spans and segments, escalated and total seconds, the escalated share, and the
+    kept spans.
+    """
+    segments = result["segments"]
+    spans = weak_spans(segments, thresholds)
+    duration = len(audio) / SAMPLE_RATE
+    escalated_seconds = sum(min(end + MARGIN, duration) - max(start - MARGIN, 0.0) for start, end, _, _ in spans)
+    report = {
+        "model": model_type,
+        "spans": len(spans),
+        "segments": sum(last - first + 1 for _, _, first, last in spans),
+        "escalated_seconds": round(escalated_seconds, 2),
+        "total_seconds": round(duration, 2),
+        "escalated_share": round(escalated_seconds / duration, 4) if duration else 0.0,
+        "kept_spans": 0,
+    }
+    logger.info(
+        f"Cascade: Escalating {report['segments']} weak segment(s) in {len(spans)} span(s), "
+        f"{escalated_seconds:.1f}s of {duration:.1f}s ({report['escalated_share']:.1%}), to '{model_type}'."
+    )
+    if not spans:
+        return {**result, "cascade": report}
+
+    model = models.get_model(model_type, dtype=dtype, cancel_event=cancel_event)
+    merged = []
+    kept_until = 0
+    with (
+        profiling.span("cascade", spans=len(spans)),
+        profiling.instrument(model),
+        cancellation.cancellable(model, cancel_event) if cancel_event else nullcontext(),
+    ):
+        for start, end, first, last in spans:
+            merged.extend(segments[kept_until:first])
+            replacement = _escalate(model, audio, start, end, result.get("language"))
+            weak = segments[first : last + 1]
+            if replacement:
+                merged.extend({**segment, "model": model_type} for segment in replacement)
+            elif not all(segment.get("no_speech_prob", 0.0) > thresholds.no_speech for segment in weak):
+                logger.info(
+                    f"Cascade: '{model_type}' found no speech in {start:.1f}-{end:.1f}s; keeping the fast model's text."
+                )
+                merged.extend(weak)
+                report["kept_spans"] += 1
+            kept_until = last + 1
+    merged.extend(segments[kept_until:])
+
+    merged = [{**segment, "id": i} for i, segment in enumerate(merged)]
+    return {
+        **result,
+        "text": "".join(segment["text"] for segment in merged),
+        "segments": merged,
+        "cascade": report,
+    }
+
+
+def transcribe(
+    model, audio, model_type, dtype="float32", thresholds=DEFAULT_THRESHOLDS, use_vad=False, cancel_event=None
+):
+    """
+    Transcribes `audio` with the fast `model`, then refines the weak segments with
+    `model_type` (see `refine`). With `use_vad`, both only see the speech regions;
+    the report then counts seconds of speech.
+    """
+    options = {"dtype": dtype, "thresholds": thresholds, "cancel_event": cancel_event}
+    if not use_vad:
+        return refine(model.transcribe(audio, fp16=False), audio, model_type, **options)
+
+    speech, regions = vad.speech_only(audio)
+    if not regions:
+        return vad.empty_result()
+    result = refine(model.transcribe(speech, fp16=False), speech, model_type, **options)
+    return vad.remap_result(result, regions)
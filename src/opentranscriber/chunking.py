@@ -0,0 +1,169 @@
+import logging
+import math
+import time
+from concurrent.futures import as_completed
+from typing import NamedTuple
+
+import numpy as np
+
+from opentranscriber import models, pool
+from opentranscriber.audio import HOP_LENGTH, N_SAMPLES, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_LENGTH = 300.0  # seconds
+DEFAULT_OVERLAP = 2.0  # seconds of context added on both sides of a chunk
+DEFAULT_SEARCH_WINDOW = 15.0  # seconds around the nominal split point searched for silence
+
+
+class Chunk(NamedTuple):
+    """A slice of the input, in samples. Segments are only kept inside [own_start, own_end)."""
+
+    start: int
+    end: int
+    own_start: int
+    own_end: int
+
+
+def frame_rms(audio, frame_samples):
+    """RMS energy of consecutive, non-overlapping frames (a trailing partial frame is dropped)."""
+    n_frames = len(audio) // frame_samples
+    if n_frames == 0:
+        return np.zeros(0, dtype=np.float32)
+    frames = audio[: n_frames * frame_samples].reshape(n_frames, frame_samples)
+    return np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+
+
+def find_split_points(audio, chunk_samples, search_samples, frame_samples=SAMPLE_RATE // 10):
+    """
+    Places a split roughly every `chunk_samples`, moved to the quietest frame
+    within `search_samples` of the nominal position, so cuts land in pauses.
+    Returns sample offsets, including 0 and len(audio).
+    """
+    points = [0]
+    total = len(audio)
+
+    while total - points[-1] > chunk_samples + search_samples:
+        target = points[-1] + chunk_samples
+        lo = target - search_samples
+        hi = min(target + search_samples, total)
+
+        # Smoothing over ~0.5s favours the inside of a pause over a single quiet frame.
+        energy = np.convolve(frame_rms(audio[lo:hi], frame_samples), np.ones(5) / 5, mode="same")
+        quietest = int(np.argmin(energy)) if len(energy) else 0
+        points.append(lo + quietest * frame_samples + frame_samples // 2)
+
+    points.append(total)
+    return points
+
+
+def plan_chunks(audio, chunk_length=DEFAULT_CHUNK_LENGTH, overlap=DEFAULT_OVERLAP, search_window=DEFAULT_SEARCH_WINDOW):
+    """Splits the audio at silences into chunks that overlap their neighbours by `overlap` seconds."""
+    chunk_samples = max(int(chunk_length * SAMPLE_RATE), N_SAMPLES)
+    search_samples = min(int(search_window * SAMPLE_RATE), chunk_samples // 2)
+    overlap_samples = int(overlap * SAMPLE_RATE)
+
+    points = find_split_points(audio, chunk_samples, search_samples)
+    chunks = []
+    for own_start, own_end in zip(points[:-1], points[1:]):
+        chunks.append(
+            Chunk(
+                start=max(0, own_start - overlap_samples),
+                end=min(len(audio), own_end + overlap_samples),
+                own_start=own_start,
+                own_end=own_end,
+            )
+        )
+    return chunks
+
+
+def stitch_results(results, chunks):
+    """
+    Merges per-chunk results into one Whisper `result` dict on the global timeline.
+    A segment is kept by the chunk that owns its midpoint; segments that still mostly
+    overlap the previous one (duplicated across a cut) are dropped.
+    """
+    segments = []
+
+    for result, chunk in zip(results, chunks):
+        offset = chunk.start / SAMPLE_RATE
+        own_start = chunk.own_start / SAMPLE_RATE
+        own_end = math.inf if chunk is chunks[-1] else chunk.own_end / SAMPLE_RATE
+
+        for segment in result["segments"]:
+            start = segment["start"] + offset
+            end = segment["end"] + offset
+            if not own_start <= (start + end) / 2 < own_end:
+                continue
+            if segments and segments[-1]["end"] - start > 0.5 * (end - start):
+                continue
+
+            segment = {**segment, "start": start, "end": end, "seek": segment["seek"] + chunk.start // HOP_LENGTH}
+            if "words" in segment:
+                segment["words"] = [
+                    {**word, "start": word["start"] + offset, "end": word["end"] + offset} for word in segment["words"]
+                ]
+            segments.append(segment)
+
+    for i, segment in enumerate(segments):
+        segment["id"] = i
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": results[0]["language"] if results else None,
+    }
+
+
+def _detect_language(audio, model_type, dtype="float32"):
+    """Worker job: detects the language once, so every chunk is decoded with the same one."""
+    import whisper
+
+    model = models.get_model(model_type, dtype=dtype)
+    if not model.is_multilingual:
+        return "en"
+
+    mel = whisper.log_mel_spectrogram(whisper.pad_or_trim(audio), model.dims.n_mels).to(model.device)
+    _, probs = model.detect_language(mel)
+    return max(probs, key=probs.get)
+
+
+def _transcribe_chunk(audio, model_type, language, dtype="float32"):
+    """Worker job: transcribes one chunk with the worker's warm model."""
+    model = models.get_model(model_type, dtype=dtype)
+    return model.transcribe(audio, fp16=False, language=language)
+
+
+def transcribe_in_chunks(
+    audio, model_type, workers, chunk_length=DEFAULT_CHUNK_LENGTH, overlap=DEFAULT_OVERLAP, dtype="float32"
+):
+    """
+    Transcribes one long recording by splitting it at silences and decoding the
+    chunks on `workers` processes at once. Returns a single stitched `result`.
+    """
+    chunks = plan_chunks(audio, chunk_length=chunk_length, overlap=overlap)
+    workers = max(1, min(workers, len(chunks)))
+    logger.info(f"Chunked: {len(audio) / SAMPLE_RATE:.1f}s of audio in {len(chunks)} chunk(s) on {workers} worker(s).")
+
+    start_time = time.perf_counter()
+    with pool.worker_pool(model_type, workers, dtype) as executor:
+        language = executor.submit(_detect_language, audio[:N_SAMPLES], model_type, dtype).result()
+        logger.info(f"Chunked: Detected language '{language}'.")
+
+        futures = {
+            executor.submit(_transcribe_chunk, audio[chunk.start : chunk.end], model_type, language, dtype): i
+            for i, chunk in enumerate(chunks)
+        }
+        results = [None] * len(chunks)
+        for done, future in enumerate(as_completed(futures), start=1):
+            i = futures[future]
+            try:
+                results[i] = future.result()
+            except Exception as e:
+                # Otherwise leaving the block would first wait for every chunk still queued.
+                executor.shutdown(cancel_futures=True)
+                raise RuntimeError(f"Chunk {i + 1}/{len(chunks)} failed: {e}") from e
+            logger.info(f"Chunked: [{done}/{len(chunks)}] chunk {i + 1} done.")
+
+    logger.info(f"Chunked: Transcribed in {time.perf_counter() - start_time:.1f}s.")
+    return stitch_results(results, chunks)
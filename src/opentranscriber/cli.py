@@ -1,47 +1,512 @@
 import argparse
+import json
 import logging
 import os
 import sys
 
-import whisper
-from whisper.utils import get_writer
-
-from opentranscriber import setup_logging
+# whisper (and with it torch) is imported inside the functions that need it, so
+# --help, argument errors and cache hits don't pay seconds of import time.
+from opentranscriber import (
+    batch,
+    batched,
+    cache,
+    cascade,
+    chunking,
+    export,
+    incremental,
+    models,
+    pipeline,
+    profiling,
+    setup_logging,
+    streaming,
+    tuning,
+    vad,
+)
+from opentranscriber.audio import SAMPLE_RATE
 
 logger = logging.getLogger(__name__)
 
+# --quantize choices and the model registry dtype each one loads.
+QUANTIZE_DTYPES = {"none": "float32", "int8": "int8"}
+
+
+def _run_transcription(
+    file_path,
+    model_type,
+    model,
+    audio,
+    chunk_workers,
+    chunk_length,
+    stream_window,
+    dtype,
+    use_vad,
+    batch_size=0,
+    cascade_model=None,
+    cascade_thresholds=cascade.DEFAULT_THRESHOLDS,
+):
+    if chunk_workers:
+        logger.info(f"Transcribing '{file_path}' in parallel chunks...")
+        try:
+            if not use_vad:
+                return chunking.transcribe_in_chunks(
+                    audio, model_type, chunk_workers, chunk_length=chunk_length, dtype=dtype
+                )
+            # Chunk the joined speech, so the language is detected on speech too.
+            speech, regions = vad.speech_only(audio)
+            if not regions:
+                return vad.empty_result()
+            result = chunking.transcribe_in_chunks(
+                speech, model_type, chunk_workers, chunk_length=chunk_length, dtype=dtype
+            )
+            return vad.remap_result(result, regions)
+        except Exception as e:
+            raise RuntimeError(f"Transcription failed: {e}") from e
+
+    if model is None:
+        logger.info(f"Loading Whisper model: {model_type} ({dtype})...")
+        try:
+            model = models.get_model(model_type, dtype=dtype)
+        except Exception as e:
+            raise RuntimeError(f"Failed to load model: {e}") from e
+
+    logger.info(f"Transcribing '{file_path}'...")
+    try:
+        with profiling.instrument(model):
+            if stream_window and audio is None:
+                return streaming.transcribe_streaming(model, file_path, window_seconds=stream_window, use_vad=use_vad)
+            if batch_size:
+                return _transcribe_batched(model, audio, batch_size, use_vad)
+            if cascade_model:
+                return cascade.transcribe(
+                    model, audio, cascade_model, dtype=dtype, thresholds=cascade_thresholds, use_vad=use_vad
+                )
+            if use_vad:
+                return vad.transcribe_speech(model, audio, fp16=False)
+            # Note: fp16=False is crucial for CPU execution
+            return model.transcribe(audio, fp16=False)
+    except Exception as e:
+        raise RuntimeError(f"Transcription failed: {e}") from e
+
+
+def _load_audio(file_path):
+    import whisper
+
+    try:
+        return whisper.load_audio(file_path)
+    except Exception as e:
+        raise RuntimeError(f"Failed to load audio: {e}") from e
+
+
+def _transcribe_batched(model, audio, batch_size, use_vad):
+    if not use_vad:
+        return batched.transcribe(model, audio, batch_size=batch_size)
+    speech, regions = vad.speech_only(audio)
+    if not regions:
+        return vad.empty_result()
+    return vad.remap_result(batched.transcribe(model, speech, batch_size=batch_size), regions)
+
+
+def transcript_key(
+    file_path,
+    model_type,
+    chunk_workers=0,
+    chunk_length=chunking.DEFAULT_CHUNK_LENGTH,
+    stream_window=None,
+    dtype="float32",
+    use_vad=False,
+    batch_size=0,
+    cascade_model=None,
+    cascade_thresholds=cascade.DEFAULT_THRESHOLDS,
+):
+    """Cache key of the transcript `transcribe_media` makes of `file_path` with these options."""
+    options = cache.transcript_options(
+        dtype=dtype,
+        chunk_length=chunk_length if chunk_workers else None,
+        stream_window=stream_window,
+        vad=use_vad,
+        batched=bool(batch_size),
+        cascade=[cascade_model, *cascade_thresholds] if cascade_model else None,
+    )
+    with profiling.span("cache_key"):
+        return cache.cache_key(cache.file_digest(file_path), model_type, options)
+
+
+def write_result(result, file_path, output_format):
+    """Writes `result` next to `file_path` in every format of `output_format` (a format or a list)."""
+    formats = [output_format] if isinstance(output_format, str) else list(output_format)
+    output_directory = os.path.dirname(file_path) or "."
+    logger.info(f"Saving output as {', '.join(fmt.upper() for fmt in formats)}...")
+
+    try:
+        with profiling.span("write"):
+            export.write_outputs(result, file_path, formats, output_directory)
+        logger.info(f"Success! Output saved to: {os.path.abspath(output_directory)}")
+    except Exception as e:
+        raise RuntimeError(f"Failed to save file: {e}") from e
+
 
-def transcribe_media(file_path, model_type, output_format):
+def transcribe_media(
+    file_path,
+    model_type,
+    output_format,
+    model=None,
+    audio=None,
+    chunk_workers=0,
+    chunk_length=chunking.DEFAULT_CHUNK_LENGTH,
+    stream_window=None,
+    dtype="float32",
+    use_vad=False,
+    use_cache=True,
+    refresh_cache=False,
+    batch_size=0,
+    cascade_model=None,
+    cascade_thresholds=cascade.DEFAULT_THRESHOLDS,
+):
     """
     Core transcription logic.
     Raises exceptions on failure instead of exiting directly.
+
+    Models come from the shared registry, so repeated calls in one process reuse
+    the loaded weights. Callers may also pass a `model` and already decoded `audio`.
+    With `chunk_workers`, the file is split at silences and the chunks are
+    transcribed on that many worker processes at once. With `stream_window`, the
+    audio is decoded and transcribed that many seconds at a time, which keeps
+    memory flat for arbitrarily long inputs. `dtype="int8"` runs a dynamically
+    quantized model on the CPU. `use_vad` transcribes only the speech regions found
+    by the voice activity detector; the timestamps stay on the original timeline.
+    With `batch_size`, the file's windows are decoded that many at a time by the
+    throughput engine (see `batched`). With `cascade_model`, the segments the
+    `model_type` model is unsure of (see `cascade.Thresholds`) are transcribed
+    again with that larger model, and the result gets a "cascade" report.
+
+    The result records the "duration" of the input in seconds. Results are cached
+    on disk by media content, model and options; a cache hit skips model loading
+    and transcription. `refresh_cache` forces a new run.
+    `output_format` may be a list of formats; they are all written from the same
+    result in one pass. With `output_format=None` nothing is written; the `result`
+    is only returned.
     """
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"File not found: {file_path}")
 
-    logger.info(f"Loading Whisper model: {model_type}...")
+    result = None
+    key = None
+    transcripts = cache.TranscriptCache()
+    if use_cache:
+        key = transcript_key(
+            file_path,
+            model_type,
+            chunk_workers,
+            chunk_length,
+            stream_window,
+            dtype,
+            use_vad,
+            batch_size,
+            cascade_model,
+            cascade_thresholds,
+        )
+        if not refresh_cache:
+            with profiling.span("cache_lookup"):
+                result = transcripts.get(key)
+        if result is not None:
+            logger.info(f"Using cached transcript for '{file_path}'.")
+
+    if result is None:
+        if audio is None and not stream_window:
+            audio = _load_audio(file_path)
+        result = _run_transcription(
+            file_path,
+            model_type,
+            model,
+            audio,
+            chunk_workers,
+            chunk_length,
+            stream_window,
+            dtype,
+            use_vad,
+            batch_size,
+            cascade_model,
+            cascade_thresholds,
+        )
+        if audio is not None:
+            result = {**result, "duration": len(audio) / SAMPLE_RATE}
+        if key:
+            try:
+                with profiling.span("cache_store"):
+                    transcripts.put(key, result)
+            except OSError as e:
+                logger.warning(f"Could not cache transcript: {e}")
+
+    if "cascade" in result:
+        report = result["cascade"]
+        logger.info(
+            f"Cascade: {report['escalated_seconds']:.1f}s of {report['total_seconds']:.1f}s "
+            f"({report['escalated_share']:.1%}) re-transcribed with '{report['model']}' in {report['spans']} span(s)."
+        )
+    if output_format is not None:
+        write_result(result, file_path, output_format)
+    return result
+
+
+def transcribe_media_batched(
+    file_paths,
+    model_type,
+    output_format,
+    batch_size=batched.DEFAULT_BATCH_SIZE,
+    dtype="float32",
+    use_vad=False,
+    use_cache=True,
+    refresh_cache=False,
+):
+    """
+    Transcribes several files together with the throughput engine: the windows of
+    all of them share batched encoder and decoder passes (see `batched`). Cached
+    files are written straight from the cache; the others are decoded one after
+    another from ffmpeg, as the batches need them.
+
+    Yields (file_path, result, error) per file as each one is done, with either
+    the `result` or the exception that made the file fail.
+    """
+    import whisper
+
+    transcripts = cache.TranscriptCache()
+    keys = {}
+    regions = {}
+    durations = {}
+    todo = []
+
+    for file_path in file_paths:
+        try:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
+            if use_cache:
+                keys[file_path] = transcript_key(
+                    file_path, model_type, dtype=dtype, use_vad=use_vad, batch_size=batch_size
+                )
+                result = None if refresh_cache else transcripts.get(keys[file_path])
+                if result is not None:
+                    logger.info(f"Using cached transcript for '{file_path}'.")
+                    write_result(result, file_path, output_format)
+                    yield file_path, result, None
+                    continue
+        except Exception as e:
+            yield file_path, None, e
+            continue
+        todo.append(file_path)
+
+    failed = []
+
+    def sources():
+        for file_path in todo:
+            try:
+                audio = whisper.load_audio(file_path)
+            except Exception as e:
+                failed.append((file_path, RuntimeError(f"Failed to load audio: {e}")))
+                continue
+            durations[file_path] = len(audio) / SAMPLE_RATE
+            if use_vad:
+                audio, regions[file_path] = vad.speech_only(audio)
+            logger.info(f"Transcribing '{file_path}' (batched)...")
+            yield file_path, audio
+
+    def finish(file_path, result):
+        if use_vad:
+            result = vad.remap_result(result, regions.pop(file_path))
+        result = {**result, "duration": durations.pop(file_path)}
+        if file_path in keys:
+            try:
+                transcripts.put(keys[file_path], result)
+            except OSError as e:
+                logger.warning(f"Could not cache transcript: {e}")
+        write_result(result, file_path, output_format)
+        return result
+
+    if not todo:
+        return
+    reported = set()
     try:
-        # fp16=False is safer for CPU usage to avoid warnings
-        model = whisper.load_model(model_type)
+        model = models.get_model(model_type, dtype=dtype)
+        with profiling.instrument(model):
+            for file_path, result in batched.transcribe_many(model, sources(), batch_size=batch_size):
+                reported.add(file_path)
+                try:
+                    yield file_path, finish(file_path, result), None
+                except Exception as e:
+                    yield file_path, None, e
     except Exception as e:
-        raise RuntimeError(f"Failed to load model: {e}") from e
+        error = RuntimeError(f"Transcription failed: {e}")
+        reported.update(file_path for file_path, _ in failed)
+        failed.extend((file_path, error) for file_path in todo if file_path not in reported)
+
+    # Files that failed to load, and after an engine error, every file not done yet.
+    for file_path, error in failed:
+        yield file_path, None, error
+
+
+def compare_quantization_main(argv):
+    """
+    `opentranscriber-cli compare-quantization FILE`: transcribes FILE with the fp32
+    and the INT8 model and reports the speedup and the word-level difference.
+    """
+    parser = argparse.ArgumentParser(
+        prog="opentranscriber-cli compare-quantization",
+        description="Compare fp32 and INT8 quantized transcription on one file",
+    )
+    parser.add_argument("input_file", help="Path to the media file")
+    parser.add_argument(
+        "--model",
+        default="base",
+        choices=models.MODEL_NAMES,
+        help="Model size (default: base)",
+    )
+    args = parser.parse_args(argv)
 
-    logger.info(f"Transcribing '{file_path}'...")
     try:
-        # Note: fp16=False is crucial for CPU execution
-        result = model.transcribe(file_path, fp16=False)
+        from opentranscriber import quantization
+
+        quantization.compare(args.input_file, args.model)
     except Exception as e:
-        raise RuntimeError(f"Transcription failed: {e}") from e
+        logger.critical(str(e))
+        sys.exit(1)
 
-    output_directory = os.path.dirname(file_path) or "."
-    logger.info(f"Saving output as {output_format.upper()}...")
 
+def _parse_affinity(parser, text):
+    """CPU list of an --affinity option, or None; exits with a usage error if it is invalid."""
+    if not text:
+        return None
     try:
-        writer = get_writer(output_format, output_directory)
-        writer(result, file_path)
-        logger.info(f"Success! Output saved to: {os.path.abspath(output_directory)}")
+        cpus = tuning.parse_cpu_list(text)
+    except ValueError as e:
+        parser.error(str(e))
+    if not set(cpus) <= set(tuning.available_cpus()):
+        parser.error(f"--affinity: CPUs available to this process are {tuning.available_cpus()}")
+    return cpus
+
+
+def autotune_main(argv):
+    """
+    `opentranscriber-cli autotune FILE`: measures the real-time factor across thread
+    and worker counts and saves the best settings as defaults for later runs.
+    """
+    parser = argparse.ArgumentParser(
+        prog="opentranscriber-cli autotune",
+        description="Find the fastest thread and worker counts for a model on this machine",
+    )
+    parser.add_argument("input_file", help="Representative media file used as the workload")
+    parser.add_argument(
+        "--model",
+        default="base",
+        choices=models.MODEL_NAMES,
+        help="Model size (default: base)",
+    )
+    parser.add_argument("--quantize", default="none", choices=list(QUANTIZE_DTYPES), help="(default: none)")
+    parser.add_argument(
+        "--sample-seconds",
+        type=float,
+        default=tuning.DEFAULT_SAMPLE_SECONDS,
+        help=f"Seconds of the file transcribed per measurement (default: {tuning.DEFAULT_SAMPLE_SECONDS:.0f})",
+    )
+    parser.add_argument(
+        "--max-workers",
+        type=int,
+        help="Most worker processes to try (default: the CPU count, capped by the models that fit in memory)",
+    )
+    parser.add_argument(
+        "--affinity",
+        metavar="CPUS",
+        help="Tune for runs on these CPUs only, e.g. '0-15,32'; use the same --affinity when transcribing",
+    )
+    args = parser.parse_args(argv)
+    if args.max_workers is not None and args.max_workers < 1:
+        parser.error("--max-workers must be at least 1")
+    cpus = _parse_affinity(parser, args.affinity)
+
+    try:
+        tuning.autotune(
+            args.input_file,
+            args.model,
+            QUANTIZE_DTYPES[args.quantize],
+            args.sample_seconds,
+            max_workers=args.max_workers,
+            cpus=cpus,
+        )
     except Exception as e:
-        raise RuntimeError(f"Failed to save file: {e}") from e
+        logger.critical(str(e))
+        sys.exit(1)
+
+
+def reexport_main(argv):
+    """
+    `opentranscriber-cli reexport RESULT.json --format srt,vtt`: writes a saved JSON
+    result in other formats. Runs without importing whisper or torch.
+    """
+    parser = argparse.ArgumentParser(
+        prog="opentranscriber-cli reexport",
+        description="Convert a saved JSON transcription result to other formats",
+    )
+    parser.add_argument("result_file", help="JSON result written by --format json")
+    parser.add_argument(
+        "--format",
+        default="srt",
+        help=f"Output format(s), comma-separated: {', '.join(export.FORMATS)} or all (default: srt)",
+    )
+    parser.add_argument("--output-dir", help="Directory for the outputs (default: next to the JSON file)")
+    args = parser.parse_args(argv)
+
+    try:
+        formats = export.parse_formats(args.format)
+    except ValueError as e:
+        parser.error(f"--format: {e}")
+
+    try:
+        with open(args.result_file, encoding="utf-8") as f:
+            result = json.load(f)
+        if not isinstance(result, dict) or "segments" not in result:
+            raise ValueError("not a transcription result (no 'segments')")
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        for path in export.write_outputs(result, args.result_file, formats, args.output_dir):
+            logger.info(f"Saved: {os.path.abspath(path)}")
+    except (OSError, ValueError) as e:
+        logger.critical(f"Failed to re-export {args.result_file}: {e}")
+        sys.exit(1)
+
+
+SUBCOMMANDS = {
+    "autotune": autotune_main,
+    "compare-quantization": compare_quantization_main,
+    "reexport": reexport_main,
+}
+
+
+def _check_modes(parser, args, formats):
+    """Rejects transcription modes and formats that can't be combined."""
+    if args.chunk_workers < 0:
+        parser.error("--chunk-workers must not be negative")
+    if args.stream and args.chunk_workers:
+        parser.error("--stream and --chunk-workers cannot be combined")
+    if args.stream_window < 30:
+        parser.error("--stream-window must be at least 30 seconds")
+    if args.incremental and (len(formats) > 1 or formats[0] not in incremental.INCREMENTAL_FORMATS):
+        parser.error(f"--incremental writes one of these formats: {', '.join(incremental.INCREMENTAL_FORMATS)}")
+    if "jsonl" in formats and not args.incremental:
+        parser.error("--format jsonl requires --incremental")
+    if args.incremental and args.chunk_workers:
+        parser.error("--incremental and --chunk-workers cannot be combined")
+    if args.batch_size < 0:
+        parser.error("--batch-size must not be negative")
+    if args.batch_size and (args.stream or args.chunk_workers or args.incremental):
+        parser.error("--batch-size cannot be combined with --stream, --chunk-workers or --incremental")
+    if args.cascade and (args.stream or args.chunk_workers or args.incremental or args.batch_size):
+        parser.error("--cascade cannot be combined with --stream, --chunk-workers, --incremental or --batch-size")
+    if args.prefetch < 0:
+        parser.error("--prefetch must not be negative")
+    if args.prefetch_mb < 1:
+        parser.error("--prefetch-mb must be at least 1")
+    if args.prefetch and (args.stream or args.batch_size):
+        parser.error("--prefetch cannot be combined with --stream or --batch-size")
+    if args.cascade == args.model:
+        parser.error("--cascade must name a different (larger) model than --model")
 
 
 def main():
@@ -50,26 +515,265 @@ def main():
     """
     setup_logging()
 
+    if sys.argv[1:2] and sys.argv[1] in SUBCOMMANDS:
+        SUBCOMMANDS[sys.argv[1]](sys.argv[2:])
+        return
+
     parser = argparse.ArgumentParser(description="Professional Video Transcription CLI")
-    parser.add_argument("input_file", help="Path to the audio/video file")
+    parser.add_argument("input_files", nargs="*", metavar="input_file", help="Paths or glob patterns of media files")
     parser.add_argument(
         "--model",
         default="base",
-        choices=["tiny", "base", "small", "medium", "large"],
+        choices=models.MODEL_NAMES,
         help="Model size (default: base)",
     )
     parser.add_argument(
-        "--format", default="srt", choices=["txt", "srt", "vtt", "tsv", "json"], help="Output format (default: srt)"
+        "--format",
+        default="srt",
+        help="Output format(s), comma-separated, all written from one transcription: "
+        "txt, srt, vtt, tsv, json or all (default: srt); jsonl requires --incremental",
+    )
+    parser.add_argument("--manifest", help="Text file listing one media path or glob per line (batch mode)")
+    parser.add_argument(
+        "--workers",
+        type=int,
+        help="Number of worker processes for batch mode; each keeps its model loaded "
+        "(default: the autotuned value, else 1)",
+    )
+    parser.add_argument(
+        "--chunk-workers",
+        type=int,
+        default=0,
+        help="Split a single long file at silences and transcribe the chunks on this many worker processes",
+    )
+    parser.add_argument(
+        "--chunk-length",
+        type=float,
+        default=chunking.DEFAULT_CHUNK_LENGTH,
+        help=f"Target chunk length in seconds for --chunk-workers (default: {chunking.DEFAULT_CHUNK_LENGTH:.0f})",
+    )
+    parser.add_argument(
+        "--stream",
+        action="store_true",
+        help="Decode and transcribe the input window by window to keep memory flat on very long files",
+    )
+    parser.add_argument(
+        "--stream-window",
+        type=float,
+        default=streaming.DEFAULT_WINDOW,
+        help=f"Window length in seconds for --stream (default: {streaming.DEFAULT_WINDOW:.0f})",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Stream the input, append each finished segment to the output right away and checkpoint progress, "
+        "so an interrupted run resumes where it stopped",
     )
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=0,
+        help="Throughput engine: cut the input at pauses into 30-second windows and decode this many windows "
+        "per encoder/decoder pass; in batch mode, windows of several files share a pass",
+    )
+    parser.add_argument(
+        "--prefetch",
+        type=int,
+        default=0,
+        help="Batch mode: hash, look up and decode up to this many upcoming files in the background while the "
+        "model transcribes the current one, and write outputs off the critical path (e.g. "
+        f"{pipeline.DEFAULT_PREFETCH})",
+    )
+    parser.add_argument(
+        "--prefetch-mb",
+        type=int,
+        default=pipeline.DEFAULT_PREFETCH_MB,
+        help=f"Memory cap for the decoded audio held by --prefetch, in MB (default: {pipeline.DEFAULT_PREFETCH_MB})",
+    )
+    parser.add_argument(
+        "--cascade",
+        metavar="MODEL",
+        choices=["tiny", "base", "small", "medium", "large"],
+        help="Transcribe with --model first, then re-transcribe only the segments it is unsure of with this "
+        "larger model and merge them in; reports how much audio was escalated",
+    )
+    parser.add_argument(
+        "--cascade-logprob",
+        type=float,
+        default=cascade.DEFAULT_THRESHOLDS.logprob,
+        help=f"Escalate segments with an average log-probability below this "
+        f"(default: {cascade.DEFAULT_THRESHOLDS.logprob})",
+    )
+    parser.add_argument(
+        "--cascade-no-speech",
+        type=float,
+        default=cascade.DEFAULT_THRESHOLDS.no_speech,
+        help=f"Escalate segments with a no-speech probability above this "
+        f"(default: {cascade.DEFAULT_THRESHOLDS.no_speech})",
+    )
+    parser.add_argument(
+        "--cascade-compression",
+        type=float,
+        default=cascade.DEFAULT_THRESHOLDS.compression_ratio,
+        help=f"Escalate segments with a compression ratio above this "
+        f"(default: {cascade.DEFAULT_THRESHOLDS.compression_ratio})",
+    )
+    parser.add_argument(
+        "--vad",
+        action="store_true",
+        help="Detect speech first and transcribe only that, skipping silence and noise; "
+        "timestamps stay on the original timeline",
+    )
+    parser.add_argument(
+        "--quantize",
+        default="none",
+        choices=list(QUANTIZE_DTYPES),
+        help="Run a dynamically quantized model on the CPU; the quantized weights are cached (default: none)",
+    )
+    parser.add_argument(
+        "--threads",
+        type=int,
+        help="Torch intra-op threads per process (default: the autotuned value for a single file, "
+        "an equal share of the CPUs per worker otherwise)",
+    )
+    parser.add_argument("--interop-threads", type=int, help="Torch inter-op threads per process")
+    parser.add_argument(
+        "--affinity",
+        metavar="CPUS",
+        help="Run on these CPUs only, e.g. '0-15,32'; worker processes are pinned to disjoint slices of them",
+    )
+    parser.add_argument(
+        "--profile",
+        action="store_true",
+        help="Print how long each stage took (model load, ffmpeg, mel, encoder, decoder, writer...)",
+    )
+    parser.add_argument(
+        "--profile-output", metavar="FILE", help="Also write the timing spans to FILE (implies --profile)"
+    )
+    parser.add_argument(
+        "--profile-format",
+        default="chrome",
+        choices=profiling.PROFILE_FORMATS,
+        help="Format of --profile-output: Chrome trace (chrome://tracing, Perfetto) or plain JSON (default: chrome)",
+    )
+    parser.add_argument("--no-cache", action="store_true", help="Neither read nor write the transcript cache")
+    parser.add_argument("--refresh", action="store_true", help="Ignore cached transcripts and overwrite them")
 
     args = parser.parse_args()
 
+    if not args.input_files and not args.manifest:
+        parser.error("at least one input_file or --manifest is required")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.threads is not None and args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.interop_threads is not None and args.interop_threads < 1:
+        parser.error("--interop-threads must be at least 1")
+    cpus = _parse_affinity(parser, args.affinity)
     try:
-        transcribe_media(args.input_file, args.model, args.format)
+        formats = export.parse_formats(args.format, export.FORMATS + ["jsonl"])
+    except ValueError as e:
+        parser.error(f"--format: {e}")
+    _check_modes(parser, args, formats)
+    thresholds = cascade.Thresholds(args.cascade_logprob, args.cascade_no_speech, args.cascade_compression)
+
+    dtype = QUANTIZE_DTYPES[args.quantize]
+    tuned = tuning.saved_settings(args.model, dtype, cpus)
+
+    is_batch = args.manifest or (args.workers or 1) > 1 or len(args.input_files) > 1
+    if is_batch and args.incremental:
+        parser.error("--incremental applies to a single input file")
+    if is_batch and args.chunk_workers:
+        parser.error("--chunk-workers applies to a single input file; use --workers for batches")
+    if args.prefetch and not (is_batch or any(batch.has_glob(p) for p in args.input_files)):
+        parser.error("--prefetch applies to batch mode")
+    profile = args.profile or args.profile_output
+    if profile and (is_batch or args.chunk_workers or any(batch.has_glob(p) for p in args.input_files)):
+        parser.error("--profile applies to a single input file transcribed in this process")
+    if is_batch or any(batch.has_glob(p) for p in args.input_files):
+        try:
+            files = batch.collect_inputs(args.input_files, args.manifest)
+        except OSError as e:
+            logger.critical(f"Failed to read manifest: {e}")
+            sys.exit(1)
+
+        # Threads left unset are split evenly among the workers.
+        tuning.configure(args.threads, args.interop_threads, cpus)
+
+        if args.batch_size:
+            options = {"batch_size": args.batch_size}
+        else:
+            options = {
+                "stream_window": args.stream_window if args.stream else None,
+                "cascade_model": args.cascade,
+                "cascade_thresholds": thresholds,
+            }
+            if args.prefetch:
+                options.update(prefetch=args.prefetch, prefetch_mb=args.prefetch_mb)
+        failures = batch.run_batch(
+            files,
+            args.model,
+            formats,
+            workers=args.workers or tuned.get("workers", 1),
+            dtype=dtype,
+            use_vad=args.vad,
+            use_cache=not args.no_cache,
+            refresh_cache=args.refresh,
+            **options,
+        )
+        sys.exit(1 if failures else 0)
+
+    if args.chunk_workers:
+        tuning.configure(args.threads, args.interop_threads, cpus)
+    else:
+        tuning.configure(args.threads or tuned.get("threads"), args.interop_threads, cpus)
+
+    profiler = profiling.Profiler() if profile else None
+    try:
+        with profiling.activate(profiler), profiling.span("run"):
+            if args.incremental:
+                if not os.path.exists(args.input_files[0]):
+                    raise FileNotFoundError(f"File not found: {args.input_files[0]}")
+                model = models.get_model(args.model, dtype=dtype)
+                with profiling.instrument(model):
+                    incremental.transcribe_incremental(
+                        model,
+                        args.input_files[0],
+                        args.model,
+                        formats[0],
+                        window_seconds=args.stream_window,
+                        use_vad=args.vad,
+                    )
+            else:
+                transcribe_media(
+                    args.input_files[0],
+                    args.model,
+                    formats,
+                    chunk_workers=args.chunk_workers,
+                    chunk_length=args.chunk_length,
+                    stream_window=args.stream_window if args.stream else None,
+                    dtype=dtype,
+                    use_vad=args.vad,
+                    use_cache=not args.no_cache,
+                    refresh_cache=args.refresh,
+                    batch_size=args.batch_size,
+                    cascade_model=args.cascade,
+                    cascade_thresholds=thresholds,
+                )
     except Exception as e:
         logger.critical(str(e))
         sys.exit(1)
 
+    if profiler:
+        for line in profiler.report():
+            logger.info(line)
+        if args.profile_output:
+            try:
+                profiler.save(args.profile_output, args.profile_format)
+                logger.info(f"Profile saved to: {os.path.abspath(args.profile_output)}")
+            except OSError as e:
+                logger.error(f"Could not save profile: {e}")
+
 
 if __name__ == "__main__":
     main()
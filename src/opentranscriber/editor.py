@@ -0,0 +1,336 @@
+import bisect
+import re
+import tkinter as tk
+from collections import defaultdict
+
+import numpy as np
+
+_WORD = re.compile(r"\w+")
+
+ROW_COLOR = "#f7f7f7"
+PLAYING_COLOR = "#fff2b3"
+MATCH_COLOR = "#d6e8ff"
+
+
+def _words(text):
+    return _WORD.findall(text.lower())
+
+
+class SearchIndex:
+    """
+    Inverted index from lower-cased words to the segments containing them, kept up
+    to date as segments are edited.
+    """
+
+    def __init__(self, texts=()):
+        self._postings = defaultdict(set)
+        self._segment_words = {}
+        for index, text in enumerate(texts):
+            self.update(index, text)
+
+    def update(self, index, text):
+        old = self._segment_words.get(index, set())
+        new = set(_words(text))
+        for word in old - new:
+            self._postings[word].discard(index)
+            if not self._postings[word]:
+                del self._postings[word]
+        for word in new - old:
+            self._postings[word].add(index)
+        self._segment_words[index] = new
+
+    def search(self, query):
+        """
+        Sorted indices of the segments containing every word of `query`. The last
+        word also matches as a prefix, so results show up while typing.
+        """
+        words = _words(query)
+        if not words:
+            return []
+
+        *whole, last = words
+        matches = set().union(*(ids for word, ids in self._postings.items() if word.startswith(last)))
+        for word in whole:
+            matches &= self._postings.get(word, set())
+        return sorted(matches)
+
+
+def segment_at(starts, seconds):
+    """Index of the segment playing at `seconds`, given the sorted segment start times."""
+    return max(0, bisect.bisect_right(starts, seconds) - 1)
+
+
+class _Row:
+    """One recycled row: time label, play button and text box, bound to one segment at a time."""
+
+    def __init__(self, view):
+        self.index = None
+        self.frame = tk.Frame(view.body, pady=5, padx=5, bg=ROW_COLOR)
+        self.label = tk.Label(self.frame, font=("Consolas", 8), width=6, bg=ROW_COLOR)
+        self.label.pack(side=tk.LEFT)
+        self.button = tk.Button(self.frame, text="▶", command=lambda: view.on_play(self.index))
+        self.button.pack(side=tk.LEFT, padx=5)
+        self.text = tk.Text(self.frame, height=view.ROW_LINES, width=50, wrap="word", font=("Arial", 10))
+        self.text.pack(side=tk.LEFT, fill="x", expand=True, padx=5)
+        self.text.bind("<<Modified>>", lambda e: view._on_modified(self))
+
+        for widget in (self.frame, self.label, self.button, self.text):
+            view._bind_wheel(widget)
+
+    def set_color(self, color):
+        self.frame.config(bg=color)
+        self.label.config(bg=color)
+
+
+class SegmentListView(tk.Frame):
+    """
+    Editable list of all segments that scrolls through them continuously.
+
+    Only as many row widgets as fit on screen are ever created; scrolling re-binds
+    the same rows to other segments, so a transcript with thousands of segments
+    opens and scrolls as fast as one with ten. `starts` are the segment start
+    times; segment texts are read through
+    `text_of(index)` and every edit is reported through `on_edit(index, text)`.
+    """
+
+    ROW_LINES = 3
+
+    def __init__(self, master, starts, text_of, on_edit, on_play, format_time, **kwargs):
+        super().__init__(master, **kwargs)
+        self.starts = starts
+        self.text_of = text_of
+        self.on_edit = on_edit
+        self.on_play = lambda index: on_play(float(self.starts[index]))
+        self.format_time = format_time
+
+        self.top = 0
+        self.rows = []
+        self.playing = None
+        self.matches = set()
+
+        self.scrollbar = tk.Scrollbar(self, orient="vertical", command=self._on_scrollbar)
+        self.scrollbar.pack(side=tk.RIGHT, fill="y")
+        self.body = tk.Frame(self)
+        self.body.pack(side=tk.LEFT, fill="both", expand=True)
+        self.body.bind("<Configure>", self._on_resize)
+        self._bind_wheel(self.body)
+
+        # Measure one row to know how many fit.
+        self.rows.append(_Row(self))
+        self.update_idletasks()
+        self.row_height = max(1, self.rows[0].frame.winfo_reqheight())
+        self._render()
+
+    # --- Layout -------------------------------------------------------------
+
+    @property
+    def visible_rows(self):
+        return max(1, self.body.winfo_height() // self.row_height)
+
+    def _on_resize(self, event):
+        needed = -(-event.height // self.row_height)  # partially visible rows count too
+        while len(self.rows) < needed:
+            self.rows.append(_Row(self))
+        self.scroll_to_top(self.top)
+
+    def _render(self):
+        for offset, row in enumerate(self.rows):
+            index = self.top + offset
+            if index >= len(self.starts):
+                row.frame.place_forget()
+                continue
+
+            if row.index != index:
+                self._bind_row(row, index)
+            if index == self.playing:
+                row.set_color(PLAYING_COLOR)
+            elif index in self.matches:
+                row.set_color(MATCH_COLOR)
+            else:
+                row.set_color(ROW_COLOR)
+            row.frame.place(x=0, y=offset * self.row_height, relwidth=1, height=self.row_height)
+
+        total = max(len(self.starts), 1)
+        self.scrollbar.set(self.top / total, min(1.0, (self.top + self.visible_rows) / total))
+
+    def _bind_row(self, row, index):
+        row.index = index
+        row.label.config(text=self.format_time(self.starts[index]))
+        row.text.delete("1.0", "end")
+        row.text.insert("1.0", self.text_of(index))
+        # Neither the load nor the previous segment's edits are changes to this segment.
+        row.text.edit_reset()
+        row.text.edit_modified(False)
+
+    def _on_modified(self, row):
+        if row.index is None or not row.text.edit_modified():
+            return
+        row.text.edit_modified(False)
+        self.on_edit(row.index, row.text.get("1.0", "end-1c"))
+
+    # --- Scrolling ----------------------------------------------------------
+
+    def scroll_to_top(self, index):
+        """Scrolls so that segment `index` is the first row."""
+        self.top = max(0, min(int(index), len(self.starts) - self.visible_rows))
+        self._render()
+
+    def show(self, index):
+        """Scrolls segment `index` into view (a third down from the top) unless it is visible already."""
+        if not self.top <= index < self.top + self.visible_rows:
+            self.scroll_to_top(index - self.visible_rows // 3)
+
+    def _on_scrollbar(self, action, amount, unit=None):
+        if action == "moveto":
+            self.scroll_to_top(round(float(amount) * len(self.starts)))
+        elif unit == "pages":
+            self.scroll_to_top(self.top + int(amount) * self.visible_rows)
+        else:
+            self.scroll_to_top(self.top + int(amount))
+
+    def _bind_wheel(self, widget):
+        widget.bind("<MouseWheel>", self._on_wheel)
+        widget.bind("<Button-4>", lambda e: self._scroll_rows(-3))
+        widget.bind("<Button-5>", lambda e: self._scroll_rows(3))
+
+    def _on_wheel(self, event):
+        return self._scroll_rows(-3 if event.delta > 0 else 3)
+
+    def _scroll_rows(self, rows):
+        self.scroll_to_top(self.top + rows)
+        return "break"  # don't also scroll the text box under the pointer
+
+    # --- Highlighting -------------------------------------------------------
+
+    def set_playing(self, index):
+        if index != self.playing:
+            self.playing = index
+            self._render()
+
+    def set_matches(self, indices):
+        self.matches = set(indices)
+        self._render()
+
+
+class WaveformTimeline(tk.Canvas):
+    """
+    Zoomable waveform of the whole recording, drawn from a `waveform.PeakPyramid`,
+    with the segment boundaries, the playing segment and the playhead on top.
+
+    Every redraw costs O(width): the envelope comes from the pyramid level that
+    matches the zoom, and at most one boundary line is drawn per pixel column.
+    Click to seek, scroll to zoom around the pointer, Shift+scroll to pan.
+    """
+
+    MIN_SPAN = 5.0  # seconds visible at the highest zoom
+
+    def __init__(self, master, starts, ends, on_seek, height=70, **kwargs):
+        super().__init__(master, height=height, bg="white", highlightthickness=0, **kwargs)
+        self.starts = np.asarray(starts, dtype=np.float64)
+        self.ends = np.asarray(ends, dtype=np.float64)
+        self.on_seek = on_seek
+        self.peaks = None
+        self.duration = float(self.ends[-1]) if len(self.ends) else 0.0
+        self.view = (0.0, max(self.duration, self.MIN_SPAN))
+        self.position = 0.0
+        self.playing = None
+
+        self.bind("<Configure>", lambda e: self.redraw())
+        self.bind("<Button-1>", self._on_click)
+        self.bind("<MouseWheel>", lambda e: self._on_wheel(e, -1 if e.delta > 0 else 1))
+        self.bind("<Shift-MouseWheel>", lambda e: self._pan(-0.2 if e.delta > 0 else 0.2))
+        self.bind("<Button-4>", lambda e: self._on_wheel(e, -1))
+        self.bind("<Button-5>", lambda e: self._on_wheel(e, 1))
+        self.bind("<Shift-Button-4>", lambda e: self._pan(-0.2))
+        self.bind("<Shift-Button-5>", lambda e: self._pan(0.2))
+
+    def set_peaks(self, peaks):
+        self.peaks = peaks
+        self.duration = max(self.duration, peaks.duration)
+        self.view = (0.0, max(self.duration, self.MIN_SPAN))
+        self.redraw()
+
+    def set_position(self, seconds, playing=None):
+        """Moves the playhead (and highlights segment `playing`), paging the view along when it leaves it."""
+        changed = playing != self.playing
+        self.position = seconds
+        self.playing = playing
+        start, end = self.view
+        if not start <= seconds < end:
+            span = end - start
+            self._set_view(seconds - span * 0.1, seconds + span * 0.9)
+        elif changed:
+            self.redraw()
+        else:
+            x = self._to_x(seconds)
+            self.coords("playhead", x, 0, x, self.winfo_height())
+
+    # --- Coordinates --------------------------------------------------------
+
+    def _to_x(self, seconds):
+        start, end = self.view
+        return (seconds - start) / (end - start) * max(self.winfo_width(), 1)
+
+    def _to_seconds(self, x):
+        start, end = self.view
+        return start + x / max(self.winfo_width(), 1) * (end - start)
+
+    def _set_view(self, start, end):
+        limit = max(self.duration, self.MIN_SPAN)
+        span = min(max(end - start, self.MIN_SPAN), limit)
+        start = min(max(start, 0.0), limit - span)
+        self.view = (start, start + span)
+        self.redraw()
+
+    def _on_click(self, event):
+        self.on_seek(min(max(self._to_seconds(event.x), 0.0), self.duration))
+
+    def _on_wheel(self, event, direction):
+        anchor = self._to_seconds(event.x)
+        scale = 1.25 if direction > 0 else 0.8
+        start, end = self.view
+        self._set_view(anchor - (anchor - start) * scale, anchor + (end - anchor) * scale)
+        return "break"
+
+    def _pan(self, fraction):
+        start, end = self.view
+        shift = (end - start) * fraction
+        self._set_view(start + shift, end + shift)
+        return "break"
+
+    # --- Drawing ------------------------------------------------------------
+
+    def redraw(self):
+        self.delete("all")
+        width, height = self.winfo_width(), self.winfo_height()
+        if width < 2 or height < 2:
+            return
+        start, end = self.view
+        middle = height / 2
+
+        if self.playing is not None:
+            x0, x1 = self._to_x(self.starts[self.playing]), self._to_x(self.ends[self.playing])
+            self.create_rectangle(x0, 0, x1, height, fill=PLAYING_COLOR, outline="")
+
+        # Segment boundaries, collapsed to distinct pixel columns.
+        first = np.searchsorted(self.ends, start)
+        last = np.searchsorted(self.starts, end)
+        edges = np.concatenate([self.starts[first:last], self.ends[first:last]])
+        for x in np.unique(((edges - start) / (end - start) * width).astype(np.int64)):
+            self.create_line(x, 0, x, height, fill="#c8c8c8")
+
+        if self.peaks is None:
+            self.create_text(width / 2, middle, text="Preparing waveform...", fill="gray")
+        else:
+            mins, maxs, rms = self.peaks.columns(start, end, width)
+            xs = np.arange(width)
+            self._envelope(xs, middle - maxs * middle, middle - mins * middle, "#7a9cc6")
+            self._envelope(xs, middle - rms * middle, middle + rms * middle, "#35608f")
+
+        x = self._to_x(self.position)
+        self.create_line(x, 0, x, height, fill="red", width=2, tags="playhead")
+
+    def _envelope(self, xs, top, bottom, color):
+        """One polygon through the upper edge left to right and the lower edge back."""
+        points = np.concatenate([np.stack([xs, top], axis=1), np.stack([xs[::-1], bottom[::-1]], axis=1)])
+        self.create_polygon(points.ravel().tolist(), fill=color, outline="")
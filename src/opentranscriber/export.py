@@ -0,0 +1,136 @@
+import json
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+# Output formats, rendered exactly like whisper's writers but without importing
+# whisper (and torch), so exporting works in a process that never loads a model.
+FORMATS = ["txt", "srt", "vtt", "tsv", "json"]
+
+
+def format_timestamp(seconds, always_include_hours=False, decimal_marker="."):
+    """Same as `whisper.utils.format_timestamp`."""
+    milliseconds = round(max(seconds, 0.0) * 1000.0)
+    hours, milliseconds = divmod(milliseconds, 3_600_000)
+    minutes, milliseconds = divmod(milliseconds, 60_000)
+    seconds, milliseconds = divmod(milliseconds, 1_000)
+    hours_marker = f"{hours:02d}:" if always_include_hours or hours > 0 else ""
+    return f"{hours_marker}{minutes:02d}:{seconds:02d}{decimal_marker}{milliseconds:03d}"
+
+
+# Text written before the first segment, for the formats that have one.
+HEADERS = {"vtt": "WEBVTT\n\n", "tsv": "start\tend\ttext\n"}
+
+
+def _subtitle_text(segment):
+    return segment["text"].strip().replace("-->", "->")
+
+
+def render_segment(segment, output_format, index):
+    """
+    One segment of a txt, srt, vtt or tsv file; `index` is its 0-based position
+    (SRT numbers its cues). A file is its format's header followed by its segments.
+    """
+    if output_format == "txt":
+        return f"{segment['text'].strip()}\n"
+    if output_format == "srt":
+        start = format_timestamp(segment["start"], always_include_hours=True, decimal_marker=",")
+        end = format_timestamp(segment["end"], always_include_hours=True, decimal_marker=",")
+        return f"{index + 1}\n{start} --> {end}\n{_subtitle_text(segment)}\n\n"
+    if output_format == "vtt":
+        start = format_timestamp(segment["start"])
+        end = format_timestamp(segment["end"])
+        return f"{start} --> {end}\n{_subtitle_text(segment)}\n\n"
+    if output_format == "tsv":
+        text = segment["text"].strip().replace("\t", " ")
+        return f"{round(1000 * segment['start'])}\t{round(1000 * segment['end'])}\t{text}\n"
+    raise ValueError(f"Not a per-segment format: {output_format}")
+
+
+def _render_segments(result, output_format):
+    segments = (render_segment(segment, output_format, i) for i, segment in enumerate(result["segments"]))
+    return HEADERS.get(output_format, "") + "".join(segments)
+
+
+def render_txt(result):
+    return _render_segments(result, "txt")
+
+
+def render_srt(result):
+    return _render_segments(result, "srt")
+
+
+def render_vtt(result):
+    return _render_segments(result, "vtt")
+
+
+def render_tsv(result):
+    return _render_segments(result, "tsv")
+
+
+def render_json(result):
+    return json.dumps(result)
+
+
+RENDERERS = {
+    "txt": render_txt,
+    "srt": render_srt,
+    "vtt": render_vtt,
+    "tsv": render_tsv,
+    "json": render_json,
+}
+
+
+def render(result, output_format):
+    """The text of `result` in `output_format`."""
+    return RENDERERS[output_format](result)
+
+
+def parse_formats(text, allowed=FORMATS):
+    """
+    Parses a comma-separated format list such as "srt,vtt,json" ("all" for every
+    format in `allowed`). Returns the formats in the order given, without duplicates.
+    """
+    formats = []
+    for name in text.lower().split(","):
+        name = name.strip()
+        if name == "all":
+            formats.extend(candidate for candidate in allowed if candidate in RENDERERS)
+        elif name in allowed:
+            formats.append(name)
+        elif name:
+            raise ValueError(f"invalid format {name!r} (choose from {', '.join(allowed)}, all)")
+    if not formats:
+        raise ValueError("no output format given")
+    return list(dict.fromkeys(formats))
+
+
+def output_path(file_path, output_format, output_directory=None):
+    """`<output_directory>/<media basename>.<output_format>`, next to the media by default."""
+    output_directory = output_directory or os.path.dirname(file_path) or "."
+    basename = os.path.splitext(os.path.basename(file_path))[0]
+    return os.path.join(output_directory, f"{basename}.{output_format}")
+
+
+def _write(result, file_path, output_format, output_directory):
+    path = output_path(file_path, output_format, output_directory)
+    text = render(result, output_format)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+    return path
+
+
+def write_outputs(result, file_path, formats, output_directory=None):
+    """
+    Writes `result` in every format of `formats` from the one in-memory result,
+    the formats side by side on a thread each. Returns the written paths.
+    """
+    formats = [formats] if isinstance(formats, str) else list(formats)
+    if len(formats) == 1:
+        return [_write(result, file_path, formats[0], output_directory)]
+
+    with ThreadPoolExecutor(max_workers=len(formats), thread_name_prefix="export") as executor:
+        futures = [executor.submit(_write, result, file_path, fmt, output_directory) for fmt in formats]
+        return [future.result() for future in futures]
@@ -1,51 +1,53 @@
+import bisect
 import logging
 import os
-import sys
 import threading
+import time
 import tkinter as tk
+import wave
 import webbrowser
 from tkinter import filedialog, messagebox, ttk
 
-import pygame
-import whisper
-import whisper.transcribe
-from whisper.utils import get_writer
-
-from opentranscriber import setup_ffmpeg_path, setup_logging
+# pygame, whisper and torch take seconds to import. They are imported where they
+# are used, and preloaded in the background once the window is up.
+from opentranscriber import (
+    cache,
+    cancellation,
+    cascade,
+    editor,
+    export,
+    models,
+    preview,
+    profiling,
+    progressbar,
+    segment_store,
+    setup_ffmpeg_path,
+    setup_logging,
+    tuning,
+    vad,
+    waveform,
+)
 
 logger = logging.getLogger(__name__)
 
+# Output formats offered in the GUI; every ticked one is written on save.
+GUI_FORMATS = ["srt", "vtt", "txt", "json"]
+CASCADE_OFF = "off"
+
 
-class TkinterTqdm:
+def _preload_heavy_modules():
     """
-    A specific tqdm-like class that redirects progress to a Tkinter progress bar.
+    Imports pygame, whisper and torch ahead of their first use. Runs on a background
+    thread; code that needs a module before this finishes waits on the import lock.
     """
-
-    def __init__(self, *args, **kwargs):
-        self.total = kwargs.get("total", 100)
-        self.current = 0
-        self.unit = kwargs.get("unit", "it")
-        self.on_progress = getattr(TkinterTqdm, "on_progress_callback", None)
-
-    def update(self, n=1):
-        self.current += n
-        if self.on_progress:
-            self.on_progress(self.current, self.total)
-
-    def close(self):
-        pass
-
-    def __enter__(self):
-        return self
-
-    def __exit__(self, *args):
-        self.close()
-
-
-class TqdmShim:
-    """Shim for whisper versions that import tqdm as a module."""
-
-    tqdm = TkinterTqdm
+    start = time.perf_counter()
+    try:
+        import pygame  # noqa: F401
+        import whisper.transcribe  # noqa: F401
+    except Exception as e:
+        logger.warning(f"Background import failed: {e}")
+        return
+    logger.info(f"Background import finished in {time.perf_counter() - start:.1f}s.")
 
 
 class TranscriberApp:
@@ -58,25 +60,51 @@ class TranscriberApp:
         self.output_dir = None
         self.audio_path = None
         self.transcription_result = None
-        self.segment_widgets = []
-
-        # Pagination & Audio State
-        self.current_page = 0
-        self.PAGE_SIZE = 50
+        self.transcript_key = None
+
+        # Editor & Audio State
+        self.segment_view = None
+        self.search_index = None
+        self.search_matches = []
+        self.match_cursor = -1
+        self.store = None  # the segments being edited (segment_store.SegmentStore)
         self.audio_total_duration = 0
         self.audio_start_offset = 0
         self.is_user_seeking = False
+        self.preview_future = None
+        self.player_ready = False
 
         # Threading
         self.cancel_event = threading.Event()
         self.worker_thread = None
+        self.profiler = None
 
         # Config
         self.model_var = tk.StringVar(value="base")
-        self.format_var = tk.StringVar(value="srt")
+        self.format_vars = {fmt: tk.BooleanVar(value=fmt == "srt") for fmt in GUI_FORMATS}
+        self.quantize_var = tk.BooleanVar(value=False)
+        self.vad_var = tk.BooleanVar(value=False)
+        self.cascade_var = tk.StringVar(value=CASCADE_OFF)
 
         # Start with the Main Menu
         self.setup_main_menu()
+        self.root.after(200, self._start_preloading)
+
+    def _start_preloading(self):
+        threading.Thread(target=_preload_heavy_modules, daemon=True).start()
+        self.preload_model()
+        # Load whichever model is selected next instead (cancelling the previous load).
+        self.model_var.trace_add("write", lambda *args: self.preload_model())
+        self.quantize_var.trace_add("write", lambda *args: self.preload_model())
+
+    def _selected_dtype(self):
+        return "int8" if self.quantize_var.get() else "float32"
+
+    def preload_model(self):
+        """Loads the selected model in the background, so a transcription can start without waiting for it."""
+        model_size, dtype = self.model_var.get(), self._selected_dtype()
+        tuning.configure(threads=tuning.saved_settings(model_size, dtype).get("threads"))
+        models.preload_model(model_size, dtype=dtype)
 
     # =========================================================================
     # VIEW 1: Main Menu (Selection & Config)
@@ -103,11 +131,31 @@ class TranscriberApp:
         )
         self.model_menu.pack(side=tk.LEFT, padx=5)
 
-        tk.Label(options_frame, text="Format:").pack(side=tk.LEFT, padx=5)
-        self.format_menu = ttk.Combobox(
-            options_frame, textvariable=self.format_var, values=["srt", "txt"], state="readonly", width=6
+        self.quantize_check = tk.Checkbutton(options_frame, text="INT8 (faster on CPU)", variable=self.quantize_var)
+        self.quantize_check.pack(side=tk.LEFT, padx=5)
+
+        self.vad_check = tk.Checkbutton(options_frame, text="Skip silence", variable=self.vad_var)
+        self.vad_check.pack(side=tk.LEFT, padx=5)
+
+        # Cascade: segments the selected model is unsure of are redone with a larger one.
+        tk.Label(options_frame, text="Refine with:").pack(side=tk.LEFT, padx=5)
+        self.cascade_menu = ttk.Combobox(
+            options_frame,
+            textvariable=self.cascade_var,
+            values=[CASCADE_OFF, "small", "medium"],
+            state="readonly",
+            width=8,
         )
-        self.format_menu.pack(side=tk.LEFT, padx=5)
+        self.cascade_menu.pack(side=tk.LEFT, padx=5)
+
+        formats_frame = tk.Frame(self.root)
+        formats_frame.pack(pady=5)
+        tk.Label(formats_frame, text="Formats:").pack(side=tk.LEFT, padx=5)
+        self.format_checks = []
+        for fmt in GUI_FORMATS:
+            check = tk.Checkbutton(formats_frame, text=fmt.upper(), variable=self.format_vars[fmt])
+            check.pack(side=tk.LEFT, padx=2)
+            self.format_checks.append(check)
 
         # File Selection
         self.label_file = tk.Label(self.root, text="No file selected", fg="gray", wraplength=400)
@@ -166,16 +214,19 @@ class TranscriberApp:
         link_coffee.bind("<Button-1>", lambda e: webbrowser.open("https://www.buymeacoffee.com/danielcollier"))
 
     # =========================================================================
-    # VIEW 2: Editor (Paginated & Slider)
+    # VIEW 2: Editor (Virtualized List & Slider)
     # =========================================================================
     def setup_editor_ui(self):
         self._clear_window()
         self.root.title(f"Editor - {os.path.basename(self.audio_path)}")
 
-        # Calculate Duration
-        segments = self.transcription_result.get("segments", [])
-        if segments:
-            self.audio_total_duration = segments[-1]["end"]
+        # Only the compact store is kept; the full result stays in the transcript cache.
+        self.store = segment_store.SegmentStore.from_result(self.transcription_result)
+        cascade_report = self.transcription_result.get("cascade")
+        self.transcription_result = None
+        restored = self.store.open_journal(segment_store.journal_path(self.transcript_key))
+        if len(self.store):
+            self.audio_total_duration = float(self.store.ends[-1])
         else:
             self.audio_total_duration = 100  # Fallback
 
@@ -189,14 +240,39 @@ class TranscriberApp:
 
         tk.Button(btn_row, text="⏸ Pause/Play", command=self.pause_audio).pack(side=tk.LEFT)
 
-        # Pagination Controls
-        tk.Button(btn_row, text="< Prev Page", command=self.prev_page).pack(side=tk.LEFT, padx=20)
-        self.lbl_page = tk.Label(btn_row, text="Page 1", bg="#f0f0f0")
-        self.lbl_page.pack(side=tk.LEFT)
-        tk.Button(btn_row, text="Next Page >", command=self.next_page).pack(side=tk.LEFT, padx=20)
+        tk.Button(btn_row, text="⌖ Go to Playback", command=self.show_playing_segment).pack(side=tk.LEFT, padx=10)
+
+        # Search
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.search_segments())
+        search_entry = tk.Entry(btn_row, textvariable=self.search_var, width=20)
+        search_entry.pack(side=tk.LEFT, padx=5)
+        search_entry.bind("<Return>", lambda e: self.next_match())
+        tk.Button(btn_row, text="Find Next", command=self.next_match).pack(side=tk.LEFT)
+        self.lbl_matches = tk.Label(btn_row, text="", bg="#f0f0f0", width=8)
+        self.lbl_matches.pack(side=tk.LEFT)
 
         tk.Button(btn_row, text="💾 Save & Finish", command=self.save_edits, bg="#ddffdd").pack(side=tk.RIGHT)
 
+        # Edits are journaled as they are typed; a reopened transcript gets them back.
+        restored_text = f"↺ {restored} edit(s) restored" if restored else ""
+        self.lbl_autosave = tk.Label(btn_row, text=restored_text, bg="#f0f0f0", fg="green")
+        self.lbl_autosave.pack(side=tk.RIGHT, padx=10)
+
+        # How much of the audio the cascade re-transcribed with the larger model
+        if cascade_report:
+            tk.Label(
+                btn_row,
+                text=f"⇪ {cascade_report['escalated_share']:.0%} refined with {cascade_report['model']}",
+                bg="#f0f0f0",
+                fg="gray",
+            ).pack(side=tk.RIGHT, padx=10)
+
+        # Where the transcription time went (empty for cached transcripts)
+        timings = self.profiler.brief() if self.profiler else ""
+        if timings:
+            tk.Label(btn_row, text=f"⏱ {timings}", bg="#f0f0f0", fg="gray").pack(side=tk.RIGHT, padx=10)
+
         # Bottom Row: Slider
         slider_row = tk.Frame(header_frame, bg="#f0f0f0")
         slider_row.pack(fill="x", padx=10)
@@ -217,99 +293,97 @@ class TranscriberApp:
         self.lbl_time = tk.Label(slider_row, text="00:00", bg="#f0f0f0", width=6)
         self.lbl_time.pack(side=tk.LEFT)
 
-        # 2. Editor Area (Scrollable)
-        canvas = tk.Canvas(self.root)
-        scrollbar = tk.Scrollbar(self.root, orient="vertical", command=canvas.yview)
-        self.scrollable_frame = tk.Frame(canvas)
-
-        self.scrollable_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
+        # Waveform: click to seek, scroll to zoom
+        self.timeline = editor.WaveformTimeline(header_frame, self.store.starts, self.store.ends, on_seek=self.seek_to)
+        self.timeline.pack(fill="x", padx=10, pady=5)
+
+        # 2. Editor Area (only the visible rows exist as widgets)
+        self.search_index = editor.SearchIndex(self.store.texts())
+        self.search_matches = []
+        self.match_cursor = -1
+        self.segment_view = editor.SegmentListView(
+            self.root,
+            self.store.starts,
+            text_of=self.store.text,
+            on_edit=self.on_segment_edit,
+            on_play=self.play_segment,
+            format_time=self._format_time,
+        )
+        self.segment_view.pack(fill="both", expand=True)
+
+        # 3. Initialize Audio from the preview track (extraction started with the transcription)
+        self.player_ready = False
+        self.preview_future = preview.prepare(self.audio_path)
+        self.lbl_time.config(text="--:--")
+        self._load_player(self.preview_future)
+
+    def _load_player(self, future):
+        """Loads the preview track into the player as soon as it has been extracted."""
+        if future is not self.preview_future or not self.segment_view.winfo_exists():
+            return  # the editor was closed meanwhile
+        if not future.done():
+            self.root.after(200, lambda: self._load_player(future))
+            return
 
-        canvas.create_window((0, 0), window=self.scrollable_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
+        try:
+            import pygame
 
-        canvas.pack(side="left", fill="both", expand=True)
-        scrollbar.pack(side="right", fill="y")
+            path = future.result()
+            with wave.open(path, "rb") as track:
+                self.audio_total_duration = track.getnframes() / track.getframerate()
+            self.slider.config(to=self.audio_total_duration)
+            try:
+                self.timeline.set_peaks(waveform.PeakPyramid.load(preview.peaks_path(path)))
+            except (OSError, ValueError, KeyError) as e:
+                logger.warning(f"Could not load the waveform: {e}")
 
-        # 3. Initialize Audio
-        try:
             pygame.mixer.init()
-            pygame.mixer.music.load(self.audio_path)
+            pygame.mixer.music.load(path)
+            self.player_ready = True
+            self.lbl_time.config(text=self._format_time(0))
             self.update_slider_loop()  # Start the UI updater
         except Exception as e:
             messagebox.showwarning("Audio Error", f"Could not load audio: {e}")
 
-        # 4. Render First Page
-        self.current_page = 0
-        self.render_page()
-
-    def render_page(self):
-        """Renders only a slice of segments to prevent UI freezing."""
-        # 1. Clear existing widgets in the scroll frame
-        for widget in self.scrollable_frame.winfo_children():
-            widget.destroy()
-
-        self.segment_widgets = []  # Reset widget list for THIS page (We need a strategy for full save)
-
-        # Note: We need to store edits globally, not just in widgets.
-        # But for simplicity in this pagination fix, we will commit edits to memory
-        # before changing pages. *Implemented in change_page logic*
-
-        segments = self.transcription_result.get("segments", [])
-        start_idx = self.current_page * self.PAGE_SIZE
-        end_idx = start_idx + self.PAGE_SIZE
-        page_segments = segments[start_idx:end_idx]
-
-        self.lbl_page.config(text=f"Page {self.current_page + 1} / {len(segments) // self.PAGE_SIZE + 1}")
-
-        for i, seg in enumerate(page_segments):
-            # global_index is needed to map back to main list
-            self._create_segment_row(start_idx + i, seg)
-
-    def _create_segment_row(self, global_index, segment):
-        row = tk.Frame(self.scrollable_frame, pady=5)
-        row.pack(fill="x", padx=5)
-
-        start_str = self._format_time(segment["start"])
-        lbl_time = tk.Label(row, text=f"{start_str}", font=("Consolas", 8), width=6)
-        lbl_time.pack(side=tk.LEFT)
-
-        btn_play = tk.Button(row, text="▶", command=lambda s=segment["start"]: self.play_segment(s))
-        btn_play.pack(side=tk.LEFT, padx=5)
-
-        txt = tk.Text(row, height=3, width=50, wrap="word", font=("Arial", 10))
-        txt.insert("1.0", segment["text"].strip())
-        txt.pack(side=tk.LEFT, fill="x", expand=True, padx=5)
-
-        # We assume segment_widgets corresponds to the CURRENT PAGE indices
-        self.segment_widgets.append({"widget": txt, "global_index": global_index})
-
-    def commit_page_edits(self):
-        """Saves text from current page widgets back to the main memory structure."""
-        segments = self.transcription_result["segments"]
-        for item in self.segment_widgets:
-            idx = item["global_index"]
-            widget = item["widget"]
-            # Save back to memory
-            segments[idx]["text"] = widget.get("1.0", "end-1c")
-
-    def next_page(self):
-        self.commit_page_edits()
-        total_pages = len(self.transcription_result["segments"]) // self.PAGE_SIZE
-        if self.current_page < total_pages:
-            self.current_page += 1
-            self.render_page()
-
-    def prev_page(self):
-        self.commit_page_edits()
-        if self.current_page > 0:
-            self.current_page -= 1
-            self.render_page()
+    def on_segment_edit(self, index, text):
+        self.store.set_text(index, text)  # journaled right away
+        self.search_index.update(index, text)
+        self.lbl_autosave.config(text=f"✔ {self.store.edited} edit(s) autosaved")
+
+    def search_segments(self):
+        """Highlights the segments matching the search box."""
+        self.search_matches = self.search_index.search(self.search_var.get())
+        # "Find Next" continues from the segments currently on screen.
+        self.match_cursor = bisect.bisect_left(self.search_matches, self.segment_view.top) - 1
+        self.segment_view.set_matches(self.search_matches)
+        query = self.search_var.get().strip()
+        self.lbl_matches.config(text=f"{len(self.search_matches)} found" if query else "")
+
+    def next_match(self):
+        """Scrolls to the next matching segment, wrapping around."""
+        if not self.search_matches:
+            return
+        self.match_cursor = (self.match_cursor + 1) % len(self.search_matches)
+        self.segment_view.show(self.search_matches[self.match_cursor])
+        self.lbl_matches.config(text=f"{self.match_cursor + 1}/{len(self.search_matches)}")
+
+    def show_playing_segment(self):
+        index = self._segment_at(self.seek_var.get())
+        if index is not None:
+            self.segment_view.show(index)
+
+    def _segment_at(self, seconds):
+        return editor.segment_at(self.store.starts, seconds) if len(self.store) else None
 
     # =========================================================================
     # Audio Logic: Seeking & Updates
     # =========================================================================
     def update_slider_loop(self):
         """Updates the slider position based on audio playback."""
+        if not self.player_ready:
+            return  # the editor was closed
+        import pygame
+
         if pygame.mixer.music.get_busy() and not self.is_user_seeking:
             # Pygame get_pos returns milliseconds played SINCE LAST PLAY command
             current_play_time = pygame.mixer.music.get_pos() / 1000.0
@@ -317,29 +391,44 @@ class TranscriberApp:
 
             self.seek_var.set(total_time)
             self.lbl_time.config(text=self._format_time(total_time))
+            index = self._segment_at(total_time)
+            self.segment_view.set_playing(index)
+            self.timeline.set_position(total_time, index)
 
         # Schedule next check
-        if hasattr(self, "slider"):  # Check if UI still exists
-            self.root.after(500, self.update_slider_loop)
+        self.root.after(500, self.update_slider_loop)
 
     def on_slider_drag(self, value):
         self.is_user_seeking = True
 
     def on_slider_release(self, event):
         """User finished dragging: Seek audio."""
-        seek_time = self.seek_var.get()
-        self.play_segment(seek_time)
         self.is_user_seeking = False
+        self.seek_to(self.seek_var.get())
+
+    def seek_to(self, seconds):
+        self.play_segment(seconds)
+        self.show_playing_segment()
 
     def play_segment(self, start_time):
+        if not self.player_ready:
+            logger.info("Audio is still being prepared.")
+            return
+        import pygame
+
         try:
             self.audio_start_offset = float(start_time)
             pygame.mixer.music.play(start=self.audio_start_offset)
             self.seek_var.set(self.audio_start_offset)
+            self.timeline.set_position(self.audio_start_offset, self._segment_at(self.audio_start_offset))
         except Exception as e:
             logger.error(f"Audio error: {e}")
 
     def pause_audio(self):
+        if not self.player_ready:
+            return
+        import pygame
+
         if pygame.mixer.music.get_busy():
             pygame.mixer.music.pause()
         else:
@@ -358,7 +447,11 @@ class TranscriberApp:
         self.btn_select.config(state=tk.DISABLED)
         self.btn_cancel.config(state=tk.NORMAL)
         self.model_menu.config(state="disabled")
-        self.format_menu.config(state="disabled")
+        for check in self.format_checks:
+            check.config(state=tk.DISABLED)
+        self.quantize_check.config(state=tk.DISABLED)
+        self.vad_check.config(state=tk.DISABLED)
+        self.cascade_menu.config(state="disabled")
 
         # Setup Progress Bar
         self.progress.pack(pady=5, before=self.status_label)
@@ -368,8 +461,17 @@ class TranscriberApp:
         self.cancel_event.clear()
         self.update_status("Starting worker...", "orange")
 
+        # Extract the editor's playback track while the transcription runs.
+        preview.prepare(file_path)
+
         model_size = self.model_var.get()
-        self.worker_thread = threading.Thread(target=self.run_worker, args=(file_path, model_size))
+        dtype = self._selected_dtype()
+        cascade_model = self.cascade_var.get()
+        if cascade_model in (CASCADE_OFF, model_size):
+            cascade_model = None
+        self.worker_thread = threading.Thread(
+            target=self.run_worker, args=(file_path, model_size, dtype, self.vad_var.get(), cascade_model)
+        )
         self.worker_thread.daemon = True
         self.worker_thread.start()
 
@@ -379,18 +481,44 @@ class TranscriberApp:
                 self.progress["maximum"] = total
                 self.progress["value"] = current
                 percent = int((current / total) * 100)
-                self.status_label.config(text=f"Transcribing... {percent}%")
+                timings = self.profiler.brief() if self.profiler else ""
+                self.status_label.config(text=f"Transcribing... {percent}%" + (f" ({timings})" if timings else ""))
 
         self.root.after(0, _update)
 
-    def run_worker(self, file_path, model_size):
+    def run_worker(self, file_path, model_size, dtype="float32", use_vad=False, cascade_model=None):
+        model = None
+        cancelled = False
+        self.profiler = profiling.Profiler()
         try:
             if self.cancel_event.is_set():
                 raise InterruptedError()
 
-            self.update_status(f"Loading Model ({model_size})...", "blue")
+            self.update_status("Checking cache...", "blue")
+            transcripts = cache.TranscriptCache()
+            options = cache.transcript_options(
+                dtype=dtype,
+                vad=use_vad,
+                cascade=[cascade_model, *cascade.DEFAULT_THRESHOLDS] if cascade_model else None,
+            )
+            key = cache.cache_key(cache.file_digest(file_path), model_size, options)
+            cached = transcripts.get(key)
+            if cached is not None:
+                logger.info("Worker: Using cached transcript. Opening editor.")
+                self.transcription_result = cached
+                self.transcript_key = key
+                self.audio_path = file_path
+                self.root.after(0, self.setup_editor_ui)
+                return
+
+            label = f"{model_size}, INT8" if dtype == "int8" else model_size
+            self.update_status(f"Loading Model ({label})...", "blue")
+            # Usually already loaded, or loading, in the background (see `preload_model`).
             logger.info("Worker: Loading model...")
-            model = whisper.load_model(model_size)
+            # Use the thread count `opentranscriber-cli autotune` found best, if any.
+            tuning.configure(threads=tuning.saved_settings(model_size, dtype).get("threads"))
+            with profiling.activate(self.profiler):
+                model = models.get_model(model_size, dtype=dtype, cancel_event=self.cancel_event)
 
             if self.cancel_event.is_set():
                 raise InterruptedError()
@@ -398,58 +526,95 @@ class TranscriberApp:
             self.update_status("Transcribing...", "purple")
             logger.info("Worker: Transcribing...")
 
-            # --- MONKEY PATCH START ---
-            TkinterTqdm.on_progress_callback = self._update_progress_bar
-            transcribe_module = sys.modules["whisper.transcribe"]
-            original_tqdm = transcribe_module.tqdm
-
-            if hasattr(original_tqdm, "tqdm"):
-                transcribe_module.tqdm = TqdmShim
-            else:
-                transcribe_module.tqdm = TkinterTqdm
-
-            try:
-                result = model.transcribe(file_path, fp16=False)
-            finally:
-                transcribe_module.tqdm = original_tqdm
-            # --- MONKEY PATCH END ---
+            import whisper
+
+            # Aborts inside the decode loop as soon as Cancel is pressed.
+            with (
+                progressbar.reporting(self._update_progress_bar),
+                profiling.activate(self.profiler),
+                profiling.instrument(model),
+                cancellation.cancellable(model, self.cancel_event),
+            ):
+                if cascade_model:
+                    result = cascade.transcribe(
+                        model,
+                        whisper.load_audio(file_path),
+                        cascade_model,
+                        dtype=dtype,
+                        use_vad=use_vad,
+                        cancel_event=self.cancel_event,
+                    )
+                elif use_vad:
+                    # Timestamps come back on the file's own timeline, so playback stays in sync.
+                    audio = whisper.load_audio(file_path)
+                    result = vad.transcribe_speech(model, audio, fp16=False)
+                else:
+                    result = model.transcribe(file_path, fp16=False)
 
             if self.cancel_event.is_set():
                 raise InterruptedError()
 
+            try:
+                transcripts.put(key, result)
+            except OSError as e:
+                logger.warning(f"Worker: Could not cache transcript: {e}")
+
             self.transcription_result = result
+            self.transcript_key = key
             self.audio_path = file_path
+            for line in self.profiler.report():
+                logger.info(f"Worker: {line}")
 
             logger.info("Worker: Transcription complete. Opening editor.")
             self.root.after(0, self.setup_editor_ui)
 
         except InterruptedError:
-            self.update_status("Cancelled", "red")
-            self.root.after(0, self._reset_main_ui)
+            cancelled = True
         except Exception as e:
             logger.error(f"Worker Error: {e}")
             self.update_status("Error", "red")
             self.root.after(0, lambda: messagebox.showerror("Error", str(e)))  # noqa
             self.root.after(0, self._reset_main_ui)
 
+        if cancelled:
+            # Done outside the except block: by now the traceback, and with it the
+            # decoder's intermediate tensors, has been dropped and can be collected.
+            logger.info("Worker: Cancelled. Releasing model.")
+            model = None
+            models.release_model(model_size, dtype=dtype)
+            self.update_status("Cancelled", "red")
+            self.root.after(0, self._reset_main_ui)
+
     # =========================================================================
     # Helpers & Saving
     # =========================================================================
     def save_edits(self):
         try:
-            # Important: Commit the edits from the CURRENT page before saving
-            self.commit_page_edits()
-
-            output_format = self.format_var.get()
+            formats = [fmt for fmt in GUI_FORMATS if self.format_vars[fmt].get()]
+            if not formats:
+                messagebox.showwarning("Save", "Tick at least one output format.")
+                return
             output_dir = os.path.dirname(self.audio_path)
 
-            writer = get_writer(output_format, output_dir)
-            writer(self.transcription_result, self.audio_path)
+            # JSON keeps the decoder details (tokens etc.), which only the cached full result has.
+            full = cache.TranscriptCache().get(self.transcript_key) if "json" in formats else None
+            if "json" in formats and full is None:
+                logger.warning(
+                    "Save: The cached transcript is gone; the JSON output has the segment times and texts "
+                    "but not the tokens and other decoder fields."
+                )
+            export.write_outputs(self.store.to_result(full), self.audio_path, formats, output_dir)
 
             messagebox.showinfo("Success", f"Saved to:\n{output_dir}")
+            # The edits are in the saved files now; don't offer to restore them on the next open.
+            self.store.discard_journal()
+
+            if self.player_ready:
+                import pygame
 
-            pygame.mixer.music.stop()
-            pygame.mixer.quit()
+                self.player_ready = False
+                pygame.mixer.music.stop()
+                pygame.mixer.quit()
             self.setup_main_menu()
 
         except Exception as e:
@@ -465,7 +630,11 @@ class TranscriberApp:
             self.btn_select.config(state=tk.NORMAL)
             self.btn_cancel.config(state=tk.DISABLED)
             self.model_menu.config(state="readonly")
-            self.format_menu.config(state="readonly")
+            for check in self.format_checks:
+                check.config(state=tk.NORMAL)
+            self.quantize_check.config(state=tk.NORMAL)
+            self.vad_check.config(state=tk.NORMAL)
+            self.cascade_menu.config(state="readonly")
         except Exception:
             pass
 
@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+
+from opentranscriber import atomic, cache, export, streaming
+
+logger = logging.getLogger(__name__)
+
+INCREMENTAL_FORMATS = ["txt", "srt", "vtt", "tsv", "jsonl"]
+CHECKPOINT_SUFFIX = ".checkpoint.json"
+
+
+def format_segment(output_format, segment):
+    """Renders one segment as the export writer for that format does (JSONL: one object per line)."""
+    if output_format == "jsonl":
+        return json.dumps(segment, ensure_ascii=False) + "\n"
+    if output_format not in INCREMENTAL_FORMATS:
+        raise ValueError(f"Unsupported incremental format: {output_format}")
+    return export.render_segment(segment, output_format, segment["id"])
+
+
+def _load_checkpoint(checkpoint_path, expected):
+    """Returns the saved state if it belongs to the same media, model and format."""
+    try:
+        with open(checkpoint_path, encoding="utf-8") as f:
+            state = json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable checkpoint {checkpoint_path}: {e}")
+        return None
+
+    if any(state.get(name) != value for name, value in expected.items()):
+        logger.info("Checkpoint belongs to a different input, model or options; starting over.")
+        return None
+    return state
+
+
+def _save_checkpoint(checkpoint_path, state):
+    with atomic.atomic_write(checkpoint_path, fsync=True) as f:
+        json.dump(state, f)
+
+
+def transcribe_incremental(
+    model, file_path, model_type, output_format, window_seconds=streaming.DEFAULT_WINDOW, use_vad=False
+):
+    """
+    Streams the file through the model and appends every finalized segment to the
+    output as soon as its window is done.
+
+    After each window the output is flushed to disk and a checkpoint next to it
+    records the input offset reached. If the run dies, calling this again with the
+    same arguments truncates any half-written tail and resumes from that offset.
+    With `use_vad`, only the speech in each window is transcribed.
+    Returns the output path.
+    """
+    output_directory = os.path.dirname(file_path) or "."
+    basename = os.path.splitext(os.path.basename(file_path))[0]
+    output_path = os.path.join(output_directory, f"{basename}.{output_format}")
+    checkpoint_path = output_path + CHECKPOINT_SUFFIX
+
+    expected = {"media": cache.file_digest(file_path), "model": model_type, "format": output_format, "vad": use_vad}
+    state = _load_checkpoint(checkpoint_path, expected)
+
+    if state and os.path.exists(output_path):
+        logger.info(f"Resuming '{file_path}' from {state['offset']:.1f}s ({state['segments']} segment(s) done).")
+        out = open(output_path, "r+b")
+        out.truncate(state["output_bytes"])
+        out.seek(state["output_bytes"])
+    else:
+        out = open(output_path, "wb")
+        out.write(export.HEADERS.get(output_format, "").encode("utf-8"))
+        state = {**expected, "offset": 0.0, "segments": 0, "language": None, "prompt": ""}
+        state["output_bytes"] = out.tell()
+
+    with out:
+        for segments, language, processed_until in streaming.stream_segments(
+            model,
+            file_path,
+            window_seconds=window_seconds,
+            start=state["offset"],
+            first_id=state["segments"],
+            previous_text=state["prompt"],
+            use_vad=use_vad,
+            language=state["language"],
+        ):
+            out.write("".join(format_segment(output_format, segment) for segment in segments).encode("utf-8"))
+            out.flush()
+            os.fsync(out.fileno())
+
+            prompt = state["prompt"] + "".join(segment["text"] for segment in segments)
+            state.update(
+                offset=processed_until,
+                segments=state["segments"] + len(segments),
+                language=language,
+                prompt=prompt[-streaming.PROMPT_CHARS :],
+                output_bytes=out.tell(),
+            )
+            _save_checkpoint(checkpoint_path, state)
+
+    if os.path.exists(checkpoint_path):
+        os.remove(checkpoint_path)
+    logger.info(f"Success! Output saved to: {os.path.abspath(output_path)}")
+    return output_path
@@ -0,0 +1,390 @@
+import gc
+import itertools
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+
+from opentranscriber import atomic, cache, profiling, tuning
+
+logger = logging.getLogger(__name__)
+
+MODEL_NAMES = ["tiny", "base", "small", "medium", "large"]
+DEFAULT_MAX_MODELS = int(os.getenv("OPENTRANSCRIBER_MAX_MODELS", "2"))
+DEFAULT_MAX_MEMORY_MB = int(os.getenv("OPENTRANSCRIBER_MAX_MODEL_MEMORY_MB", "0")) or None
+MMAP_WEIGHTS = os.getenv("OPENTRANSCRIBER_MMAP_WEIGHTS", "1") != "0"
+
+
+class LoadCancelled(InterruptedError):
+    """Raised by a model load whose `cancel_event` was set before it finished."""
+
+
+def default_device():
+    import torch
+
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise LoadCancelled()
+
+
+def weights_directory():
+    return os.path.join(cache.cache_root(), "weights")
+
+
+def checkpoint_path(name):
+    """
+    Path of the checkpoint of model `name`, downloading it first like
+    `whisper.load_model` does; `name` may also be the path of a checkpoint file.
+    """
+    import whisper
+
+    if name in whisper._MODELS:
+        default = os.path.join(os.path.expanduser("~"), ".cache")
+        root = os.path.join(os.getenv("XDG_CACHE_HOME", default), "whisper")
+        return whisper._download(whisper._MODELS[name], root, False)
+    if os.path.isfile(name):
+        return name
+    raise RuntimeError(f"Model {name} not found; available models = {whisper.available_models()}")
+
+
+def _float32_path(name, source):
+    safe_name = re.sub(r"[^\w.-]", "_", os.path.basename(name))
+    # The size tells apart a checkpoint that was replaced under the same name.
+    return os.path.join(weights_directory(), f"{safe_name}-{os.path.getsize(source)}-float32.pt")
+
+
+def _write_float32_checkpoint(source, path):
+    import torch
+
+    logger.info(f"Model registry: Writing a float32 copy of {source} to memory-map (only done once)...")
+    checkpoint = torch.load(source, map_location="cpu", mmap=True, weights_only=True)
+    checkpoint["model_state_dict"] = {
+        key: tensor.float() if tensor.is_floating_point() else tensor
+        for key, tensor in checkpoint["model_state_dict"].items()
+    }
+    with atomic.atomic_write(path, "wb") as f:
+        torch.save(checkpoint, f)
+
+    # Keep one copy per model: drop those made from an earlier checkpoint of the same name.
+    pattern = re.compile(re.escape(os.path.basename(path).rsplit("-", 2)[0]) + r"-\d+-float32\.pt")
+    for entry in os.scandir(os.path.dirname(path)):
+        if pattern.fullmatch(entry.name) and entry.path != path:
+            logger.info(f"Model registry: Removing the outdated float32 copy {entry.path}.")
+            try:
+                os.remove(entry.path)
+            except OSError as e:
+                logger.warning(f"Model registry: Could not remove {entry.path}: {e}")
+
+
+def _restore_unsaved_buffers(model, name):
+    """
+    Recreates the buffers that checkpoints don't contain (the decoder's attention
+    mask and the alignment heads) the way `Whisper.__init__` and `whisper.load_model` do.
+    """
+    import torch
+    import whisper
+
+    dims = model.dims
+    mask = torch.empty(dims.n_text_ctx, dims.n_text_ctx).fill_(float("-inf")).triu_(1)
+    model.decoder.register_buffer("mask", mask, persistent=False)
+
+    heads = torch.zeros(dims.n_text_layer, dims.n_text_head, dtype=torch.bool)
+    heads[dims.n_text_layer // 2 :] = True
+    model.register_buffer("alignment_heads", heads.to_sparse(), persistent=False)
+    if name in whisper._ALIGNMENT_HEADS:
+        model.set_alignment_heads(whisper._ALIGNMENT_HEADS[name])
+
+    missing = [
+        key for key, tensor in itertools.chain(model.named_parameters(), model.named_buffers()) if tensor.is_meta
+    ]
+    if missing:
+        raise RuntimeError(f"not in the checkpoint: {', '.join(missing)}")
+
+
+def load_mmap_model(name, device, dtype="float32", cancel_event=None):
+    """
+    Loads a Whisper model whose weights are memory-mapped from the checkpoint file,
+    instead of read into memory and then copied into a randomly initialized model
+    like `whisper.load_model` does.
+
+    Whisper checkpoints hold float16 weights, which a float16 model maps as they
+    are. A float32 model maps a float32 copy of the checkpoint, written to
+    `weights_directory()` the first time. On the CPU the weights stay in the page
+    cache, so they are read only as far as they are used and every process
+    running the same model shares one copy of them.
+    """
+    import torch
+    from whisper.model import ModelDimensions, Whisper
+
+    path = checkpoint_path(name)
+    _check_cancelled(cancel_event)
+    if dtype == "float32":
+        source, path = path, _float32_path(name, path)
+        if not os.path.exists(path):
+            _write_float32_checkpoint(source, path)
+        _check_cancelled(cancel_event)
+
+    checkpoint = torch.load(path, map_location="cpu", mmap=True, weights_only=True)
+    with torch.device("meta"):
+        model = Whisper(ModelDimensions(**checkpoint["dims"]))
+    # `assign` makes the mapped tensors the parameters, without copying them.
+    model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+    _restore_unsaved_buffers(model, name)
+    _check_cancelled(cancel_event)
+
+    if dtype == "float16":
+        model = model.half()
+    return model.to(device)
+
+
+def model_memory_bytes(model):
+    """Size of the parameters and buffers of a loaded model."""
+    tensors = list(model.parameters()) + list(model.buffers())
+    return sum(t.numel() * t.element_size() for t in tensors if not t.is_sparse)
+
+
+class ModelRegistry:
+    """
+    In-process cache of loaded Whisper models, keyed by (name, device, dtype).
+
+    Models are evicted in least-recently-used order once more than `max_models`
+    are loaded or their combined size exceeds `max_memory_mb`. The most recently
+    requested model is never evicted, even if it alone exceeds the budget.
+
+    Loads run outside the registry lock: a thread asking for a model another
+    thread is loading waits for that load, while other models can be loaded and
+    used meanwhile, so a slow load that is no longer wanted blocks nobody else.
+    """
+
+    def __init__(self, max_models=DEFAULT_MAX_MODELS, max_memory_mb=DEFAULT_MAX_MEMORY_MB):
+        self.max_models = max_models
+        self.max_memory_mb = max_memory_mb
+        self._models = OrderedDict()
+        self._sizes = {}
+        self._loading = {}  # key -> Event set once its load has finished or failed
+        self._release_listeners = []
+        self._lock = threading.Lock()
+
+    def on_release(self, callback):
+        """Calls `callback(keys)` with the keys of the models released or evicted from now on."""
+        self._release_listeners.append(callback)
+
+    def get(self, name, device=None, dtype="float32", cancel_event=None):
+        """
+        Returns the requested model, loading it on first use.
+        `dtype` is "float32", "float16" or "int8" (dynamically quantized, CPU only).
+        Setting `cancel_event` while the load waits for, or runs, raises `LoadCancelled`.
+        """
+        if dtype == "int8" and device is None:
+            device = "cpu"
+        key = (name, device or default_device(), dtype)
+
+        while True:
+            with self._lock:
+                _check_cancelled(cancel_event)
+                tuning.apply_pending()
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    logger.info(f"Model registry: Reusing loaded model {key}.")
+                    return self._models[key]
+                loading = self._loading.get(key)
+                if loading is None:
+                    loading = self._loading[key] = threading.Event()
+                    break
+            # Another thread is loading this model: wait for it, then look again
+            # (if that load failed or was cancelled, this thread loads the model itself).
+            while not loading.wait(0.1):
+                _check_cancelled(cancel_event)
+
+        try:
+            logger.info(f"Model registry: Loading model {key}...")
+            with profiling.span("model_load", model=name, dtype=dtype):
+                model = self._load(*key, cancel_event=cancel_event)
+            size = model_memory_bytes(model)
+            with self._lock:
+                self._models[key] = model
+                self._sizes[key] = size
+                evicted = self._evict(keep=key)
+        finally:
+            with self._lock:
+                del self._loading[key]
+            loading.set()
+
+        self._notify_released(evicted)
+        return model
+
+    def release(self, name=None, device=None, dtype=None):
+        """
+        Drops every loaded model matching the given fields (None matches anything)
+        and frees its memory. Returns the number of models released.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key in self._models
+                if (name is None or key[0] == name)
+                and (device is None or key[1] == device)
+                and (dtype is None or key[2] == dtype)
+            ]
+            for key in keys:
+                self._drop(key)
+
+        if keys:
+            self._free_memory()
+            self._notify_released(keys)
+        return len(keys)
+
+    def loaded(self):
+        """Keys of the loaded models, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def memory_bytes(self):
+        with self._lock:
+            return sum(self._sizes.values())
+
+    def _load(self, name, device, dtype, cancel_event=None):
+        import whisper
+
+        if dtype == "int8":
+            if device != "cpu":
+                raise ValueError("INT8 quantized models only run on the CPU")
+            from opentranscriber import quantization
+
+            return quantization.load_quantized_model(name)
+
+        if dtype not in ("float32", "float16"):
+            raise ValueError(f"Unsupported model dtype: {dtype}")
+        if MMAP_WEIGHTS:
+            try:
+                return load_mmap_model(name, device, dtype, cancel_event)
+            except LoadCancelled:
+                raise
+            except Exception as e:
+                logger.warning(f"Model registry: Memory-mapped loading failed ({e}); loading {name} the regular way.")
+
+        model = whisper.load_model(name, device=device)
+        if dtype == "float16":
+            model = model.half()
+        return model
+
+    def _evict(self, keep):
+        """Drops least recently used models until within budget. Returns their keys."""
+        evicted = []
+        while len(self._models) > 1 and self._over_budget():
+            key = next(k for k in self._models if k != keep)
+            logger.info(f"Model registry: Evicting model {key}.")
+            self._drop(key)
+            evicted.append(key)
+
+        if evicted:
+            self._free_memory()
+        return evicted
+
+    def _notify_released(self, keys):
+        # Called without holding the registry lock, so listeners may take their own locks.
+        if keys:
+            for callback in self._release_listeners:
+                callback(keys)
+
+    def _over_budget(self):
+        if self.max_models and len(self._models) > self.max_models:
+            return True
+        if self.max_memory_mb and sum(self._sizes.values()) > self.max_memory_mb * 1024 * 1024:
+            return True
+        return False
+
+    def _drop(self, key):
+        del self._models[key]
+        del self._sizes[key]
+
+    def _free_memory(self):
+        import torch
+
+        gc.collect()
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+
+class Preloader:
+    """
+    Loads the model an interactive user is about to need (e.g. the one selected in
+    the GUI) into a registry in the background, ahead of the transcription.
+
+    Only the latest request counts: requesting another model cancels the previous
+    load. A load still waiting for the registry never starts, one in progress
+    stops at its next checkpoint, and a model that finished loading after it was
+    superseded is released again.
+    """
+
+    def __init__(self, registry):
+        self.registry = registry
+        self.wanted = None
+        self._cancel_event = threading.Event()
+        # Reentrant: releasing a superseded model below notifies `_released` on the same thread.
+        self._lock = threading.RLock()
+        registry.on_release(self._released)
+
+    def request(self, name, device=None, dtype="float32"):
+        key = (name, device, dtype)
+        with self._lock:
+            if key == self.wanted:
+                return
+            self._cancel_event.set()
+            self._cancel_event = threading.Event()
+            self.wanted = key
+            thread = threading.Thread(
+                target=self._run, args=(key, self._cancel_event), name="model-preload", daemon=True
+            )
+        thread.start()
+
+    def cancel(self):
+        with self._lock:
+            self._cancel_event.set()
+            self.wanted = None
+
+    def _released(self, keys):
+        # A released wanted model is no longer preloaded: the next request must load it again.
+        with self._lock:
+            if self.wanted is None:
+                return
+            name, device, dtype = self.wanted
+            if any(key[0] == name and key[2] == dtype and device in (None, key[1]) for key in keys):
+                self.wanted = None
+
+    def _run(self, key, cancel_event):
+        name, device, dtype = key
+        try:
+            self.registry.get(name, device=device, dtype=dtype, cancel_event=cancel_event)
+        except LoadCancelled:
+            logger.info(f"Model preload: Cancelled loading {key}.")
+            return
+        except Exception as e:
+            logger.warning(f"Model preload: Could not load {key}: {e}")
+            return
+
+        with self._lock:
+            if key != self.wanted:
+                logger.info(f"Model preload: {key} is no longer selected; releasing it.")
+                self.registry.release(name, device, dtype)
+
+
+# Process-wide registry shared by the CLI, the GUI and batch workers.
+registry = ModelRegistry()
+preloader = Preloader(registry)
+
+
+def get_model(name, device=None, dtype="float32", cancel_event=None):
+    return registry.get(name, device=device, dtype=dtype, cancel_event=cancel_event)
+
+
+def release_model(name=None, device=None, dtype=None):
+    return registry.release(name=name, device=device, dtype=dtype)
+
+
+def preload_model(name, device=None, dtype="float32"):
+    preloader.request(name, device=device, dtype=dtype)
@@ -0,0 +1,175 @@
+import logging
+import os
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from opentranscriber import cache, cli
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PREFETCH = 2
+DEFAULT_PREFETCH_MB = int(os.getenv("OPENTRANSCRIBER_PREFETCH_MB", "1024"))
+
+
+class _Budget:
+    """Bytes of decoded audio held by the pipeline, capped at `max_bytes` (one file is always let through)."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.held = 0
+        self._condition = threading.Condition()
+
+    def wait_for_room(self, stop):
+        with self._condition:
+            while self.held and self.held >= self.max_bytes and not stop.is_set():
+                self._condition.wait(timeout=0.5)
+
+    def take(self, size):
+        with self._condition:
+            self.held += size
+
+    def give_back(self, size):
+        with self._condition:
+            self.held -= size
+            self._condition.notify_all()
+
+
+class _Prefetched:
+    def __init__(self, file_path, key=None, result=None, audio=None, error=None):
+        self.file_path = file_path
+        self.key = key
+        self.result = result
+        self.audio = audio
+        self.error = error
+
+
+def _prefetch(files, model_type, options, use_cache, refresh_cache, ready, budget, stop):
+    """
+    Stage 1 (background thread): hashes each file, looks it up in the transcript
+    cache and, on a miss, decodes its audio through ffmpeg, `ready.maxsize` files ahead.
+    """
+    import whisper
+
+    transcripts = cache.TranscriptCache()
+    for file_path in files:
+        if stop.is_set():
+            break
+        item = _Prefetched(file_path)
+        try:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"File not found: {file_path}")
+            if use_cache:
+                item.key = cli.transcript_key(file_path, model_type, **options)
+                if not refresh_cache:
+                    item.result = transcripts.get(item.key)
+            if item.result is None:
+                budget.wait_for_room(stop)
+                try:
+                    item.audio = whisper.load_audio(file_path)
+                except Exception as e:
+                    raise RuntimeError(f"Failed to load audio: {e}") from e
+                budget.take(item.audio.nbytes)
+        except Exception as e:
+            item.error = e
+        ready.put(item)
+    ready.put(None)
+
+
+def _store_and_write(item, result, output_format):
+    """Stage 3 (writer thread): caches the new transcript and writes the output files."""
+    if item.key and item.result is None:
+        try:
+            cache.TranscriptCache().put(item.key, result)
+        except OSError as e:
+            logger.warning(f"Could not cache transcript: {e}")
+    if output_format is not None:
+        cli.write_result(result, item.file_path, output_format)
+    return result
+
+
+def run_pipelined(
+    files,
+    model_type,
+    output_format,
+    prefetch=DEFAULT_PREFETCH,
+    max_mb=DEFAULT_PREFETCH_MB,
+    use_cache=True,
+    refresh_cache=False,
+    **options,
+):
+    """
+    Transcribes `files` one after another with `cli.transcribe_media`, with the
+    work around the model moved off its critical path into overlapping stages:
+
+    1. a prefetch thread hashes, looks up and decodes (ffmpeg) the next `prefetch`
+       files while the model transcribes the current one, holding at most
+       `max_mb` of decoded audio;
+    2. the calling thread runs the model on one decoded file after another;
+    3. a writer thread stores each transcript in the cache and writes its outputs.
+
+    `options` are the `transcribe_media` options (e.g. `dtype`, `use_vad`,
+    `cascade_model`). Yields (file_path, result, error) per file, in input order,
+    once its outputs are written, with either the `result` or the exception that
+    made the file fail.
+    """
+    ready = queue.Queue(maxsize=max(1, prefetch))
+    budget = _Budget(max_mb * 1024 * 1024)
+    stop = threading.Event()
+    prefetcher = threading.Thread(
+        target=_prefetch,
+        args=(files, model_type, options, use_cache, refresh_cache, ready, budget, stop),
+        name="prefetch",
+        daemon=True,
+    )
+    prefetcher.start()
+
+    writes = []  # (file_path, future), in input order
+    try:
+        with ThreadPoolExecutor(max_workers=1, thread_name_prefix="writer") as writer:
+            while (item := ready.get()) is not None:
+                if item.error is not None:
+                    writes.append((item.file_path, item.error))
+                elif item.result is not None:
+                    logger.info(f"Using cached transcript for '{item.file_path}'.")
+                    writes.append((item.file_path, writer.submit(_store_and_write, item, item.result, output_format)))
+                else:
+                    try:
+                        result = cli.transcribe_media(
+                            item.file_path, model_type, None, audio=item.audio, use_cache=False, **options
+                        )
+                        future = writer.submit(_store_and_write, item, result, output_format)
+                        writes.append((item.file_path, future))
+                    except Exception as e:
+                        writes.append((item.file_path, e))
+                    finally:
+                        budget.give_back(item.audio.nbytes)
+                        item.audio = None
+
+                # Report everything already written, keeping the input order.
+                while writes and _finished(writes[0][1]):
+                    yield _outcome(*writes.pop(0))
+
+            for file_path, pending in writes:
+                yield _outcome(file_path, pending)
+    finally:
+        stop.set()
+        # Unblock the prefetch thread if it waits for room in the queue.
+        while prefetcher.is_alive():
+            try:
+                ready.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+
+def _finished(pending):
+    return isinstance(pending, BaseException) or pending.done()
+
+
+def _outcome(file_path, pending):
+    if isinstance(pending, BaseException):
+        return file_path, None, pending
+    try:
+        return file_path, pending.result(), None
+    except Exception as e:
+        return file_path, None, e
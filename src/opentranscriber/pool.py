@@ -0,0 +1,52 @@
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from opentranscriber import models, setup_ffmpeg_path, setup_logging, tuning
+
+logger = logging.getLogger(__name__)
+
+
+def _init_worker(model_type, dtype="float32", threads=None, interop_threads=None, cpu_slices=None, counter=None):
+    """
+    Runs once in each worker process: applies its share of the threads and CPUs
+    and warms the process-wide model registry, so every job in the worker's queue
+    reuses the same loaded model.
+    """
+    setup_logging()
+    setup_ffmpeg_path()
+
+    cpus = None
+    if cpu_slices and counter is not None:
+        with counter.get_lock():
+            index = counter.value
+            counter.value += 1
+        cpus = cpu_slices[index % len(cpu_slices)]
+    tuning.apply_threads(threads, interop_threads, cpus)
+
+    logger.info(f"Worker {os.getpid()}: Loading Whisper model: {model_type} ({threads} thread(s))...")
+    models.get_model(model_type, dtype=dtype)
+
+
+def worker_pool(model_type, workers, dtype="float32", threads=None, cpus=None):
+    """
+    Process pool whose workers each load `model_type` (as `dtype`) once at startup.
+
+    By default the threads and CPUs configured through `tuning.configure` are
+    divided among the workers; `threads` and `cpus` override them.
+    """
+    default_threads, interop_threads, cpu_slices = tuning.worker_settings(workers)
+    threads = threads or default_threads
+    if cpus:
+        cpu_slices = tuning.split_cpus(cpus, workers)
+
+    # 'spawn' avoids inheriting torch's thread pools through fork().
+    context = multiprocessing.get_context("spawn")
+    counter = context.Value("i", 0)
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(model_type, dtype, threads, interop_threads, cpu_slices, counter),
+    )
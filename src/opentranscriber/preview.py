@@ -0,0 +1,124 @@
+import logging
+import os
+import threading
+import wave
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from opentranscriber import atomic, cache, streaming, waveform
+from opentranscriber.audio import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_PREVIEW_MB = int(os.getenv("OPENTRANSCRIBER_PREVIEW_MB", "2048"))
+
+# One extraction at a time; requests for a file already being extracted share its future.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="preview")
+_pending = {}
+_pending_lock = threading.RLock()  # an already finished future runs its callback right away
+
+
+def preview_directory():
+    return os.path.join(cache.cache_root(), "previews")
+
+
+def preview_path(digest):
+    return os.path.join(preview_directory(), f"{digest}.wav")
+
+
+def peaks_path(path):
+    """Base path of the waveform peak pyramid (see `waveform.PeakPyramid`) of a preview track."""
+    return os.path.splitext(path)[0] + ".peaks"
+
+
+def extract_preview(file_path, max_mb=DEFAULT_MAX_PREVIEW_MB):
+    """
+    Returns the path of the preview track of `file_path`, extracting it first if it
+    is not cached yet.
+
+    The preview is 16 kHz mono PCM WAV: any format ffmpeg can read plays back, and
+    seeking is a byte offset computation, so it takes the same time anywhere in
+    the file. Previews are keyed by the media content hash and evicted least
+    recently used first beyond `max_mb`.
+
+    The waveform peak pyramid of the track is computed in the same decoding pass
+    and stored next to it (see `peaks_path`).
+    """
+    path = preview_path(cache.file_digest(file_path))
+    if os.path.exists(path):
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        if not waveform.PeakPyramid.exists(peaks_path(path)):
+            waveform.build_from_wav(path, peaks_path(path))
+        return path
+
+    logger.info(f"Preview: Extracting audio of '{file_path}'...")
+    peaks = waveform.PeakBuilder()
+    with atomic.atomic_write(path, "wb", suffix=".tmp.wav") as f:
+        with wave.open(f, "wb") as track:
+            track.setnchannels(1)
+            track.setsampwidth(2)
+            track.setframerate(SAMPLE_RATE)
+            for window in streaming.read_pcm_windows(file_path, window_seconds=60):
+                pcm = np.round(window * 32768).astype(np.int16)
+                track.writeframes(pcm.tobytes())
+                peaks.add(pcm)
+        peaks.save(peaks_path(path))
+
+    evict(max_mb, keep=path)
+    return path
+
+
+def prepare(file_path):
+    """
+    Starts extracting the preview of `file_path` in the background, unless it
+    already is. Returns a Future with the preview path.
+    """
+    key = os.path.abspath(file_path)
+    with _pending_lock:
+        future = _pending.get(key)
+        if future is None:
+            future = _executor.submit(extract_preview, file_path)
+            _pending[key] = future
+            future.add_done_callback(lambda f: _forget(key))
+        return future
+
+
+def _forget(key):
+    with _pending_lock:
+        _pending.pop(key, None)
+
+
+def evict(max_mb=DEFAULT_MAX_PREVIEW_MB, keep=None):
+    """Deletes least recently used previews, except `keep`, until they fit in `max_mb`."""
+    entries = []
+    total = 0
+    for name in os.listdir(preview_directory()):
+        path = os.path.join(preview_directory(), name)
+        if not name.endswith(".wav") or name.endswith(".tmp.wav"):
+            continue
+        try:
+            stat = os.stat(path)
+        except OSError:
+            continue
+        total += stat.st_size
+        if path != keep:
+            entries.append((stat.st_mtime, stat.st_size, path))
+
+    for _, size, path in sorted(entries):
+        if total <= max_mb * 1024 * 1024:
+            break
+        logger.info(f"Preview: Evicting {os.path.basename(path)}")
+        try:
+            os.remove(path)
+        except OSError:
+            continue  # e.g. still open in a player on Windows
+        total -= size
+        for suffix in (".npy", ".json"):
+            try:
+                os.remove(peaks_path(path) + suffix)
+            except OSError:
+                pass
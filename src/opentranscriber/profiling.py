@@ -0,0 +1,322 @@
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+
+logger = logging.getLogger(__name__)
+
+PROFILE_FORMATS = ["chrome", "json"]
+
+# Returned by `span` while no profiler is active, so instrumented code costs one
+# lookup when profiling is off.
+_NO_SPAN = nullcontext()
+# Marks an attribute `instrument` found unset on the model, so it is removed again afterwards.
+_UNSET = object()
+# The profiler of the current thread. New threads start without one, so e.g. the
+# GUI's preview and preload threads never record into the running job's profile.
+_active = ContextVar("opentranscriber_profiler", default=None)
+# The whisper functions wrapped by `activate`, shared by every thread that has a
+# profiler active; restored when the last one leaves.
+_patch_lock = threading.Lock()
+_patch_users = 0
+_patch_originals = None
+
+
+class Profiler:
+    """
+    Collects named, nested timing spans and counters for one run.
+
+    Every span records its total duration and its self time (total minus the time
+    spent in spans nested inside it), so e.g. the decoder's own time can be told
+    apart from the encoder passes it triggers.
+    """
+
+    def __init__(self):
+        self.spans = []
+        self.counters = Counter()
+        self._origin = time.perf_counter()
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    def begin(self, name, **args):
+        """Opens a span; returns its depth, to be passed to `end`."""
+        stack = self._stack()
+        stack.append([name, args, time.perf_counter(), 0.0])
+        return len(stack) - 1
+
+    def end(self, depth=None):
+        """
+        Closes the innermost open span, or the one at `depth`. Spans opened inside
+        it and never closed (their code raised) are dropped.
+        """
+        stack = self._stack()
+        if depth is not None:
+            del stack[depth + 1 :]
+        name, args, start, child_time = stack.pop()
+        duration = time.perf_counter() - start
+        if stack:
+            stack[-1][3] += duration
+
+        with self._lock:
+            self.spans.append(
+                {
+                    "name": name,
+                    "start": start - self._origin,
+                    "duration": duration,
+                    "self": duration - child_time,
+                    "thread": threading.get_ident(),
+                    "args": args,
+                }
+            )
+
+    @contextmanager
+    def span(self, name, **args):
+        depth = self.begin(name, **args)
+        try:
+            yield
+        finally:
+            self.end(depth)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] += n
+
+    def totals(self):
+        """{name: (count, total_seconds, self_seconds)}, in order of first appearance."""
+        totals = {}
+        with self._lock:
+            for span in self.spans:
+                count, total, own = totals.get(span["name"], (0, 0.0, 0.0))
+                totals[span["name"]] = (count + 1, total + span["duration"], own + span["self"])
+        return totals
+
+    def wall_seconds(self):
+        with self._lock:
+            if not self.spans:
+                return 0.0
+            return max(s["start"] + s["duration"] for s in self.spans) - min(s["start"] for s in self.spans)
+
+    def report(self):
+        """Human-readable breakdown: time per stage, per window, and the counters."""
+        wall = self.wall_seconds()
+        lines = [f"Profile ({wall:.2f}s wall):", f"  {'stage':<20} {'calls':>6} {'self':>9} {'total':>9} {'share':>6}"]
+        for name, (count, total, own) in sorted(self.totals().items(), key=lambda item: -item[1][2]):
+            lines.append(f"  {name:<20} {count:>6} {own:>8.2f}s {total:>8.2f}s {own / max(wall, 1e-9):>6.1%}")
+
+        windows = self._windows()
+        if windows:
+            lines.append(f"  {'window':<8} {'encoder':>9} {'decoder':>9}  temperatures")
+            for window, (encoder, decoder, temperatures) in sorted(windows.items()):
+                temps = ", ".join(f"{t:.1f}" for t in temperatures)
+                lines.append(f"  {window:<8} {encoder:>8.2f}s {decoder:>8.2f}s  {temps}")
+
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"  {name}: {value}")
+        return lines
+
+    def brief(self):
+        """One-line summary for a status bar."""
+        totals = self.totals()
+        parts = [f"{name} {totals[name][2]:.1f}s" for name in ("model_load", "encoder", "decoder") if name in totals]
+        fallbacks = self.counters.get("temperature_fallbacks", 0)
+        if fallbacks:
+            parts.append(f"{fallbacks} fallback(s)")
+        return ", ".join(parts)
+
+    def _windows(self):
+        """{window: (encoder_seconds, decoder_self_seconds, temperatures)} of the decode passes."""
+        windows = {}
+        with self._lock:
+            for span in self.spans:
+                window = span["args"].get("window", -1)
+                if window < 0 or span["name"] not in ("encoder", "decoder"):
+                    continue
+                encoder, decoder, temperatures = windows.get(window, (0.0, 0.0, []))
+                if span["name"] == "encoder":
+                    encoder += span["duration"]
+                else:
+                    decoder += span["self"]
+                    temperatures = temperatures + [span["args"]["temperature"]]
+                windows[window] = (encoder, decoder, temperatures)
+        return windows
+
+    def to_chrome_trace(self):
+        """Trace Event Format, for chrome://tracing or https://ui.perfetto.dev."""
+        pid = os.getpid()
+        with self._lock:
+            events = [
+                {
+                    "name": span["name"],
+                    "ph": "X",
+                    "ts": round(span["start"] * 1e6, 1),
+                    "dur": round(span["duration"] * 1e6, 1),
+                    "pid": pid,
+                    "tid": span["thread"],
+                    "args": span["args"],
+                }
+                for span in self.spans
+            ]
+            counters = dict(self.counters)
+        return {"traceEvents": events, "otherData": counters}
+
+    def to_json(self):
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+        stages = {
+            name: {"calls": count, "total_s": total, "self_s": own}
+            for name, (count, total, own) in self.totals().items()
+        }
+        return {"wall_s": self.wall_seconds(), "stages": stages, "counters": counters, "spans": spans}
+
+    def save(self, path, trace_format="chrome"):
+        data = self.to_chrome_trace() if trace_format == "chrome" else self.to_json()
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+
+def span(name, **args):
+    """Times the enclosed block as `name` if a profiler is active in this thread."""
+    profiler = _active.get()
+    if profiler is None:
+        return _NO_SPAN
+    return profiler.span(name, **args)
+
+
+def count(name, n=1):
+    profiler = _active.get()
+    if profiler is not None:
+        profiler.count(name, n)
+
+
+def _timed(name, function):
+    def wrapper(*args, **kwargs):
+        with span(name):
+            return function(*args, **kwargs)
+
+    return wrapper
+
+
+def _patch_whisper():
+    global _patch_users, _patch_originals
+    import whisper
+    import whisper.audio
+    import whisper.transcribe  # noqa: F401 (the package attribute is the function; patched via sys.modules)
+
+    with _patch_lock:
+        _patch_users += 1
+        if _patch_users > 1:
+            return
+        transcribe_module = sys.modules["whisper.transcribe"]
+        _patch_originals = (whisper.audio.load_audio, whisper.load_audio, transcribe_module.log_mel_spectrogram)
+        whisper.audio.load_audio = _timed("ffmpeg_decode", _patch_originals[0])
+        whisper.load_audio = _timed("ffmpeg_decode", _patch_originals[1])
+        transcribe_module.log_mel_spectrogram = _timed("mel", _patch_originals[2])
+
+
+def _unpatch_whisper():
+    global _patch_users, _patch_originals
+    import whisper
+
+    with _patch_lock:
+        _patch_users -= 1
+        if _patch_users > 0:
+            return
+        transcribe_module = sys.modules["whisper.transcribe"]
+        whisper.audio.load_audio, whisper.load_audio, transcribe_module.log_mel_spectrogram = _patch_originals
+        _patch_originals = None
+
+
+@contextmanager
+def activate(profiler):
+    """
+    Makes `profiler` receive the spans of everything the current thread runs inside
+    the block, and times ffmpeg decoding and the mel spectrogram. A None profiler
+    does nothing.
+    """
+    if profiler is None:
+        yield
+        return
+
+    _patch_whisper()
+    token = _active.set(profiler)
+    try:
+        yield
+    finally:
+        _active.reset(token)
+        _unpatch_whisper()
+
+
+@contextmanager
+def instrument(model):
+    """
+    Adds language detection, encoder and decoder spans for `model` to the active
+    profiler, per 30-second window, and counts temperature fallbacks.
+    Does nothing while no profiler is active. Calls made on `model` from other
+    threads (it may be shared) run untimed. Nesting is allowed: inside a block
+    that already times `model` for the same profiler this does nothing, and
+    otherwise the previous wrappers are put back on exit.
+    """
+    profiler = _active.get()
+    if profiler is None or getattr(model.__dict__.get("decode"), "profiler", None) is profiler:
+        yield
+        return
+
+    window = [-1]
+    original_decode = model.decode
+    original_detect_language = model.detect_language
+    original_encoder_forward = model.encoder.forward
+
+    def decode(mel, options=None, **kwargs):
+        if _active.get() is not profiler:
+            return original_decode(mel, options, **kwargs) if options is not None else original_decode(mel, **kwargs)
+        # transcribe() decodes each window at temperature 0 first and retries at
+        # higher temperatures when the result fails its quality checks.
+        temperature = options.temperature if options is not None else 0.0
+        if not temperature:
+            window[0] += 1
+        else:
+            profiler.count("temperature_fallbacks")
+        with profiler.span("decoder", window=window[0], temperature=temperature):
+            if options is None:
+                return original_decode(mel, **kwargs)
+            return original_decode(mel, options, **kwargs)
+
+    def encoder_forward(*args, **kwargs):
+        if _active.get() is not profiler:
+            return original_encoder_forward(*args, **kwargs)
+        # A span, not begin/end hooks: a cancel raised inside the encoder still closes it.
+        with profiler.span("encoder", window=window[0]):
+            return original_encoder_forward(*args, **kwargs)
+
+    decode.profiler = profiler
+    wrappers = [
+        (model, "decode", decode),
+        (model, "detect_language", _timed("language_detection", original_detect_language)),
+        (model.encoder, "forward", encoder_forward),
+    ]
+    previous = [target.__dict__.get(name, _UNSET) for target, name, _ in wrappers]
+    for target, name, wrapper in wrappers:
+        setattr(target, name, wrapper)
+    try:
+        yield
+    finally:
+        for (target, name, wrapper), value in zip(wrappers, previous):
+            # Another thread may have wrapped the method again since; its exit restores ours,
+            # which then only passes calls through.
+            if target.__dict__.get(name) is not wrapper:
+                continue
+            if value is _UNSET:
+                delattr(target, name)
+            else:
+                setattr(target, name, value)
@@ -0,0 +1,48 @@
+import sys
+from contextlib import contextmanager
+
+
+class _ProgressBar:
+    """
+    A tqdm-like class that forwards progress to `on_progress(current, total)`.
+    """
+
+    on_progress = None
+
+    def __init__(self, *args, **kwargs):
+        self.total = kwargs.get("total", 100)
+        self.current = 0
+        self.unit = kwargs.get("unit", "it")
+
+    def update(self, n=1):
+        self.current += n
+        if self.on_progress:
+            self.on_progress(self.current, self.total)
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+@contextmanager
+def reporting(on_progress):
+    """
+    Replaces the progress bar of `whisper.transcribe` inside the block, so every
+    update calls `on_progress(current, total)` (total is in mel frames).
+    """
+    import whisper.transcribe  # noqa: F401 (patched below via sys.modules)
+
+    bar = type("ProgressBar", (_ProgressBar,), {"on_progress": staticmethod(on_progress)})
+    transcribe_module = sys.modules["whisper.transcribe"]
+    original_tqdm = transcribe_module.tqdm
+    # Some whisper versions import tqdm as a module, others the class.
+    transcribe_module.tqdm = type("ProgressShim", (), {"tqdm": bar}) if hasattr(original_tqdm, "tqdm") else bar
+    try:
+        yield
+    finally:
+        transcribe_module.tqdm = original_tqdm
@@ -0,0 +1,177 @@
+import difflib
+import logging
+import os
+import re
+import time
+
+import torch
+import whisper
+from torch.ao.nn.quantized.dynamic import Linear as DynamicLinear
+from whisper.audio import SAMPLE_RATE
+from whisper.model import ModelDimensions, Whisper
+
+from opentranscriber import atomic, cache, models
+
+logger = logging.getLogger(__name__)
+
+
+def quantized_dir():
+    return os.path.join(cache.cache_root(), "quantized")
+
+
+def _replace_linears(model, make):
+    """Replaces every linear layer of `model` with `make(layer)`, in place."""
+    for parent in list(model.modules()):
+        for child_name, child in list(parent.named_children()):
+            if isinstance(child, torch.nn.Linear):
+                setattr(parent, child_name, make(child))
+    return model
+
+
+def _empty_int8_linear(linear):
+    return DynamicLinear(linear.in_features, linear.out_features, bias_=linear.bias is not None, dtype=torch.qint8)
+
+
+def _int8_linear(linear):
+    """
+    The dynamically quantized equivalent of `linear`, quantized the way
+    `torch.ao.quantization.quantize_dynamic` does (per-tensor symmetric int8
+    weights). `quantize_dynamic` itself only converts exact `nn.Linear` modules,
+    and whisper's layers are a subclass.
+    """
+    observer = torch.ao.quantization.default_weight_observer()
+    weight = linear.weight.detach().float()
+    observer(weight)
+    scale, zero_point = observer.calculate_qparams()
+    quantized = _empty_int8_linear(linear)
+    bias = None if linear.bias is None else linear.bias.detach().float()
+    quantized.set_weight_bias(torch.quantize_per_tensor(weight, float(scale), int(zero_point), torch.qint8), bias)
+    return quantized
+
+
+def quantize_int8(model):
+    """
+    Applies dynamic INT8 quantization to the linear layers of a Whisper model, in place.
+    Weights are stored as int8; activations are quantized on the fly at inference time.
+    """
+    return _replace_linears(model.float(), _int8_linear)
+
+
+def _int8_skeleton(dims):
+    """
+    A quantized Whisper model without weights, to load a saved state dict into:
+    built on the meta device, so nothing is allocated or randomly initialized.
+    """
+    with torch.device("meta"):
+        model = Whisper(ModelDimensions(**dims))
+    return _replace_linears(model, _empty_int8_linear)
+
+
+def _quantized_path(name):
+    safe_name = re.sub(r"[^\w.-]", "_", name)
+    # Packed int8 weights are tied to the torch build that produced them.
+    return os.path.join(quantized_dir(), f"{safe_name}-int8-torch{torch.__version__}.pt")
+
+
+def load_quantized_model(name):
+    """
+    Returns an INT8 CPU model. The quantized weights are cached on disk, so the
+    conversion from the fp32 checkpoint only happens the first time.
+    """
+    path = _quantized_path(name)
+
+    if os.path.exists(path):
+        try:
+            # Tensors and plain values only: the cache directory is not trusted with code.
+            checkpoint = torch.load(path, map_location="cpu", weights_only=True)
+            model = _int8_skeleton(checkpoint["dims"])
+            model.load_state_dict(checkpoint["model_state_dict"], assign=True)
+            models._restore_unsaved_buffers(model, name)
+            logger.info(f"Quantization: Loaded cached INT8 weights from {path}")
+            return model
+        except Exception as e:
+            logger.warning(f"Quantization: Ignoring unusable cached weights {path}: {e}")
+
+    logger.info(f"Quantization: Converting '{name}' to INT8 (only done once)...")
+    model = quantize_int8(whisper.load_model(name, device="cpu"))
+    try:
+        _save(model, path)
+    except OSError as e:
+        logger.warning(f"Quantization: Could not cache INT8 weights: {e}")
+    return model
+
+
+def _save(model, path):
+    # The alignment heads are not saved: they come from whisper, like for any checkpoint.
+    checkpoint = {"dims": dict(model.dims.__dict__), "model_state_dict": model.state_dict()}
+    with atomic.atomic_write(path, "wb") as f:
+        torch.save(checkpoint, f)
+
+
+def _words(text):
+    return re.findall(r"\w+", text.lower())
+
+
+def word_difference(reference, hypothesis):
+    """
+    Word-level edit counts between two transcripts, ignoring case and punctuation.
+    Returns (substitutions, deletions, insertions, reference_word_count).
+    """
+    ref, hyp = _words(reference), _words(hypothesis)
+    substitutions = deletions = insertions = 0
+
+    for tag, i1, i2, j1, j2 in difflib.SequenceMatcher(None, ref, hyp, autojunk=False).get_opcodes():
+        if tag == "replace":
+            common = min(i2 - i1, j2 - j1)
+            substitutions += common
+            deletions += (i2 - i1) - common
+            insertions += (j2 - j1) - common
+        elif tag == "delete":
+            deletions += i2 - i1
+        elif tag == "insert":
+            insertions += j2 - j1
+
+    return substitutions, deletions, insertions, len(ref)
+
+
+def compare(file_path, model_type):
+    """
+    Transcribes the file with the fp32 and the INT8 model and reports the speedup
+    and the word-level difference of the INT8 transcript against the fp32 one.
+    """
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    audio = whisper.load_audio(file_path)
+    duration = len(audio) / SAMPLE_RATE
+    runs = {}
+
+    for dtype in ("float32", "int8"):
+        start = time.perf_counter()
+        model = models.get_model(model_type, device="cpu", dtype=dtype)
+        load_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        result = model.transcribe(audio, fp16=False)
+        runs[dtype] = (load_seconds, time.perf_counter() - start, result["text"])
+        logger.info(f"Compare: {dtype} transcribed {duration:.1f}s of audio in {runs[dtype][1]:.1f}s.")
+
+        model = None
+        models.release_model(model_type, dtype=dtype)
+
+    fp32_load, fp32_time, fp32_text = runs["float32"]
+    int8_load, int8_time, int8_text = runs["int8"]
+    substitutions, deletions, insertions, ref_words = word_difference(fp32_text, int8_text)
+    errors = substitutions + deletions + insertions
+
+    report = [
+        f"Quantization report for '{file_path}' (model: {model_type}, {duration:.1f}s of audio)",
+        f"  fp32: load {fp32_load:.1f}s, transcribe {fp32_time:.1f}s (RTF {fp32_time / max(duration, 1e-9):.3f})",
+        f"  int8: load {int8_load:.1f}s, transcribe {int8_time:.1f}s (RTF {int8_time / max(duration, 1e-9):.3f})",
+        f"  Speedup: {fp32_time / max(int8_time, 1e-9):.2f}x",
+        f"  Word difference vs fp32: {errors / max(ref_words, 1):.2%} "
+        f"({substitutions} substituted, {deletions} deleted, {insertions} inserted of {ref_words} words)",
+    ]
+    for line in report:
+        logger.info(line)
+    return report
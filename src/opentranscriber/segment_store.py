@@ -0,0 +1,200 @@
+import json
+import logging
+import os
+
+import numpy as np
+
+from opentranscriber import atomic, cache
+
+logger = logging.getLogger(__name__)
+
+JOURNAL_VERSION = 1
+
+
+def journal_path(key):
+    """Edit journal of the transcript with cache key `key`."""
+    return os.path.join(cache.cache_root(), "journals", f"{key}.jsonl")
+
+
+class SegmentStore:
+    """
+    Compact, editable copy of the segments of a Whisper `result`, for the editor.
+
+    Start and end times live in arrays and the texts in one UTF-8 buffer indexed by
+    offsets; tokens, log-probabilities and the other per-segment decoder fields
+    are dropped (the full result stays in the transcript cache). Edited texts are
+    kept apart from the buffer and, once a journal is open, appended to it as they
+    happen, so they survive a crash and are replayed when the transcript is opened
+    again.
+    """
+
+    def __init__(self, starts, ends, text_buffer, text_offsets, language=None):
+        self.starts = starts
+        self.ends = ends
+        self.language = language
+        self._buffer = text_buffer
+        self._offsets = text_offsets
+        self._edits = {}
+        self._journal = None
+        self._journal_path = None
+
+    @classmethod
+    def from_result(cls, result):
+        segments = result.get("segments", [])
+        encoded = [segment["text"].strip().encode("utf-8") for segment in segments]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum([len(text) for text in encoded])
+        return cls(
+            np.array([segment["start"] for segment in segments], dtype=np.float64),
+            np.array([segment["end"] for segment in segments], dtype=np.float64),
+            b"".join(encoded),
+            offsets,
+            result.get("language"),
+        )
+
+    def __len__(self):
+        return len(self.starts)
+
+    def text(self, index):
+        if index in self._edits:
+            return self._edits[index]
+        return self.original_text(index)
+
+    def original_text(self, index):
+        return self._buffer[self._offsets[index] : self._offsets[index + 1]].decode("utf-8")
+
+    def texts(self):
+        return (self.text(index) for index in range(len(self)))
+
+    @property
+    def edited(self):
+        """Number of segments whose text differs from the transcript."""
+        return len(self._edits)
+
+    def set_text(self, index, text):
+        self._apply(index, text)
+        if self._journal:
+            self._journal.write(json.dumps({"i": index, "text": text}, ensure_ascii=False) + "\n")
+            self._journal.flush()
+
+    def _apply(self, index, text):
+        # A text reverted to the transcript's is no longer an edit.
+        if text == self.original_text(index):
+            self._edits.pop(index, None)
+        else:
+            self._edits[index] = text
+
+    def to_result(self, full=None):
+        """
+        A Whisper-style `result` with the current texts, for the output writers.
+        As in Whisper's output, segment texts start with a space and the result's
+        text is their concatenation. Given the `full` result the store was made
+        from (e.g. from the transcript cache), its segments keep their other
+        fields, except that edited segments lose the tokens and words that no
+        longer match their text; otherwise they only have times and texts.
+        """
+        if full is not None and len(full.get("segments", [])) != len(self):
+            logger.warning("The full result does not match the edited segments; saving times and texts only.")
+            full = None
+
+        if full is not None:
+            segments = [
+                self._edited_segment(segment, index) if index in self._edits else segment
+                for index, segment in enumerate(full["segments"])
+            ]
+            return {**full, "text": "".join(segment["text"] for segment in segments), "segments": segments}
+
+        segments = [
+            {
+                "id": index,
+                "start": float(self.starts[index]),
+                "end": float(self.ends[index]),
+                "text": f" {self.text(index).strip()}",
+            }
+            for index in range(len(self))
+        ]
+        return {
+            "text": "".join(segment["text"] for segment in segments),
+            "segments": segments,
+            "language": self.language,
+        }
+
+    def _edited_segment(self, segment, index):
+        segment = {key: value for key, value in segment.items() if key not in ("tokens", "words")}
+        return {**segment, "text": f" {self._edits[index].strip()}"}
+
+    # --- Journal -------------------------------------------------------------
+
+    def open_journal(self, path):
+        """
+        Replays the edits recorded in `path`, then records every later edit there.
+        A torn last line (crash mid-write) is discarded. Returns the number of
+        segments restored.
+        """
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        lines, valid_bytes = self._replay(path)
+
+        if lines is None:
+            self._write_journal(path)
+        elif lines > 2 * len(self._edits) + 64:
+            # Mostly superseded keystroke-by-keystroke entries: keep only the latest text per segment.
+            self._write_journal(path)
+        else:
+            with open(path, "r+b") as f:
+                f.truncate(valid_bytes)
+
+        self._journal = open(path, "a", encoding="utf-8")
+        self._journal_path = path
+        return len(self._edits)
+
+    def _replay(self, path):
+        """Applies the journal's edits. Returns (entries, bytes of complete entries), or (None, 0) without one."""
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None, 0
+
+        entries = 0
+        valid_bytes = 0
+        for line in data.splitlines(keepends=True):
+            try:
+                if not line.endswith(b"\n"):
+                    raise ValueError("incomplete entry")
+                entry = json.loads(line)
+                if valid_bytes == 0:
+                    if entry != {"v": JOURNAL_VERSION, "segments": len(self)}:
+                        logger.warning(f"Journal {path} belongs to a different transcript; starting a new one.")
+                        return None, 0
+                elif 0 <= entry["i"] < len(self):
+                    self._apply(entry["i"], entry["text"])
+                    entries += 1
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Journal {path}: Ignoring everything after byte {valid_bytes}: {e}")
+                break
+            valid_bytes += len(line)
+
+        if valid_bytes == 0:
+            return None, 0
+        return entries, valid_bytes
+
+    def _write_journal(self, path):
+        with atomic.atomic_write(path) as f:
+            f.write(json.dumps({"v": JOURNAL_VERSION, "segments": len(self)}) + "\n")
+            for index, text in sorted(self._edits.items()):
+                f.write(json.dumps({"i": index, "text": text}, ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self._journal:
+            self._journal.close()
+            self._journal = None
+
+    def discard_journal(self):
+        """Closes and deletes the journal, once the edits have been saved elsewhere."""
+        self.close()
+        if self._journal_path:
+            try:
+                os.remove(self._journal_path)
+            except FileNotFoundError:
+                pass
+            self._journal_path = None
@@ -0,0 +1,570 @@
+import argparse
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import queue
+import re
+import shutil
+import signal
+import socketserver
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import BrokenExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from opentranscriber import (
+    atomic,
+    cache,
+    cli,
+    export,
+    models,
+    pool,
+    progressbar,
+    setup_ffmpeg_path,
+    setup_logging,
+    streaming,
+    tuning,
+)
+
+logger = logging.getLogger(__name__)
+
+RESULT_FORMATS = export.FORMATS
+DEFAULT_PORT = 8765
+DEFAULT_MAX_QUEUE = 64
+DEFAULT_MAX_UPLOAD_MB = 2048
+MAX_JSON_BYTES = 64 * 1024
+# Finished jobs are kept for polling until they are this old or this many; older ones are forgotten.
+FINISHED_JOB_TTL = 3600.0  # seconds
+MAX_FINISHED_JOBS = 1000
+UPLOAD_CHUNK = 1024 * 1024
+
+
+class QueueFull(Exception):
+    """Raised when a job is submitted while the queue is at its maximum depth."""
+
+
+class PathNotAllowed(Exception):
+    """Raised when a submitted path lies outside every `--allow-path` directory."""
+
+
+class RequestTooLarge(Exception):
+    """Raised when a request body exceeds its size limit."""
+
+
+class Job:
+    def __init__(self, file_path, model_type, priority=0, options=None, upload=False):
+        self.id = uuid.uuid4().hex
+        self.file_path = file_path
+        self.model_type = model_type
+        self.priority = priority
+        self.options = options or {}
+        self.upload = upload
+        self.status = "queued"
+        self.progress = 0.0
+        self.error = None
+        self.result_path = None
+        self.created = time.time()
+        self.started = None
+        self.finished = None
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "status": self.status,
+            "progress": round(self.progress, 4),
+            "file": os.path.basename(self.file_path) if self.upload else self.file_path,
+            "model": self.model_type,
+            "priority": self.priority,
+            "error": self.error,
+            "created": self.created,
+            "started": self.started,
+            "finished": self.finished,
+        }
+
+
+# --- Worker process side ---------------------------------------------------
+
+
+def _run_server_job(job_id, file_path, model_type, options, progress):
+    """Worker job: transcribes through `cli.transcribe_media` with the worker's warm models."""
+
+    def report(current, total):
+        if total:
+            progress[job_id] = min(current / total, 1.0)
+
+    with progressbar.reporting(report):
+        return cli.transcribe_media(file_path, model_type, None, **options)
+
+
+# --- Server process side ---------------------------------------------------
+
+
+class TranscriptionService:
+    """
+    Schedules jobs onto a pool of worker processes that keep their models loaded.
+
+    Jobs wait in a priority queue (lower `priority` values run first, FIFO within a
+    priority); a submit that finds `max_queue` jobs waiting raises `QueueFull`.
+    Cancelled jobs stay in the queue until a dispatcher skips them, so the waiting
+    jobs are counted separately. One dispatcher thread per worker takes the next
+    job only once a worker is free, so a late high-priority job overtakes
+    everything still waiting.
+
+    Results are kept on disk rather than in memory, until their job is forgotten
+    (see `FINISHED_JOB_TTL`). If a worker process dies, the pool is replaced and
+    the jobs it was running are tried once more on the new one.
+    """
+
+    def __init__(self, model_type="base", workers=1, max_queue=DEFAULT_MAX_QUEUE, dtype="float32"):
+        self.model_type = model_type
+        self.workers = workers
+        self.dtype = dtype
+        self.max_queue = max_queue
+        self.jobs = OrderedDict()
+        self._lock = threading.Lock()
+        self._queue = queue.PriorityQueue()
+        self._pending = 0  # jobs in `_queue` still waiting to run
+        self._sequence = itertools.count()
+        self.worker_restarts = 0
+        spool = os.path.join(cache.cache_root(), "server-results")
+        os.makedirs(spool, exist_ok=True)
+        self._results_dir = tempfile.mkdtemp(dir=spool)
+
+        context = multiprocessing.get_context("spawn")
+        self._manager = context.Manager()
+        self._progress = self._manager.dict()
+        self._executor = pool.worker_pool(model_type, workers, dtype)
+        self._dispatchers = [
+            threading.Thread(target=self._dispatch, name=f"dispatcher-{i}", daemon=True) for i in range(workers)
+        ]
+        for thread in self._dispatchers:
+            thread.start()
+
+    def submit(self, file_path, model_type=None, priority=0, options=None, upload=False):
+        job = Job(file_path, model_type or self.model_type, priority, {"dtype": self.dtype, **(options or {})}, upload)
+        with self._lock:
+            if self._pending >= self.max_queue:
+                raise QueueFull(f"Queue is full ({self.max_queue} jobs waiting)")
+            self._queue.put_nowait((priority, next(self._sequence), job))
+            self._pending += 1
+            self.jobs[job.id] = job
+            forgotten = self._forget_old_jobs()
+        for old_job in forgotten:
+            self._remove_result(old_job)
+        logger.info(f"Server: Queued job {job.id} ({job.file_path}, model {job.model_type}, priority {priority}).")
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            job = self.jobs.get(job_id)
+        if job is not None and job.status == "running":
+            job.progress = self._progress.get(job.id, job.progress)
+        return job
+
+    def result(self, job):
+        """The `result` of a finished job, read back from disk."""
+        with open(job.result_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def cancel(self, job_id):
+        """Cancels a queued job. Returns False if it is already running or finished."""
+        with self._lock:
+            job = self.jobs.get(job_id)
+            if job is None or job.status != "queued":
+                return False
+            job.status = "cancelled"
+            job.finished = time.time()
+            self._pending -= 1
+        self._remove_upload(job)
+        return True
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self.jobs.values()]
+        return {
+            "workers": self.workers,
+            "model": self.model_type,
+            "dtype": self.dtype,
+            "queued": statuses.count("queued"),
+            "running": statuses.count("running"),
+            "max_queue": self.max_queue,
+            "worker_restarts": self.worker_restarts,
+        }
+
+    def close(self):
+        """Cancels the queued jobs, waits for the running ones and stops the workers."""
+        with self._lock:
+            queued = [job for job in self.jobs.values() if job.status == "queued"]
+        for job in queued:
+            self.cancel(job.id)
+        for _ in self._dispatchers:
+            # Sorts after every real job.
+            self._queue.put((float("inf"), next(self._sequence), None))
+        for thread in self._dispatchers:
+            thread.join()
+        self._executor.shutdown()
+        self._manager.shutdown()
+        shutil.rmtree(self._results_dir, ignore_errors=True)
+
+    def _dispatch(self):
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+
+            with self._lock:
+                if job.status != "queued":
+                    continue  # cancelled while waiting
+                self._pending -= 1
+                job.status = "running"
+                job.started = time.time()
+
+            try:
+                job.result_path = self._save_result(job, self._run(job))
+            except Exception as e:
+                logger.error(f"Server: Job {job.id} failed: {e}")
+                job.error = str(e)
+                job.status = "failed"
+            else:
+                job.progress = 1.0
+                job.status = "done"
+                logger.info(f"Server: Job {job.id} done in {time.time() - job.started:.1f}s.")
+            finally:
+                job.finished = time.time()
+                self._progress.pop(job.id, None)
+                self._remove_upload(job)
+
+    def _run(self, job):
+        """Runs `job` on a worker. If the pool is broken (a worker died), replaces it and tries once more."""
+        for attempt in (1, 2):
+            executor = self._executor
+            try:
+                future = executor.submit(
+                    _run_server_job, job.id, job.file_path, job.model_type, job.options, self._progress
+                )
+                return future.result()
+            except BrokenExecutor as e:
+                self._restart_workers(executor)
+                if attempt == 2:
+                    raise RuntimeError("The worker process died while running the job") from e
+                logger.warning(f"Server: The worker pool broke while running job {job.id}; retrying it.")
+
+    def _restart_workers(self, broken):
+        with self._lock:
+            if self._executor is not broken:
+                return  # another dispatcher already replaced it
+            logger.warning("Server: A worker process died; starting a new worker pool.")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self._executor = pool.worker_pool(self.model_type, self.workers, self.dtype)
+            self.worker_restarts += 1
+
+    def _save_result(self, job, result):
+        path = os.path.join(self._results_dir, f"{job.id}.json")
+        with atomic.atomic_write(path) as f:
+            json.dump(result, f, ensure_ascii=False)
+        return path
+
+    def _remove_result(self, job):
+        if job.result_path:
+            try:
+                os.remove(job.result_path)
+            except OSError:
+                pass
+
+    def _forget_old_jobs(self):
+        """Drops finished jobs past their age or count limit. Returns them; called with the lock held."""
+        finished = [job for job in self.jobs.values() if job.finished is not None]
+        expired = time.time() - FINISHED_JOB_TTL
+        forgotten = [
+            job for i, job in enumerate(finished) if job.finished < expired or i < len(finished) - MAX_FINISHED_JOBS
+        ]
+        for job in forgotten:
+            del self.jobs[job.id]
+        return forgotten
+
+    def _remove_upload(self, job):
+        if job.upload:
+            shutil.rmtree(os.path.dirname(job.file_path), ignore_errors=True)
+
+
+def _job_options(params):
+    """Transcription options a job may set, validated."""
+    options = {}
+    if _truthy(params.get("stream")):
+        window = float(params.get("stream_window", streaming.DEFAULT_WINDOW))
+        if window < 30:
+            raise ValueError("stream_window must be at least 30 seconds")
+        options["stream_window"] = window
+    if _truthy(params.get("vad")):
+        options["use_vad"] = True
+    if _truthy(params.get("refresh")):
+        options["refresh_cache"] = True
+    if _truthy(params.get("no_cache")):
+        options["use_cache"] = False
+    return options
+
+
+def _truthy(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    """
+    POST   /jobs                   submit: JSON {"path": ...} or a raw upload (?filename=...)
+    GET    /jobs/<id>              status and progress
+    GET    /jobs/<id>/result       result, ?format=srt|vtt|txt|tsv|json (default: json)
+    DELETE /jobs/<id>              cancel a queued job
+    GET    /health                 queue and worker counts
+
+    A JSON "path" is only accepted inside the server's `--allow-path` directories.
+    """
+
+    protocol_version = "HTTP/1.1"
+
+    @property
+    def service(self):
+        return self.server.service
+
+    def log_message(self, format, *args):
+        logger.debug(f"Server: {self.address_string()} {format % args}")
+
+    def address_string(self):
+        # Unix-socket peers have no (host, port) address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send(self, status, body, content_type="application/json; charset=utf-8", headers=None):
+        data = body.encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_json(self, status, payload, headers=None):
+        self._send(status, json.dumps(payload, ensure_ascii=False), headers=headers)
+
+    def _route(self):
+        url = urlsplit(self.path)
+        params = {name: values[-1] for name, values in parse_qs(url.query).items()}
+        return [part for part in url.path.split("/") if part], params
+
+    def do_GET(self):
+        parts, params = self._route()
+
+        if parts == ["health"]:
+            return self._send_json(200, self.service.stats())
+        if len(parts) not in (2, 3) or parts[0] != "jobs" or (len(parts) == 3 and parts[2] != "result"):
+            return self._send_json(404, {"error": "Not found"})
+
+        job = self.service.get(parts[1])
+        if job is None:
+            return self._send_json(404, {"error": "Unknown job"})
+        if len(parts) == 2:
+            return self._send_json(200, job.to_dict())
+
+        if job.status != "done":
+            return self._send_json(409, {"error": f"Job is {job.status}", **job.to_dict()})
+        output_format = params.get("format", "json")
+        if output_format not in RESULT_FORMATS:
+            return self._send_json(400, {"error": f"format must be one of {', '.join(RESULT_FORMATS)}"})
+        try:
+            result = self.service.result(job)
+        except (OSError, ValueError) as e:
+            logger.error(f"Server: Could not read the result of job {job.id}: {e}")
+            return self._send_json(500, {"error": f"Could not read result: {e}"})
+        if output_format == "json":
+            return self._send_json(200, result)
+        try:
+            text = export.render(result, output_format)
+        except Exception as e:
+            logger.error(f"Server: Could not render job {job.id} as {output_format}: {e}")
+            return self._send_json(500, {"error": f"Could not render result: {e}"})
+        return self._send(200, text, content_type="text/plain; charset=utf-8")
+
+    def do_POST(self):
+        parts, params = self._route()
+        if parts != ["jobs"]:
+            return self._send_json(404, {"error": "Not found"})
+
+        upload_dir = None
+        try:
+            if self.headers.get("Content-Type", "").startswith("application/json"):
+                length = int(self.headers.get("Content-Length", 0))
+                if length > MAX_JSON_BYTES:
+                    raise RequestTooLarge(f"JSON body exceeds {MAX_JSON_BYTES // 1024} KB")
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not isinstance(body, dict):
+                    raise ValueError("JSON body must be an object")
+                params.update(body)
+                file_path = self._allowed_path(params.get("path"))
+            else:
+                upload_dir, file_path = self._receive_upload(params)
+
+            model_type = params.get("model", self.service.model_type)
+            if model_type not in models.MODEL_NAMES:
+                raise ValueError(f"model must be one of {', '.join(models.MODEL_NAMES)}")
+            priority = int(params.get("priority", 0))
+            options = _job_options(params)
+        except PathNotAllowed as e:
+            self.close_connection = True
+            return self._send_json(403, {"error": str(e)})
+        except RequestTooLarge as e:
+            # The body is not read; don't reuse the connection.
+            self.close_connection = True
+            return self._send_json(413, {"error": str(e)})
+        except (ValueError, TypeError, OSError) as e:
+            # The body may not have been read; don't reuse the connection.
+            self.close_connection = True
+            if upload_dir:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+            return self._send_json(400, {"error": str(e)})
+
+        try:
+            job = self.service.submit(file_path, model_type, priority, options, upload=upload_dir is not None)
+        except QueueFull as e:
+            if upload_dir:
+                shutil.rmtree(upload_dir, ignore_errors=True)
+            return self._send_json(503, {"error": str(e)}, headers={"Retry-After": "5"})
+
+        self._send_json(202, job.to_dict(), headers={"Location": f"/jobs/{job.id}"})
+
+    def do_DELETE(self):
+        parts, _ = self._route()
+        if len(parts) != 2 or parts[0] != "jobs":
+            return self._send_json(404, {"error": "Not found"})
+        job = self.service.get(parts[1])
+        if job is None:
+            return self._send_json(404, {"error": "Unknown job"})
+        if not self.service.cancel(job.id):
+            return self._send_json(409, {"error": f"Job is {job.status}", **job.to_dict()})
+        self._send_json(200, job.to_dict())
+
+    def _allowed_path(self, file_path):
+        """The real path of a JSON-submitted file, if it lies inside an allowed directory."""
+        if not isinstance(file_path, str) or not file_path:
+            raise ValueError("'path' must be a file path")
+        roots = self.server.allowed_paths
+        if not roots:
+            raise PathNotAllowed("Path submits are disabled (start the server with --allow-path); upload the file")
+        real_path = os.path.realpath(file_path)
+        if not any(os.path.commonpath([root, real_path]) == root for root in roots):
+            raise PathNotAllowed(f"Path is outside the allowed directories: {file_path}")
+        if not os.path.isfile(real_path):
+            raise ValueError(f"File not found: {file_path}")
+        return real_path
+
+    def _receive_upload(self, params):
+        """Streams the request body into a private spool directory. Returns (directory, file path)."""
+        length = int(self.headers.get("Content-Length", 0))
+        if length <= 0:
+            raise ValueError("Upload is empty (send JSON with a 'path', or the media bytes)")
+        if length > self.server.max_upload_bytes:
+            raise RequestTooLarge(f"Upload exceeds {self.server.max_upload_bytes // (1024 * 1024)} MB")
+
+        # Only the base name is used, and only safe characters: the client picks it.
+        file_name = re.sub(r"[^\w.-]", "_", os.path.basename(params.get("filename", "upload"))) or "upload"
+        spool = os.path.join(cache.cache_root(), "server-uploads")
+        os.makedirs(spool, exist_ok=True)
+        directory = tempfile.mkdtemp(dir=spool)
+        path = os.path.join(directory, file_name)
+
+        with open(path, "wb") as f:
+            remaining = length
+            while remaining:
+                data = self.rfile.read(min(UPLOAD_CHUNK, remaining))
+                if not data:
+                    shutil.rmtree(directory, ignore_errors=True)
+                    raise ValueError("Upload ended early")
+                f.write(data)
+                remaining -= len(data)
+        return directory, path
+
+
+class UnixHTTPServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def main():
+    """
+    Entry point for the transcription server.
+    """
+    setup_logging()
+    setup_ffmpeg_path()
+
+    parser = argparse.ArgumentParser(description="Local transcription server with warm models")
+    parser.add_argument("--host", default="127.0.0.1", help="Address to listen on (default: 127.0.0.1)")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help=f"TCP port (default: {DEFAULT_PORT})")
+    parser.add_argument("--socket", metavar="PATH", help="Listen on this Unix socket instead of TCP")
+    parser.add_argument("--model", default="base", choices=models.MODEL_NAMES, help="Model preloaded by every worker")
+    parser.add_argument("--quantize", default="none", choices=list(cli.QUANTIZE_DTYPES), help="(default: none)")
+    parser.add_argument("--workers", type=int, help="Concurrent jobs (default: the autotuned value, else 1)")
+    parser.add_argument(
+        "--max-queue",
+        type=int,
+        default=DEFAULT_MAX_QUEUE,
+        help=f"Jobs allowed to wait; more are rejected with 503 (default: {DEFAULT_MAX_QUEUE})",
+    )
+    parser.add_argument(
+        "--max-upload-mb", type=int, default=DEFAULT_MAX_UPLOAD_MB, help=f"(default: {DEFAULT_MAX_UPLOAD_MB})"
+    )
+    parser.add_argument(
+        "--allow-path",
+        action="append",
+        default=[],
+        metavar="DIR",
+        help="Accept JSON path submits for files under DIR (repeatable; default: uploads only)",
+    )
+    args = parser.parse_args()
+
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_queue < 1:
+        parser.error("--max-queue must be at least 1")
+    if args.socket and not hasattr(socketserver, "UnixStreamServer"):
+        parser.error("--socket is not supported on this platform")
+
+    dtype = cli.QUANTIZE_DTYPES[args.quantize]
+    workers = args.workers or tuning.saved_settings(args.model, dtype).get("workers", 1)
+
+    # Threads are split evenly among the workers.
+    tuning.configure()
+    service = TranscriptionService(args.model, workers, args.max_queue, dtype)
+
+    if args.socket:
+        if os.path.exists(args.socket):
+            os.remove(args.socket)
+        httpd = UnixHTTPServer(args.socket, RequestHandler)
+        address = args.socket
+    else:
+        httpd = ThreadingHTTPServer((args.host, args.port), RequestHandler)
+        address = f"http://{args.host}:{args.port}"
+    httpd.service = service
+    httpd.max_upload_bytes = args.max_upload_mb * 1024 * 1024
+    httpd.allowed_paths = [os.path.realpath(path) for path in args.allow_path]
+
+    # Stop cleanly on SIGTERM too. shutdown() blocks until serve_forever returns,
+    # so it must not run on the thread that is serving.
+    signal.signal(signal.SIGTERM, lambda signum, frame: threading.Thread(target=httpd.shutdown).start())
+
+    logger.info(f"Server: Listening on {address} with {workers} worker(s), model '{args.model}' ({dtype}).")
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        logger.info("Server: Shutting down...")
+    finally:
+        httpd.server_close()
+        service.close()
+        if args.socket and os.path.exists(args.socket):
+            os.remove(args.socket)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,192 @@
+import logging
+import subprocess
+import tempfile
+
+import numpy as np
+
+from opentranscriber import chunking, profiling, vad
+from opentranscriber.audio import HOP_LENGTH, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_WINDOW = 300.0  # seconds of audio decoded and transcribed per window
+SPLIT_SEARCH = 10.0  # seconds at the end of a window searched for a pause to cut at
+PROMPT_CHARS = 200  # trailing text of the previous window used as prompt for the next
+
+
+def read_pcm_windows(file_path, window_seconds=DEFAULT_WINDOW, start=0.0, duration=None):
+    """
+    Decodes the file through an ffmpeg pipe and yields it as float32 mono 16 kHz
+    arrays of at most `window_seconds`, so memory never holds more than one window.
+    `start` skips the first seconds of the input (used to resume); with `duration`,
+    ffmpeg stops decoding after that many seconds.
+    """
+    # fmt: off
+    cmd = ["ffmpeg", "-nostdin", "-loglevel", "error", "-threads", "0"]
+    if start > 0:
+        cmd += ["-ss", f"{start:.3f}"]
+    cmd += ["-i", file_path]
+    if duration is not None:
+        cmd += ["-t", f"{duration:.3f}"]
+    cmd += [
+        "-f", "s16le",
+        "-ac", "1",
+        "-acodec", "pcm_s16le",
+        "-ar", str(SAMPLE_RATE),
+        "-",
+    ]
+    # fmt: on
+    window_bytes = int(window_seconds * SAMPLE_RATE) * 2
+
+    # stderr goes to a file: a pipe that is only read at the end fills up when ffmpeg
+    # reports many decode errors, and then both processes wait on each other.
+    stderr_file = tempfile.TemporaryFile()
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=stderr_file)
+    finished = False
+    try:
+        while True:
+            with profiling.span("ffmpeg_decode"):
+                data = process.stdout.read(window_bytes)
+            if data:
+                yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+            if len(data) < window_bytes:
+                break
+        finished = True
+    finally:
+        process.stdout.close()
+        if not finished and process.poll() is None:
+            # The consumer stopped early (error or cancellation): don't decode the rest.
+            process.kill()
+        returncode = process.wait()
+        stderr_file.seek(0)
+        stderr = stderr_file.read().decode(errors="replace")
+        stderr_file.close()
+
+    if returncode != 0:
+        raise RuntimeError(f"Failed to load audio: {stderr.strip()}")
+
+
+def _split_at_pause(audio, search_samples):
+    """Index of the quietest point in the last `search_samples` of the window."""
+    if len(audio) <= search_samples:
+        return len(audio)
+
+    frame_samples = SAMPLE_RATE // 10
+    tail_start = len(audio) - search_samples
+    energy = chunking.frame_rms(audio[tail_start:], frame_samples)
+    if not len(energy):
+        return len(audio)
+    return tail_start + int(np.argmin(energy)) * frame_samples + frame_samples // 2
+
+
+def _shift_segment(segment, offset, segment_id):
+    segment = {
+        **segment,
+        "id": segment_id,
+        "start": segment["start"] + offset,
+        "end": segment["end"] + offset,
+        "seek": segment["seek"] + round(offset * SAMPLE_RATE / HOP_LENGTH),
+    }
+    if "words" in segment:
+        segment["words"] = [
+            {**word, "start": word["start"] + offset, "end": word["end"] + offset} for word in segment["words"]
+        ]
+    return segment
+
+
+def _pause_aligned_windows(file_path, window_seconds, start):
+    """
+    Re-cuts the decoded windows at a pause near their end and carries the remainder
+    over into the next window, so words are not split at window boundaries.
+    """
+    window_samples = int(window_seconds * SAMPLE_RATE)
+    search_samples = int(min(SPLIT_SEARCH, window_seconds / 4) * SAMPLE_RATE)
+    carry = np.zeros(0, dtype=np.float32)
+
+    for window in read_pcm_windows(file_path, window_seconds=window_seconds, start=start):
+        audio = np.concatenate([carry, window]) if len(carry) else window
+        if len(window) < window_samples:
+            # Short read: this is the last window.
+            carry = carry[:0]
+            yield audio
+            break
+
+        cut = _split_at_pause(audio, search_samples)
+        carry = audio[cut:]
+        yield audio[:cut]
+
+    if len(carry):
+        yield carry
+
+
+def stream_segments(
+    model,
+    file_path,
+    window_seconds=DEFAULT_WINDOW,
+    start=0.0,
+    first_id=0,
+    previous_text="",
+    use_vad=False,
+    **transcribe_options,
+):
+    """
+    Transcribes the file window by window while ffmpeg is still decoding it.
+    With `use_vad`, only the speech in each window is transcribed.
+
+    Yields (segments, language, processed_until) after every window, with segment
+    timestamps on the global timeline. `processed_until` is the input time (in
+    seconds) up to which the audio has been fully transcribed; a run restarted with
+    `start=processed_until` (and the text decoded so far as `previous_text`)
+    continues where this one stopped.
+    """
+    options = {"fp16": False, **transcribe_options}
+    offset = start
+    next_id = first_id
+
+    for audio in _pause_aligned_windows(file_path, window_seconds, start):
+        if previous_text and "initial_prompt" not in transcribe_options:
+            options["initial_prompt"] = previous_text[-PROMPT_CHARS:]
+        if use_vad:
+            result = vad.transcribe_speech(model, audio, **options)
+        else:
+            result = model.transcribe(audio, **options)
+        # Keep the detected language for later windows instead of re-detecting it.
+        options["language"] = result["language"]
+
+        segments = [_shift_segment(segment, offset, next_id + i) for i, segment in enumerate(result["segments"])]
+        next_id += len(segments)
+        previous_text = (previous_text + result["text"])[-PROMPT_CHARS:]
+        offset += len(audio) / SAMPLE_RATE
+
+        logger.info(f"Streaming: Transcribed up to {offset:.1f}s ({len(segments)} new segment(s)).")
+        yield segments, result["language"], offset
+
+
+def transcribe_streaming(model, file_path, window_seconds=DEFAULT_WINDOW, **transcribe_options):
+    """
+    Bounded-memory equivalent of `model.transcribe(file_path)`, returning the same
+    `result` dict plus the "duration" of the input in seconds.
+    """
+    segments = []
+    language = transcribe_options.get("language")
+    duration = 0.0
+
+    for new_segments, language, duration in stream_segments(model, file_path, window_seconds, **transcribe_options):
+        segments.extend(new_segments)
+
+    return {
+        "text": "".join(segment["text"] for segment in segments),
+        "segments": segments,
+        "language": language,
+        "duration": duration,
+    }
+
+
+def probe_duration(file_path):
+    """Duration of the media file in seconds according to ffprobe, or None if it can't tell."""
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=nw=1:nk=1", file_path]
+    try:
+        output = subprocess.run(cmd, capture_output=True, text=True, check=True).stdout
+        return float(output.strip())
+    except (OSError, subprocess.CalledProcessError, ValueError):
+        return None
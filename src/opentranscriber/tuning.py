@@ -0,0 +1,323 @@
+import json
+import logging
+import os
+import time
+
+import numpy as np
+
+from opentranscriber import atomic, models, pool, streaming
+from opentranscriber.audio import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SAMPLE_SECONDS = 60.0
+# Memory of a worker process beyond its model's weights: torch, activations, audio.
+WORKER_OVERHEAD_MB = 512
+WARM_UP_TIMEOUT = 600.0  # seconds every worker gets to load its model before the timing starts
+
+# Thread and CPU settings requested for this process (see `configure`).
+_requested = {"threads": None, "interop_threads": None, "cpus": None}
+_pending = False
+
+
+def config_path():
+    """File where `autotune` stores the best settings found on this machine."""
+    if os.getenv("OPENTRANSCRIBER_TUNING_FILE"):
+        return os.environ["OPENTRANSCRIBER_TUNING_FILE"]
+    default = os.path.join(os.path.expanduser("~"), ".config")
+    return os.path.join(os.getenv("XDG_CONFIG_HOME", default), "opentranscriber", "tuning.json")
+
+
+def available_cpus():
+    """CPUs this process may run on (respects an affinity set from outside, e.g. taskset)."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def parse_cpu_list(text):
+    """Parses a CPU list such as "0-7,16,18" into a sorted list of CPU ids."""
+    cpus = set()
+    try:
+        for part in text.split(","):
+            part = part.strip()
+            if "-" in part:
+                first, last = part.split("-", 1)
+                cpus.update(range(int(first), int(last) + 1))
+            elif part:
+                cpus.add(int(part))
+    except ValueError as e:
+        raise ValueError(f"Invalid CPU list: {text!r}") from e
+
+    if not cpus:
+        raise ValueError(f"Invalid CPU list: {text!r}")
+    return sorted(cpus)
+
+
+def split_cpus(cpus, parts):
+    """Splits a CPU list into `parts` contiguous, disjoint slices of (nearly) equal size."""
+    parts = max(1, min(parts, len(cpus)))
+    size, extra = divmod(len(cpus), parts)
+    slices = []
+    start = 0
+    for i in range(parts):
+        end = start + size + (1 if i < extra else 0)
+        slices.append(cpus[start:end])
+        start = end
+    return slices
+
+
+def apply_threads(threads=None, interop_threads=None, cpus=None):
+    """Applies torch thread counts and a CPU affinity to the current process. None leaves a setting alone."""
+    if cpus:
+        if hasattr(os, "sched_setaffinity"):
+            os.sched_setaffinity(0, cpus)
+        else:
+            logger.warning("CPU affinity is not supported on this platform; ignoring it.")
+    if not threads and not interop_threads:
+        return
+
+    import torch
+
+    if threads:
+        torch.set_num_threads(threads)
+    if interop_threads:
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError as e:
+            # torch only allows this before its first parallel operation.
+            logger.warning(f"Could not set inter-op threads: {e}")
+
+
+def configure(threads=None, interop_threads=None, cpus=None):
+    """
+    Sets the thread counts and CPU affinity for this process and remembers them,
+    so worker pools started later can divide them among their workers.
+
+    The affinity applies right away; the torch thread counts are applied by
+    `apply_pending` before the first model loads, so runs that never need a model
+    (e.g. cache hits) never import torch.
+    """
+    global _pending
+    _requested.update(threads=threads, interop_threads=interop_threads, cpus=cpus)
+    apply_threads(cpus=cpus)
+    _pending = True
+
+
+def apply_pending():
+    """Applies the thread counts from the last `configure` call, once."""
+    global _pending
+    if _pending:
+        _pending = False
+        apply_threads(_requested["threads"], _requested["interop_threads"])
+
+
+def worker_settings(workers):
+    """
+    Per-worker (threads, interop_threads, cpu_slices) for a pool of `workers` processes.
+
+    Unless threads were requested explicitly, each worker gets an equal share of the
+    CPUs, so N workers never run N times as many threads as there are cores. With a
+    CPU list, every worker is pinned to its own disjoint slice of it.
+    """
+    cpus = _requested["cpus"]
+    threads = _requested["threads"] or max(1, len(cpus or available_cpus()) // workers)
+    cpu_slices = split_cpus(cpus, workers) if cpus else None
+    return threads, _requested["interop_threads"], cpu_slices
+
+
+def _settings_key(model_type, dtype):
+    return f"{model_type}:{dtype}"
+
+
+def load_config():
+    try:
+        with open(config_path(), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except (OSError, ValueError) as e:
+        logger.warning(f"Ignoring unreadable tuning file {config_path()}: {e}")
+        return {}
+
+
+def saved_settings(model_type, dtype="float32", cpus=None):
+    """
+    The settings `autotune` found best for this model, e.g. {"threads": 8, "workers": 6},
+    or {} if it has not been run (or was run with a different number of CPUs than
+    `cpus`, by default all CPUs available to this process).
+    """
+    settings = load_config().get(_settings_key(model_type, dtype), {})
+    if settings and settings.get("cpu_count") != len(cpus or available_cpus()):
+        logger.info("Tuning: Saved settings were measured with a different number of CPUs; ignoring them.")
+        return {}
+    return settings
+
+
+def save_settings(model_type, dtype, settings):
+    path = config_path()
+    config = load_config()
+    config[_settings_key(model_type, dtype)] = settings
+    with atomic.atomic_write(path) as f:
+        json.dump(config, f, indent=2)
+
+
+def _powers_of_two(limit):
+    counts = []
+    n = 1
+    while n < limit:
+        counts.append(n)
+        n *= 2
+    return counts + [limit]
+
+
+def available_memory_bytes():
+    """Memory available to new processes (MemAvailable on Linux), or None if unknown."""
+    try:
+        with open("/proc/meminfo", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def max_workers_for_memory(model_bytes, available=None):
+    """How many worker processes, each holding a model of `model_bytes`, fit in the available memory."""
+    available = available if available is not None else available_memory_bytes()
+    if available is None:
+        return None
+    return max(1, available // (model_bytes + WORKER_OVERHEAD_MB * 1024 * 1024))
+
+
+def _warm_up(barrier, audio, model_type, dtype):
+    """
+    Worker job: transcribes a short clip, then waits until every worker has done
+    the same. A worker blocked in the barrier takes no other job, so the jobs of
+    one warm-up round run on distinct, fully initialized workers.
+    """
+    _transcribe_sample(audio, model_type, dtype)
+    barrier.wait(WARM_UP_TIMEOUT)
+    return os.getpid()
+
+
+def read_sample(file_path, sample_seconds):
+    """Decodes only the first `sample_seconds` of the file."""
+    windows = streaming.read_pcm_windows(file_path, window_seconds=sample_seconds, duration=sample_seconds)
+    try:
+        return next(windows, np.zeros(0, dtype=np.float32))
+    finally:
+        windows.close()
+
+
+def _transcribe_sample(audio, model_type, dtype):
+    """Worker job: transcribes the sample once and returns the wall time."""
+    model = models.get_model(model_type, device="cpu", dtype=dtype)
+    start = time.perf_counter()
+    model.transcribe(audio, fp16=False)
+    return time.perf_counter() - start
+
+
+def autotune(
+    file_path,
+    model_type,
+    dtype="float32",
+    sample_seconds=DEFAULT_SAMPLE_SECONDS,
+    thread_counts=None,
+    max_workers=None,
+    cpus=None,
+):
+    """
+    Measures this machine and saves the fastest settings for `model_type`:
+
+    - threads: the torch thread count with the lowest real-time factor for one file;
+    - workers: the number of worker processes (each with an equal share of the
+      CPUs) with the highest throughput for batches.
+
+    The first `sample_seconds` of `file_path` are used as the workload. Worker
+    counts are tried up to `max_workers`, and never beyond the number of models
+    that fit in the available memory. With `cpus`, everything runs on those CPUs
+    only, as later runs with the same affinity will. Returns the saved settings.
+    """
+    import multiprocessing
+
+    import torch
+
+    if not os.path.exists(file_path):
+        raise FileNotFoundError(f"File not found: {file_path}")
+
+    audio = read_sample(file_path, sample_seconds)
+    if not len(audio):
+        raise RuntimeError(f"No audio in {file_path}")
+    seconds = len(audio) / SAMPLE_RATE
+    cpus = cpus or available_cpus()
+    apply_threads(cpus=cpus)
+    thread_counts = thread_counts or _powers_of_two(len(cpus))
+    logger.info(f"Tuning: '{model_type}' ({dtype}) on {len(cpus)} CPU(s) with {seconds:.1f}s of audio.")
+
+    # Single file: one process, varying the intra-op thread count.
+    model = models.get_model(model_type, device="cpu", dtype=dtype)
+    model.transcribe(audio[:SAMPLE_RATE], fp16=False)  # warm-up
+    rtfs = {}
+    for threads in thread_counts:
+        torch.set_num_threads(threads)
+        start = time.perf_counter()
+        model.transcribe(audio, fp16=False)
+        rtfs[threads] = (time.perf_counter() - start) / seconds
+        logger.info(f"Tuning: {threads:>3} thread(s): RTF {rtfs[threads]:.3f}")
+    model_bytes = models.model_memory_bytes(model)
+    model = None
+    models.release_model(model_type, dtype=dtype)
+    best_threads = min(rtfs, key=rtfs.get)
+
+    worker_limit = min(len(cpus), max_workers or len(cpus))
+    memory_limit = max_workers_for_memory(model_bytes)
+    if memory_limit is not None and memory_limit < worker_limit:
+        logger.info(f"Tuning: Memory fits {memory_limit} worker(s) with '{model_type}'; trying no more than that.")
+        worker_limit = memory_limit
+
+    # Batches: N worker processes sharing the CPUs, one copy of the sample each.
+    throughputs = {}
+    manager = multiprocessing.get_context("spawn").Manager()
+    for workers in _powers_of_two(worker_limit):
+        threads = max(1, len(cpus) // workers)
+        with pool.worker_pool(model_type, workers, dtype, threads=threads, cpus=cpus) as executor:
+            # Only time once every worker has loaded its model.
+            barrier = manager.Barrier(workers)
+            warm_up = [
+                executor.submit(_warm_up, barrier, audio[:SAMPLE_RATE], model_type, dtype) for _ in range(workers)
+            ]
+            for future in warm_up:
+                future.result()
+
+            start = time.perf_counter()
+            list(executor.map(_transcribe_sample, [audio] * workers, [model_type] * workers, [dtype] * workers))
+            wall = time.perf_counter() - start
+
+        throughputs[workers] = workers * seconds / wall
+        logger.info(
+            f"Tuning: {workers:>3} worker(s) x {threads} thread(s): "
+            f"{throughputs[workers]:.2f} audio-seconds per wall-second"
+        )
+    manager.shutdown()
+    best_workers = max(throughputs, key=throughputs.get)
+
+    settings = {
+        "threads": best_threads,
+        "workers": best_workers,
+        "rtf": round(rtfs[best_threads], 4),
+        "throughput": round(throughputs[best_workers], 4),
+        "cpu_count": len(cpus),
+        "sample_seconds": round(seconds, 1),
+        "tuned_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+    save_settings(model_type, dtype, settings)
+    logger.info(
+        f"Tuning: Best single-file setting: {best_threads} thread(s); "
+        f"best batch setting: {best_workers} worker(s). Saved to {config_path()}"
+    )
+    return settings
@@ -0,0 +1,177 @@
+import logging
+
+import numpy as np
+
+from opentranscriber import profiling
+from opentranscriber.audio import HOP_LENGTH, SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.03  # analysis frame length
+BLOCK_FRAMES = 8192  # frames analysed per FFT batch, to bound memory on long inputs
+SPEECH_BAND = (150.0, 4000.0)  # Hz; where voiced speech carries most of its energy
+ENERGY_MARGIN_DB = 8.0  # speech must be this much louder than the noise floor
+MIN_ENERGY_DB = -50.0  # dBFS; quieter frames are never speech
+MAX_FLATNESS = 0.5  # spectral flatness above this is noise-like (white noise is ~0.56)
+FLATNESS_FRAMES = 5  # frames the flatness is median-filtered over
+MIN_SPEECH = 0.25  # seconds; shorter bursts are dropped
+MIN_SILENCE = 1.0  # seconds; shorter pauses stay part of the speech around them
+PADDING = 0.3  # seconds of context kept on both sides of every region
+
+
+def frame_features(audio, frame_samples):
+    """
+    Per-frame loudness (RMS in dBFS) and spectral flatness within the speech band,
+    for consecutive non-overlapping frames (a trailing partial frame is dropped).
+    """
+    n_frames = len(audio) // frame_samples
+    energy = np.empty(n_frames, dtype=np.float32)
+    flatness = np.empty(n_frames, dtype=np.float32)
+
+    window = np.hanning(frame_samples).astype(np.float32)
+    freqs = np.fft.rfftfreq(frame_samples, 1 / SAMPLE_RATE)
+    band = (freqs >= SPEECH_BAND[0]) & (freqs <= SPEECH_BAND[1])
+
+    for first in range(0, n_frames, BLOCK_FRAMES):
+        last = min(first + BLOCK_FRAMES, n_frames)
+        frames = audio[first * frame_samples : last * frame_samples].reshape(last - first, frame_samples)
+        rms = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        energy[first:last] = 20 * np.log10(rms + 1e-10)
+
+        power = np.square(np.abs(np.fft.rfft(frames * window, axis=1)[:, band])) + 1e-12
+        flatness[first:last] = np.exp(np.mean(np.log(power), axis=1)) / np.mean(power, axis=1)
+
+    return energy, flatness
+
+
+def _running_median(values, width):
+    """Median of each value and its neighbours, `width` (odd) values in all; edges are repeated."""
+    if len(values) == 0:
+        return values
+    padded = np.pad(values, width // 2, mode="edge")
+    return np.median(np.lib.stride_tricks.sliding_window_view(padded, width), axis=1)
+
+
+def _runs(mask):
+    """[start, end) index pairs of the runs of True in a boolean array, as an (n, 2) array."""
+    edges = np.flatnonzero(np.diff(np.concatenate([[0], mask.astype(np.int8), [0]])))
+    return edges.reshape(-1, 2)
+
+
+def _close_gaps(regions, min_gap):
+    """Merges neighbouring regions separated by less than `min_gap`."""
+    if len(regions) < 2:
+        return regions
+    keep = regions[1:, 0] - regions[:-1, 1] >= min_gap
+    starts = regions[np.concatenate([[True], keep]), 0]
+    ends = regions[np.concatenate([keep, [True]]), 1]
+    return np.stack([starts, ends], axis=1)
+
+
+def detect_speech(
+    audio,
+    min_speech=MIN_SPEECH,
+    min_silence=MIN_SILENCE,
+    padding=PADDING,
+    margin_db=ENERGY_MARGIN_DB,
+):
+    """
+    Finds the speech in 16 kHz mono audio. Returns a list of (start, end) sample
+    offsets of the speech regions, padded, sorted and non-overlapping.
+
+    A frame counts as speech when it is `margin_db` louder than the recording's
+    noise floor (its 10th loudness percentile) and its spectrum is not flat like
+    noise. Pauses shorter than `min_silence` are bridged, bursts shorter than
+    `min_speech` dropped.
+    """
+    frame_samples = int(FRAME_SECONDS * SAMPLE_RATE)
+    energy, flatness = frame_features(audio, frame_samples)
+    if not len(energy):
+        return []
+
+    threshold = max(float(np.percentile(energy, 10)) + margin_db, MIN_ENERGY_DB)
+    # A few noise frames look peaky by chance; unfiltered, bridging the pauses
+    # between them would turn steady noise into one long region.
+    flatness = _running_median(flatness, FLATNESS_FRAMES)
+    regions = _runs((energy > threshold) & (flatness < MAX_FLATNESS))
+
+    regions = _close_gaps(regions, min_silence / FRAME_SECONDS)
+    if len(regions):
+        regions = regions[regions[:, 1] - regions[:, 0] >= min_speech / FRAME_SECONDS]
+
+    pad = int(padding * SAMPLE_RATE)
+    regions = np.clip(regions * frame_samples + [-pad, pad], 0, len(audio))
+    regions = _close_gaps(regions, 1)
+    return [(int(start), int(end)) for start, end in regions]
+
+
+def speech_only(audio):
+    """The speech regions of `audio` joined together, and the regions (see `detect_speech`)."""
+    with profiling.span("vad"):
+        regions = detect_speech(audio)
+
+    speech_samples = sum(end - start for start, end in regions)
+    logger.info(
+        f"VAD: {speech_samples / SAMPLE_RATE:.1f}s of speech in {len(regions)} region(s) "
+        f"out of {len(audio) / SAMPLE_RATE:.1f}s."
+    )
+    if not regions:
+        return audio[:0], regions
+    if speech_samples == len(audio):
+        return audio, regions
+    return np.concatenate([audio[start:end] for start, end in regions]), regions
+
+
+def to_original_time(seconds, regions, end=False):
+    """
+    Maps a time on the joined speech audio back to the original timeline.
+    A time on the seam between two regions maps to the end of the first one if
+    `end`, else to the start of the second.
+    """
+    lengths = np.array([region_end - start for start, region_end in regions]) / SAMPLE_RATE
+    joined_starts = np.concatenate([[0.0], np.cumsum(lengths)[:-1]])
+    i = max(0, int(np.searchsorted(joined_starts, seconds, side="left" if end else "right")) - 1)
+    return float(regions[i][0] / SAMPLE_RATE + min(max(seconds - joined_starts[i], 0.0), lengths[i]))
+
+
+def remap_result(result, regions):
+    """Moves the segment and word timestamps of a result for the joined speech onto the original timeline."""
+    segments = []
+    for segment in result["segments"]:
+        start = to_original_time(segment["start"], regions)
+        end = to_original_time(segment["end"], regions, end=True)
+        shift = start - segment["start"]
+        segment = {
+            **segment,
+            "start": start,
+            "end": end,
+            "seek": segment["seek"] + round(shift * SAMPLE_RATE / HOP_LENGTH),
+        }
+        if "words" in segment:
+            segment["words"] = [
+                {
+                    **word,
+                    "start": to_original_time(word["start"], regions),
+                    "end": to_original_time(word["end"], regions, end=True),
+                }
+                for word in segment["words"]
+            ]
+        segments.append(segment)
+    return {**result, "segments": segments}
+
+
+def empty_result(language=None):
+    """What `model.transcribe` would return for audio without any speech."""
+    return {"text": "", "segments": [], "language": language}
+
+
+def transcribe_speech(model, audio, **transcribe_options):
+    """
+    `model.transcribe(audio)` on the speech regions only: silence and noise never
+    reach the encoder, so they cost nothing and cannot be hallucinated into text.
+    Timestamps in the result are on the timeline of `audio`.
+    """
+    speech, regions = speech_only(audio)
+    if not regions:
+        return empty_result(transcribe_options.get("language"))
+    return remap_result(model.transcribe(speech, **transcribe_options), regions)
@@ -0,0 +1,585 @@
+import argparse
+import ctypes
+import ctypes.util
+import hashlib
+import json
+import logging
+import os
+import select
+import signal
+import struct
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, wait
+
+from opentranscriber import atomic, batch, cache, cli, export, models, pool, setup_ffmpeg_path, setup_logging, tuning
+
+logger = logging.getLogger(__name__)
+
+MEDIA_EXTENSIONS = (".mp4", ".mkv", ".mov", ".webm", ".avi", ".mp3", ".wav", ".m4a", ".ogg", ".opus", ".flac", ".aac")
+PARTIAL_SUFFIXES = (".part", ".partial", ".tmp", ".crdownload", ".download")
+DEFAULT_SETTLE = 2.0  # seconds a file must stay unchanged before it is picked up
+OPEN_FILE_SETTLE = 60.0  # for files inotify saw created but not closed (e.g. a writer that died)
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify(7)
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM = 0x040
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_DELETE_SELF = 0x400
+IN_MOVE_SELF = 0x800
+IN_Q_OVERFLOW = 0x4000
+IN_ISDIR = 0x40000000
+_EVENT_HEADER = struct.Struct("iIII")
+
+
+def is_media(name):
+    """Whether `name` looks like a finished media file (not hidden, not a partial download)."""
+    lower = name.lower()
+    return not name.startswith(".") and lower.endswith(MEDIA_EXTENSIONS) and not lower.endswith(PARTIAL_SUFFIXES)
+
+
+def index_path(directory):
+    """Default index of a watched directory, in the cache directory."""
+    digest = hashlib.sha256(os.path.abspath(directory).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache.cache_root(), "watch", f"{digest}.jsonl")
+
+
+class ProcessedIndex:
+    """
+    Persistent index of content hash -> status ("done" or "failed") of the files a
+    watcher has processed, kept as an append-only JSON-lines log (the last entry
+    per hash wins, like the editor's edit journal).
+
+    Each entry also records the path, size and mtime the hash was computed for, so
+    a restarted watcher recognises files it has already seen from one `stat` call,
+    without reading them again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.statuses = {}
+        self._files = {}  # path -> (size, mtime_ns, digest)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        if self._load() > 2 * len(self._files) + 64:
+            # Mostly superseded entries (files that failed, then succeeded): keep the latest per path.
+            self._rewrite()
+        self._log = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        """Replays the log. Returns the number of entries read."""
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return 0
+
+        for line in lines:
+            try:
+                entry = json.loads(line)
+                self.statuses[entry["digest"]] = entry["status"]
+                self._files[entry["path"]] = (entry["size"], entry["mtime_ns"], entry["digest"])
+            except (ValueError, KeyError, TypeError) as e:
+                logger.warning(f"Watch: Ignoring a damaged entry in {self.path}: {e}")
+        return len(lines)
+
+    def _rewrite(self):
+        with atomic.atomic_write(self.path) as f:
+            for path, (size, mtime_ns, digest) in self._files.items():
+                entry = self._entry(digest, self.statuses[digest], path, size, mtime_ns)
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+
+    @staticmethod
+    def _entry(digest, status, path, size, mtime_ns, error=None):
+        entry = {"digest": digest, "status": status, "path": path, "size": size, "mtime_ns": mtime_ns}
+        if error:
+            entry["error"] = error
+        return entry
+
+    def known_digest(self, path, stat):
+        """The recorded hash of `path` if it is unchanged since, else None."""
+        size, mtime_ns, digest = self._files.get(path, (None, None, None))
+        if (size, mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            return digest
+        return None
+
+    def digest(self, path, stat):
+        return self.known_digest(path, stat) or cache.file_digest(path)
+
+    def record(self, digest, status, path, stat, error=None):
+        self.statuses[digest] = status
+        self._files[path] = (stat.st_size, stat.st_mtime_ns, digest)
+        entry = self._entry(digest, status, path, stat.st_size, stat.st_mtime_ns, error)
+        self._log.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._log.flush()
+
+    def close(self):
+        self._log.close()
+
+
+class _Inotify:
+    """Minimal inotify binding (Linux, through libc) for one directory."""
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    def __init__(self, directory):
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = self._libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK) < 0:
+            error = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(error, f"inotify_add_watch failed for {directory}")
+
+    @classmethod
+    def create(cls, directory):
+        """An inotify watch on `directory`, or None where inotify is unavailable."""
+        if not sys.platform.startswith("linux"):
+            return None
+        try:
+            return cls(directory)
+        except (OSError, AttributeError) as e:
+            logger.info(f"Watch: inotify unavailable ({e}); polling instead.")
+            return None
+
+    def read(self, timeout):
+        """
+        Waits up to `timeout` seconds for events. Returns [(mask, name)], or None if
+        the kernel's event queue overflowed and the directory must be listed again.
+        """
+        if not select.select([self.fd], [], [], timeout)[0]:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        events = []
+        offset = 0
+        while offset < len(data):
+            _, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset : offset + length].rstrip(b"\0"))
+            offset += length
+            if mask & IN_Q_OVERFLOW:
+                return None
+            events.append((mask, name))
+        return events
+
+    def close(self):
+        os.close(self.fd)
+
+
+class DirectoryWatcher:
+    """
+    Reports the names added to, changed in or removed from a directory.
+
+    Uses inotify where available, so a cycle costs nothing but the events. The
+    polling fallback checks the directory's own mtime, which changes whenever an
+    entry is added, removed or renamed, and only lists the directory (one
+    `scandir`, no `stat` per file) when it did: a quiet directory of tens of
+    thousands of files costs one `stat` per cycle. Polling therefore only notices
+    files that are added or renamed, not files rewritten in place.
+    """
+
+    def __init__(self, directory, use_inotify=True):
+        self.directory = directory
+        self._inotify = _Inotify.create(directory) if use_inotify else None
+        self._names = set()
+        self._mtime_ns = None
+        self._listed_at = 0.0
+
+    @property
+    def mode(self):
+        return "inotify" if self._inotify else "polling"
+
+    def list(self):
+        """All entries of the directory, as the initial set of changes."""
+        self._names = self._scan()
+        return set(self._names)
+
+    def _scan(self):
+        self._mtime_ns = os.stat(self.directory).st_mtime_ns
+        self._listed_at = time.time()
+        with os.scandir(self.directory) as entries:
+            return {entry.name for entry in entries if not entry.is_dir()}
+
+    def changes(self, timeout):
+        """
+        Waits up to `timeout` seconds. Returns ({changed or new name: closed}, removed
+        names), where `closed` tells whether the file's writer is known to have
+        closed it. Only inotify knows; polled files always count as closed.
+        """
+        if self._inotify:
+            events = self._inotify.read(timeout)
+            if events is None:
+                logger.warning("Watch: Event queue overflowed; listing the directory again.")
+                return dict.fromkeys(self.list(), True), set()
+            changed, removed = {}, set()
+            for mask, name in events:
+                if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                    raise FileNotFoundError(f"Watched directory is gone: {self.directory}")
+                if mask & IN_ISDIR:
+                    continue
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    removed.add(name)
+                    changed.pop(name, None)
+                else:
+                    changed[name] = changed.get(name, False) or bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))
+                    removed.discard(name)
+            return changed, removed
+
+        time.sleep(timeout)
+        mtime_ns = os.stat(self.directory).st_mtime_ns
+        # An entry added within the mtime's granularity of the last listing doesn't change it.
+        if mtime_ns == self._mtime_ns and mtime_ns / 1e9 < self._listed_at - 2.0:
+            return {}, set()
+        names = self._scan()
+        changed, removed = names - self._names, self._names - names
+        self._names = names
+        return dict.fromkeys(changed, True), removed
+
+    def close(self):
+        if self._inotify:
+            self._inotify.close()
+
+
+class _Arrival:
+    """A file that appeared and is not yet known to be fully written."""
+
+    __slots__ = ("closed", "size", "mtime_ns")
+
+    def __init__(self, closed):
+        self.closed = closed
+        self.size = None
+        self.mtime_ns = None
+
+
+def _run_watch_job(file_path, model_type, formats, output_directory, options):
+    """Worker job: transcribes one file with the worker's warm model and writes its outputs."""
+    result = cli.transcribe_media(file_path, model_type, None, **options)
+    export.write_outputs(result, file_path, formats, output_directory)
+    return batch.audio_seconds(file_path, result)
+
+
+class HotFolder:
+    """
+    Transcribes the media files that appear in `directory`, on a pool of worker
+    processes that keep `model_type` loaded.
+
+    A file is picked up once it is fully written: with inotify after its writer
+    closed it (or it was moved in), and in any case only once its size and mtime
+    have stayed unchanged for `settle` seconds (`OPEN_FILE_SETTLE` for a file
+    inotify saw created but never closed). Files whose content hash the
+    `ProcessedIndex` already lists, and copies of a file in flight, are skipped;
+    files that failed are only tried again with `retry_failed`.
+    If a worker process dies, the pool is replaced and the files it was running
+    are queued again; a file that was running when workers died twice is
+    recorded as failed, so one that crashes its worker cannot stall the watcher.
+    At most `max_in_flight` files are submitted to the workers at a time; the
+    others wait in arrival order and are only hashed once there is room.
+    """
+
+    def __init__(
+        self,
+        directory,
+        model_type,
+        formats,
+        workers=1,
+        max_in_flight=None,
+        settle=DEFAULT_SETTLE,
+        poll_interval=DEFAULT_POLL_INTERVAL,
+        output_directory=None,
+        index=None,
+        use_inotify=True,
+        retry_failed=False,
+        **options,
+    ):
+        self.directory = directory
+        self.model_type = model_type
+        self.formats = formats
+        self.workers = workers
+        self.max_in_flight = max_in_flight or 2 * workers
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.output_directory = output_directory
+        self.retry_failed = retry_failed
+        self.options = options
+        self.index = ProcessedIndex(index or index_path(directory))
+        self.watcher = DirectoryWatcher(directory, use_inotify)
+        self.stop_event = threading.Event()
+        self.arrivals = {}  # name -> _Arrival
+        self.ready = deque()  # (path, stat), in arrival order
+        self.in_flight = {}  # future -> (path, stat, digest, start)
+        self.lost = set()  # digests of the files a worker died running; they get one more try
+        self.executor = None
+        self.processed = 0
+        self.failed = 0
+        self.worker_restarts = 0
+
+    def run(self, once=False):
+        """
+        Watches until `stop()` is called or, with `once`, until every file present
+        at startup is processed. Returns the number of files that failed.
+        """
+        logger.info(
+            f"Watch: Watching {os.path.abspath(self.directory)} ({self.watcher.mode}) with {self.workers} "
+            f"worker(s), model '{self.model_type}', at most {self.max_in_flight} file(s) in flight."
+        )
+        self._arrived(dict.fromkeys(sorted(self.watcher.list()), True))
+        self.executor = self._worker_pool()
+        try:
+            while not self.stop_event.is_set():
+                self._check_arrivals()
+                self._submit()
+                if once and not (self.arrivals or self.ready or self.in_flight):
+                    break
+                if self._reap(timeout=0.0):
+                    continue  # room for the next file
+
+                timeout = min(self.poll_interval, 0.5) if self.arrivals or self.in_flight else self.poll_interval
+                if not once:
+                    changed, removed = self.watcher.changes(timeout)
+                    self._arrived(changed)
+                    for name in removed:
+                        self.arrivals.pop(name, None)
+                elif self.in_flight:
+                    self._reap(timeout)
+                else:
+                    self.stop_event.wait(timeout)
+        finally:
+            # Files not started yet are picked up again on the next run.
+            for future in self.in_flight:
+                future.cancel()
+            if self.in_flight:
+                logger.info(f"Watch: Waiting for {len(self.in_flight)} file(s) in flight...")
+            while self.in_flight:
+                self._reap(timeout=None)
+            self.executor.shutdown()
+            self.watcher.close()
+            self.index.close()
+        logger.info(f"Watch: Stopped. {self.processed} file(s) transcribed, {self.failed} failed.")
+        return self.failed
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _arrived(self, changes):
+        """Starts watching the files in `changes` ({name: closed}) until they are fully written."""
+        for name, closed in changes.items():
+            if not is_media(name):
+                continue
+            arrival = self.arrivals.setdefault(name, _Arrival(closed))
+            arrival.closed = arrival.closed or closed
+
+    def _check_arrivals(self):
+        """Moves the arrivals that are fully written to the ready queue. Only these files are stat'ed."""
+        now = time.time()
+        for name, arrival in list(self.arrivals.items()):
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.arrivals[name]
+                continue
+
+            if arrival.size is None and self._is_processed(self.index.known_digest(path, stat)):
+                del self.arrivals[name]  # unchanged since it was processed
+                continue
+
+            unchanged = (arrival.size, arrival.mtime_ns) == (stat.st_size, stat.st_mtime_ns)
+            arrival.size, arrival.mtime_ns = stat.st_size, stat.st_mtime_ns
+            settle = self.settle if arrival.closed else max(self.settle, OPEN_FILE_SETTLE)
+            if unchanged and now - stat.st_mtime >= settle:
+                del self.arrivals[name]
+                self.ready.append((path, stat))
+
+    def _worker_pool(self):
+        return pool.worker_pool(self.model_type, self.workers, self.options.get("dtype", "float32"))
+
+    def _restart_workers(self):
+        logger.warning("Watch: A worker process died; starting a new worker pool.")
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.executor = self._worker_pool()
+        self.worker_restarts += 1
+
+    def _submit(self):
+        """Hashes and submits ready files while fewer than `max_in_flight` are running or queued."""
+        while self.ready and len(self.in_flight) < self.max_in_flight:
+            path, stat = self.ready.popleft()
+            try:
+                digest = self.index.digest(path, stat)
+            except OSError as e:
+                logger.warning(f"Watch: Skipping {path}: {e}")
+                continue
+
+            if self._is_processed(digest):
+                status = self.index.statuses[digest]
+                logger.info(f"Watch: Skipping {path}: already {status} (same content).")
+                self.index.record(digest, status, path, stat)
+                continue
+            if any(digest == other for _, _, other, _ in self.in_flight.values()):
+                logger.info(f"Watch: Skipping {path}: a copy of a file in flight.")
+                continue
+
+            try:
+                future = self.executor.submit(
+                    _run_watch_job, path, self.model_type, self.formats, self.output_directory, self.options
+                )
+            except BrokenExecutor:
+                self.ready.appendleft((path, stat))
+                self._restart_workers()
+                continue
+            self.in_flight[future] = (path, stat, digest, time.perf_counter())
+            logger.info(f"Watch: Queued {path} ({len(self.in_flight)} in flight, {len(self.ready)} waiting).")
+
+    def _is_processed(self, digest):
+        status = self.index.statuses.get(digest)
+        return status == "done" or (status == "failed" and not self.retry_failed)
+
+    def _reap(self, timeout):
+        """Records the finished jobs, waiting up to `timeout` seconds for one. Returns how many finished."""
+        if not self.in_flight:
+            return 0
+        finished, _ = wait(self.in_flight, timeout=timeout, return_when=FIRST_COMPLETED)
+        for future in finished:
+            path, stat, digest, start = self.in_flight.pop(future)
+            if future.cancelled():
+                continue
+            try:
+                audio_seconds = future.result()
+            except BrokenExecutor as e:
+                self._worker_lost(path, stat, digest, e)
+                continue
+            except Exception as e:
+                self.lost.discard(digest)
+                self.failed += 1
+                self.index.record(digest, "failed", path, stat, str(e))
+                logger.error(f"Watch: FAILED {path}: {e}")
+            else:
+                self.lost.discard(digest)
+                self.processed += 1
+                self.index.record(digest, "done", path, stat)
+                logger.info(f"Watch: OK {path} ({audio_seconds:.1f}s audio in {time.perf_counter() - start:.1f}s)")
+        return len(finished)
+
+    def _worker_lost(self, path, stat, digest, error):
+        """
+        Handles a file whose worker died. It is queued again (the pool is replaced on
+        the next submit), unless workers died running it before.
+        """
+        if self.stop_event.is_set():
+            # Most likely killed along with the watcher: the file is retried on the next run.
+            logger.error(f"Watch: Worker lost while transcribing {path}: {error}")
+            return
+        if digest not in self.lost:
+            self.lost.add(digest)
+            logger.warning(f"Watch: Worker lost while transcribing {path}; queueing it again.")
+            self.ready.appendleft((path, stat))
+            return
+        self.lost.discard(digest)
+        self.failed += 1
+        message = f"The worker process died twice while transcribing it: {error}"
+        self.index.record(digest, "failed", path, stat, message)
+        logger.error(f"Watch: FAILED {path}: {message}")
+
+
+def main():
+    """
+    Entry point for the hot-folder watcher.
+    """
+    setup_logging()
+    setup_ffmpeg_path()
+
+    parser = argparse.ArgumentParser(description="Transcribe media files as they are dropped into a directory")
+    parser.add_argument("directory", help="Directory to watch")
+    parser.add_argument("--model", default="base", choices=models.MODEL_NAMES)
+    parser.add_argument(
+        "--format", default="srt", help="Output format(s), comma-separated: txt, srt, vtt, tsv, json or all"
+    )
+    parser.add_argument("--output-dir", help="Directory for the outputs (default: next to each media file)")
+    parser.add_argument("--quantize", default="none", choices=list(cli.QUANTIZE_DTYPES), help="(default: none)")
+    parser.add_argument("--workers", type=int, help="Worker processes (default: the autotuned value, else 1)")
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        help="Files handed to the workers at a time; the others wait (default: twice the workers)",
+    )
+    parser.add_argument(
+        "--settle",
+        type=float,
+        default=DEFAULT_SETTLE,
+        help=f"Seconds a file must stay unchanged before it is picked up (default: {DEFAULT_SETTLE:.0f})",
+    )
+    parser.add_argument(
+        "--poll-interval",
+        type=float,
+        default=DEFAULT_POLL_INTERVAL,
+        help=f"Seconds between checks when polling (default: {DEFAULT_POLL_INTERVAL:.0f})",
+    )
+    parser.add_argument("--polling", action="store_true", help="Poll the directory even where inotify is available")
+    parser.add_argument("--index", help="Index of processed files (default: one per directory in the cache)")
+    parser.add_argument("--retry-failed", action="store_true", help="Try files that failed before again")
+    parser.add_argument("--once", action="store_true", help="Process the files already there, then exit")
+    parser.add_argument("--vad", action="store_true", help="Transcribe only the detected speech")
+    args = parser.parse_args()
+
+    if not os.path.isdir(args.directory):
+        parser.error(f"not a directory: {args.directory}")
+    if args.workers is not None and args.workers < 1:
+        parser.error("--workers must be at least 1")
+    if args.max_in_flight is not None and args.max_in_flight < 1:
+        parser.error("--max-in-flight must be at least 1")
+    if args.settle < 0 or args.poll_interval <= 0:
+        parser.error("--settle must not be negative and --poll-interval must be positive")
+    try:
+        formats = export.parse_formats(args.format)
+    except ValueError as e:
+        parser.error(f"--format: {e}")
+    if args.output_dir:
+        os.makedirs(args.output_dir, exist_ok=True)
+
+    dtype = cli.QUANTIZE_DTYPES[args.quantize]
+    workers = args.workers or tuning.saved_settings(args.model, dtype).get("workers", 1)
+
+    # Threads are split evenly among the workers.
+    tuning.configure()
+    try:
+        hot_folder = HotFolder(
+            args.directory,
+            args.model,
+            formats,
+            workers=workers,
+            max_in_flight=args.max_in_flight,
+            settle=args.settle,
+            poll_interval=args.poll_interval,
+            output_directory=args.output_dir,
+            index=args.index,
+            use_inotify=not args.polling,
+            retry_failed=args.retry_failed,
+            dtype=dtype,
+            use_vad=args.vad,
+        )
+    except OSError as e:
+        logger.critical(f"Could not open the index: {e}")
+        sys.exit(1)
+
+    signal.signal(signal.SIGTERM, lambda signum, frame: hot_folder.stop())
+    try:
+        failed = hot_folder.run(once=args.once)
+    except KeyboardInterrupt:
+        logger.info("Watch: Shutting down...")
+        failed = 0
+    except OSError as e:
+        logger.critical(str(e))
+        sys.exit(1)
+    sys.exit(1 if args.once and failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+import json
+import logging
+import os
+import wave
+
+import numpy as np
+
+from opentranscriber import atomic
+from opentranscriber.audio import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+BASE_BIN = 256  # samples per bin at the finest level (16 ms)
+LEVEL_FACTOR = 4  # each level has 4x fewer bins than the one below
+MIN_BINS = 256  # the coarsest level still has at least this many bins
+
+
+def _downsample(level, factor):
+    """Merges every `factor` consecutive bins of a level (rows of min, max, rms)."""
+    starts = np.arange(0, len(level), factor)
+    counts = np.diff(np.append(starts, len(level)))
+    merged = np.empty((len(starts), 3), dtype=np.int16)
+    merged[:, 0] = np.minimum.reduceat(level[:, 0], starts)
+    merged[:, 1] = np.maximum.reduceat(level[:, 1], starts)
+    squares = np.add.reduceat(np.square(level[:, 2], dtype=np.float64), starts)
+    merged[:, 2] = np.sqrt(squares / counts)
+    return merged
+
+
+class PeakBuilder:
+    """
+    Computes the finest level of a peak pyramid from int16 PCM fed block by block,
+    so it can run alongside decoding without holding the audio in memory.
+    """
+
+    def __init__(self, sample_rate=SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.samples = 0
+        self._bins = []
+        self._carry = np.zeros(0, dtype=np.int16)
+
+    def add(self, pcm):
+        self.samples += len(pcm)
+        pcm = np.concatenate([self._carry, pcm]) if len(self._carry) else pcm
+        whole = len(pcm) - len(pcm) % BASE_BIN
+        self._carry = pcm[whole:].copy()
+        if whole:
+            self._bins.append(self._summarize(pcm[:whole].reshape(-1, BASE_BIN)))
+
+    @staticmethod
+    def _summarize(frames):
+        bins = np.empty((len(frames), 3), dtype=np.int16)
+        bins[:, 0] = frames.min(axis=1)
+        bins[:, 1] = frames.max(axis=1)
+        bins[:, 2] = np.sqrt(np.mean(np.square(frames, dtype=np.float32), axis=1))
+        return bins
+
+    def finish(self):
+        """All levels, finest first."""
+        if len(self._carry):
+            self._bins.append(self._summarize(self._carry.reshape(1, -1)))
+            self._carry = self._carry[:0]
+        level = np.concatenate(self._bins) if self._bins else np.zeros((1, 3), dtype=np.int16)
+
+        levels = [level]
+        while len(levels[-1]) >= MIN_BINS * LEVEL_FACTOR:
+            levels.append(_downsample(levels[-1], LEVEL_FACTOR))
+        return levels
+
+    def save(self, base_path):
+        """Writes `<base_path>.npy` (all levels, stacked) and `<base_path>.json` (their layout)."""
+        levels = self.finish()
+        with atomic.atomic_write(base_path + ".npy", "wb") as f:
+            np.save(f, np.concatenate(levels))
+
+        offsets = np.cumsum([0] + [len(level) for level in levels])
+        meta = {
+            "sample_rate": self.sample_rate,
+            "samples": self.samples,
+            "bin": BASE_BIN,
+            "factor": LEVEL_FACTOR,
+            "levels": [[int(offset), len(level)] for offset, level in zip(offsets, levels)],
+        }
+        # Written last: the pyramid is complete once its metadata exists.
+        with atomic.atomic_write(base_path + ".json") as f:
+            json.dump(meta, f)
+
+
+def build_from_wav(wav_path, base_path, block_frames=SAMPLE_RATE * 60):
+    """Computes and saves the pyramid of a 16-bit mono WAV file, reading it block by block."""
+    with wave.open(wav_path, "rb") as track:
+        builder = PeakBuilder(track.getframerate())
+        while True:
+            data = track.readframes(block_frames)
+            if not data:
+                break
+            builder.add(np.frombuffer(data, dtype=np.int16))
+    builder.save(base_path)
+
+
+class PeakPyramid:
+    """
+    Min/max/RMS envelope of a recording at several zoom levels, memory-mapped from
+    disk. Rendering any time range at any width reads about `width * LEVEL_FACTOR`
+    bins, however long the recording is.
+    """
+
+    def __init__(self, data, meta):
+        self.data = data
+        self.sample_rate = meta["sample_rate"]
+        self.duration = meta["samples"] / self.sample_rate
+        self.levels = [
+            (meta["bin"] * meta["factor"] ** k, data[offset : offset + count])
+            for k, (offset, count) in enumerate(meta["levels"])
+        ]
+
+    @classmethod
+    def load(cls, base_path):
+        with open(base_path + ".json", encoding="utf-8") as f:
+            meta = json.load(f)
+        return cls(np.load(base_path + ".npy", mmap_mode="r"), meta)
+
+    @staticmethod
+    def exists(base_path):
+        return os.path.exists(base_path + ".json") and os.path.exists(base_path + ".npy")
+
+    def columns(self, start, end, width):
+        """
+        Envelope of [start, end) seconds at `width` pixels: arrays of min, max and
+        RMS per pixel column, scaled to [-1, 1]. Columns past the end of the audio are 0.
+        """
+        samples_per_px = max((end - start) * self.sample_rate / width, 1e-9)
+
+        # The coarsest level that still has at least one bin per pixel.
+        bin_samples, level = self.levels[0]
+        for candidate_bin, candidate in self.levels:
+            if candidate_bin <= samples_per_px:
+                bin_samples, level = candidate_bin, candidate
+
+        edges = np.floor((start * self.sample_rate + np.arange(width + 1) * samples_per_px) / bin_samples)
+        edges = edges.astype(np.int64)
+        first = np.clip(edges[:-1], 0, len(level))
+        valid = (edges[:-1] >= 0) & (first < len(level))
+        if not valid.any():
+            return np.zeros(width), np.zeros(width), np.zeros(width)
+
+        lo = first[valid][0]
+        hi = max(int(np.clip(edges[-1], 0, len(level))), int(first[valid][-1]) + 1)
+        window = np.asarray(level[lo:hi])
+        offsets = first[valid] - lo
+
+        mins, maxs, rms = np.zeros(width), np.zeros(width), np.zeros(width)
+        mins[valid] = np.minimum.reduceat(window[:, 0], offsets) / 32768
+        maxs[valid] = np.maximum.reduceat(window[:, 1], offsets) / 32768
+        rms[valid] = np.maximum.reduceat(window[:, 2], offsets) / 32768
+        return mins, maxs, rms
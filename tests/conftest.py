@@ -0,0 +1,25 @@
+import numpy as np
+import pytest
+
+from opentranscriber.audio import SAMPLE_RATE
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    """Keeps every test's caches, journals and checkpoints in its own directory."""
+    directory = tmp_path / "cache"
+    monkeypatch.setenv("OPENTRANSCRIBER_CACHE_DIR", str(directory))
+    return directory
+
+
+def voiced(seconds, frequency=220.0, amplitude=0.3):
+    """A harmonic tone: loud and with a peaky spectrum, like voiced speech."""
+    t = np.arange(int(seconds * SAMPLE_RATE)) / SAMPLE_RATE
+    tone = sum(np.sin(2 * np.pi * frequency * k * t) / k for k in (1, 2, 3))
+    return (amplitude * tone / 1.5).astype(np.float32)
+
+
+def quiet(seconds, seed=0):
+    """A faint noise floor."""
+    rng = np.random.default_rng(seed)
+    return (0.001 * rng.standard_normal(int(seconds * SAMPLE_RATE))).astype(np.float32)
@@ -0,0 +1,80 @@
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from opentranscriber import batch, cli, pool, streaming
+
+
+@pytest.fixture
+def media(tmp_path):
+    for name in ("a.mp4", "b.mp3", "c.wav", "notes.txt"):
+        (tmp_path / name).write_bytes(b"media")
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "sub" / "d.mp4").write_bytes(b"media")
+    return tmp_path
+
+
+def test_collect_inputs_expands_globs_in_order_without_duplicates(media):
+    files = batch.collect_inputs([str(media / "*.mp*"), str(media / "a.mp4"), str(media / "**" / "*.mp4")])
+
+    assert files == [str(media / "a.mp4"), str(media / "b.mp3"), str(media / "sub" / "d.mp4")]
+
+
+def test_collect_inputs_reads_a_manifest_relative_to_itself(media):
+    manifest = media / "list.txt"
+    manifest.write_text("# talks\n\nc.wav\nsub/*.mp4\n  a.mp4  \n", encoding="utf-8")
+
+    files = batch.collect_inputs([str(media / "a.mp4")], manifest=str(manifest))
+
+    assert files == [str(media / "a.mp4"), str(media / "c.wav"), str(media / "sub" / "d.mp4")]
+
+
+def test_collect_inputs_keeps_missing_paths_and_skips_empty_globs(media):
+    files = batch.collect_inputs([str(media / "missing.mp4"), str(media / "*.flac")])
+
+    assert files == [str(media / "missing.mp4")]
+
+
+def test_audio_seconds_prefers_the_recorded_duration(monkeypatch):
+    monkeypatch.setattr(streaming, "probe_duration", lambda path: pytest.fail("must not probe"))
+
+    # The last segment ends before the trailing silence: not the duration.
+    result = {"segments": [{"start": 0.0, "end": 2.0, "text": " hi"}], "duration": 3.0}
+
+    assert batch.audio_seconds("a.mp4", result) == 3.0
+
+
+def test_audio_seconds_probes_older_results(monkeypatch):
+    monkeypatch.setattr(streaming, "probe_duration", lambda path: 12.5 if path == "a.mp4" else None)
+
+    assert batch.audio_seconds("a.mp4", {"segments": []}) == 12.5
+    assert batch.audio_seconds("b.mp4", {"segments": []}) == 0.0
+
+
+def test_run_batch_reports_failures_and_keeps_going(media, monkeypatch, caplog):
+    transcribed = []
+
+    def transcribe_media(file_path, model_type, output_format, **options):
+        if file_path.endswith(".mp3"):
+            raise RuntimeError("decode failed")
+        transcribed.append((os.path.basename(file_path), model_type, output_format, options))
+        return {"segments": [], "duration": 2.0}
+
+    monkeypatch.setattr(pool, "worker_pool", lambda *args, **kwargs: ThreadPoolExecutor(2))
+    monkeypatch.setattr(cli, "transcribe_media", transcribe_media)
+    files = [str(media / name) for name in ("a.mp4", "b.mp3", "c.wav", "gone.mp4")]
+
+    with caplog.at_level("INFO", logger="opentranscriber.batch"):
+        failures = batch.run_batch(files, "base", "srt", workers=2, use_vad=True)
+
+    assert sorted(os.path.basename(path) for path, _ in failures) == ["b.mp3", "gone.mp4"]
+    assert sorted(transcribed) == [
+        ("a.mp4", "base", "srt", {"use_vad": True}),
+        ("c.wav", "base", "srt", {"use_vad": True}),
+    ]
+    assert "2 succeeded, 2 failed. 4.0s of audio" in caplog.text
+
+
+def test_run_batch_without_files():
+    assert batch.run_batch([], "base", "srt") == []
@@ -0,0 +1,47 @@
+import numpy as np
+from conftest import quiet, voiced
+
+from opentranscriber import batched
+from opentranscriber.audio import N_SAMPLES, SAMPLE_RATE
+
+
+def check_tiling(chunks, total):
+    """Owned ranges tile [0, total); every window covers its own range and fits the model's 30 s."""
+    assert chunks[0].own_start == 0
+    assert chunks[-1].own_end == total
+    for previous, current in zip(chunks, chunks[1:]):
+        assert previous.own_end == current.own_start
+    for chunk in chunks:
+        assert chunk.start <= chunk.own_start < chunk.own_end <= chunk.end
+        assert chunk.end - chunk.start <= N_SAMPLES
+
+
+def test_windows_split_in_pauses():
+    # Pauses around 22.5 s and 46.5 s, both within reach of the 24 s targets.
+    audio = np.concatenate([voiced(22), quiet(1), voiced(23), quiet(1, seed=1), voiced(20)])
+
+    chunks = batched.plan_windows(audio)
+
+    check_tiling(chunks, len(audio))
+    splits = [chunk.own_end / SAMPLE_RATE for chunk in chunks[:-1]]
+    assert len(splits) == 2
+    assert 22.0 < splits[0] < 23.0
+    assert 46.0 < splits[1] < 47.0
+
+
+def test_windows_without_pauses_still_fit():
+    audio = voiced(200)
+
+    chunks = batched.plan_windows(audio)
+
+    check_tiling(chunks, len(audio))
+    assert len(chunks) >= 200 // (batched.WINDOW_LENGTH + batched.SEARCH_WINDOW)
+
+
+def test_short_and_empty_audio():
+    audio = voiced(10)
+
+    (chunk,) = batched.plan_windows(audio)
+
+    assert chunk == (0, len(audio), 0, len(audio))
+    assert batched.plan_windows(np.zeros(0, dtype=np.float32)) == []
@@ -0,0 +1,109 @@
+import os
+
+from opentranscriber import cache
+
+RESULT = {
+    "text": " Olá, mundo",
+    "segments": [{"id": 0, "start": 0.0, "end": 1.5, "text": " Olá, mundo"}],
+    "language": "pt",
+}
+
+
+def key(n):
+    return cache.cache_key(f"{n:064x}", "base")
+
+
+def test_put_get_round_trip(tmp_path):
+    transcripts = cache.TranscriptCache(str(tmp_path / "transcripts"))
+
+    assert transcripts.get(key(1)) is None
+    transcripts.put(key(1), RESULT)
+
+    assert transcripts.get(key(1)) == RESULT
+    assert cache.TranscriptCache(str(tmp_path / "transcripts")).get(key(1)) == RESULT
+
+
+def test_put_replaces_an_entry(tmp_path):
+    transcripts = cache.TranscriptCache(str(tmp_path / "transcripts"))
+    transcripts.put(key(1), RESULT)
+    transcripts.put(key(1), {**RESULT, "text": " outro"})
+
+    assert transcripts.get(key(1))["text"] == " outro"
+
+
+def test_corrupt_entry_is_a_miss_and_removed(tmp_path):
+    transcripts = cache.TranscriptCache(str(tmp_path / "transcripts"))
+    transcripts.put(key(1), RESULT)
+    path = transcripts._path(key(1))
+    with open(path, "wb") as f:
+        f.write(b"not gzip")
+
+    assert transcripts.get(key(1)) is None
+    assert not os.path.exists(path)
+
+
+def test_evicts_least_recently_used_entries(tmp_path):
+    transcripts = cache.TranscriptCache(str(tmp_path / "transcripts"))
+    for n in (1, 2, 3):
+        transcripts.put(key(n), RESULT)
+        os.utime(transcripts._path(key(n)), (n, n))
+    transcripts.get(key(1))  # now the most recently used
+
+    entry_size = os.path.getsize(transcripts._path(key(1)))
+    transcripts.max_bytes = 2 * entry_size
+    transcripts.put(key(4), RESULT)
+
+    assert transcripts.get(key(2)) is None
+    assert transcripts.get(key(3)) is None
+    assert transcripts.get(key(1)) == RESULT
+    assert transcripts.get(key(4)) == RESULT
+
+
+def test_evict_sees_entries_written_by_another_process(tmp_path):
+    directory = str(tmp_path / "transcripts")
+    transcripts = cache.TranscriptCache(directory)
+    transcripts.put(key(1), RESULT)
+    os.utime(transcripts._path(key(1)), (1, 1))
+
+    # Written behind this process's back: not in its running total.
+    other = cache.TranscriptCache(str(tmp_path / "elsewhere"))
+    other.put(key(2), RESULT)
+    os.renames(other._path(key(2)), transcripts._path(key(2)))
+
+    transcripts.max_bytes = os.path.getsize(transcripts._path(key(2)))
+    transcripts.evict()
+
+    assert transcripts.get(key(1)) is None
+    assert transcripts.get(key(2)) == RESULT
+
+
+def test_cache_key_depends_on_media_model_and_options():
+    digest = "ab" * 32
+    base = cache.cache_key(digest, "base")
+
+    assert cache.cache_key(digest, "base") == base
+    assert cache.cache_key("cd" * 32, "base") != base
+    assert cache.cache_key(digest, "small") != base
+    assert cache.cache_key(digest, "base", cache.transcript_options(vad=True)) != base
+    assert cache.cache_key(digest, "base", cache.transcript_options(dtype="int8")) != base
+    assert cache.cache_key(digest, "base", cache.transcript_options(chunk_length=300.0)) != base
+    assert cache.cache_key(digest, "base", cache.transcript_options(chunk_length=600.0)) != cache.cache_key(
+        digest, "base", cache.transcript_options(chunk_length=300.0)
+    )
+
+
+def test_cache_key_ignores_option_order_and_defaults():
+    digest = "ab" * 32
+
+    assert cache.transcript_options() == {}
+    assert cache.cache_key(digest, "base", cache.transcript_options()) == cache.cache_key(digest, "base")
+    assert cache.cache_key(digest, "base", {"vad": True, "dtype": "int8"}) == cache.cache_key(
+        digest, "base", {"dtype": "int8", "vad": True}
+    )
+
+
+def test_file_digest(tmp_path):
+    path = tmp_path / "media.bin"
+    path.write_bytes(b"abc")
+
+    assert cache.file_digest(str(path)) == "ba7816bf8f01cfea414140de5dae2223b00361a396177a9cb410ff61f20015ad"
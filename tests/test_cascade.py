@@ -0,0 +1,134 @@
+import threading
+
+import numpy as np
+import pytest
+
+from opentranscriber import cascade, models
+from opentranscriber.audio import SAMPLE_RATE
+
+THRESHOLDS = cascade.DEFAULT_THRESHOLDS
+
+
+def segment(start, end, text=" x", logprob=-0.2, no_speech=0.1, compression=1.2):
+    return {
+        "seek": 0,
+        "start": start,
+        "end": end,
+        "text": text,
+        "avg_logprob": logprob,
+        "no_speech_prob": no_speech,
+        "compression_ratio": compression,
+    }
+
+
+def test_confident_segments_are_not_weak():
+    assert cascade.weak_spans([segment(0, 2), segment(2, 4)], THRESHOLDS) == []
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [{"logprob": -0.71}, {"no_speech": 0.51}, {"compression": 2.01}],
+)
+def test_each_threshold_flags_a_segment(fields):
+    assert cascade.weak_spans([segment(0, 2), segment(2, 4, **fields)], THRESHOLDS) == [(2, 4, 1, 1)]
+
+
+def test_neighbouring_weak_segments_are_merged():
+    segments = [
+        segment(0, 2, logprob=-1.0),
+        segment(2.5, 4, no_speech=0.9),  # 0.5 s after the previous one: merged
+        segment(4.2, 4.4),  # confident, but inside the merged span
+        segment(4.9, 6, compression=3.0),  # 0.9 s gap: still merged
+        segment(6, 10),
+        segment(11, 12, logprob=-1.0),  # 5 s after: a span of its own
+    ]
+
+    assert cascade.weak_spans(segments, THRESHOLDS) == [(0, 6, 0, 3), (11, 12, 5, 5)]
+
+
+def test_merge_gap_is_configurable():
+    segments = [segment(0, 2, logprob=-1.0), segment(2.5, 4, logprob=-1.0)]
+
+    assert cascade.weak_spans(segments, THRESHOLDS, gap=0.5) == [(0, 2, 0, 0), (2.5, 4, 1, 1)]
+
+
+class LargerModel:
+    """Returns `segments` (relative to the clip) for every escalated clip."""
+
+    encoder = decoder = type("Stack", (), {"blocks": []})()
+
+    def __init__(self, segments):
+        self.segments = segments
+        self.clips = []
+
+    def transcribe(self, clip, **options):
+        self.clips.append(len(clip) / SAMPLE_RATE)
+        return {"segments": [dict(s) for s in self.segments]}
+
+
+def refine(monkeypatch, fast_segments, larger_segments, seconds=30):
+    larger = LargerModel(larger_segments)
+    monkeypatch.setattr(models, "get_model", lambda *args, **kwargs: larger)
+    fast = {"text": "", "language": "en", "segments": fast_segments}
+    return cascade.refine(fast, np.zeros(seconds * SAMPLE_RATE, dtype=np.float32), "small"), larger
+
+
+def test_refine_replaces_weak_segments(monkeypatch):
+    fast = [segment(0, 4, " a"), segment(4, 8, " b?", logprob=-1.0), segment(10, 14, " c")]
+    # The clip starts at 3.5 s (0.5 s margin); the first segment lies in the margin.
+    larger = [segment(0.0, 0.4, " margin"), segment(0.5, 4.5, " B")]
+
+    result, model = refine(monkeypatch, fast, larger)
+
+    assert [(s["text"], s.get("model")) for s in result["segments"]] == [(" a", None), (" B", "small"), (" c", None)]
+    assert result["segments"][1]["start"] == 4.0
+    assert [s["id"] for s in result["segments"]] == [0, 1, 2]
+    assert result["text"] == " a B c"
+    assert model.clips == [5.0]
+    assert result["cascade"]["spans"] == 1
+    assert result["cascade"]["kept_spans"] == 0
+
+
+def test_refine_keeps_text_the_larger_model_found_nothing_in(monkeypatch):
+    fast = [segment(0, 4, " a"), segment(4, 8, " b?", logprob=-1.0)]
+
+    result, _ = refine(monkeypatch, fast, [])
+
+    assert [s["text"] for s in result["segments"]] == [" a", " b?"]
+    assert result["cascade"]["kept_spans"] == 1
+
+
+def test_refine_drops_likely_hallucinations_the_larger_model_found_nothing_in(monkeypatch):
+    fast = [segment(0, 4, " a"), segment(20, 24, " thanks for watching", no_speech=0.9)]
+
+    result, _ = refine(monkeypatch, fast, [])
+
+    assert [s["text"] for s in result["segments"]] == [" a"]
+    assert result["cascade"]["kept_spans"] == 0
+
+
+def test_refine_without_weak_segments_loads_nothing(monkeypatch):
+    def get_model(*args, **kwargs):
+        raise AssertionError("the larger model must not be loaded")
+
+    monkeypatch.setattr(models, "get_model", get_model)
+    fast = {"text": " a", "language": "en", "segments": [segment(0, 4, " a")]}
+
+    result = cascade.refine(fast, np.zeros(4 * SAMPLE_RATE, dtype=np.float32), "small")
+
+    assert result["segments"] == fast["segments"]
+    assert result["cascade"]["escalated_seconds"] == 0
+
+
+def test_cancel_reaches_the_larger_models_load(monkeypatch):
+    def get_model(name, device=None, dtype="float32", cancel_event=None):
+        models._check_cancelled(cancel_event)
+        raise AssertionError("the load must see the cancel event")
+
+    monkeypatch.setattr(models, "get_model", get_model)
+    cancel_event = threading.Event()
+    cancel_event.set()
+    fast = {"text": "", "language": "en", "segments": [segment(0, 4, " a?", logprob=-1.0)]}
+
+    with pytest.raises(models.LoadCancelled):
+        cascade.refine(fast, np.zeros(4 * SAMPLE_RATE, dtype=np.float32), "small", cancel_event=cancel_event)
@@ -0,0 +1,93 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from opentranscriber import chunking, pool
+from opentranscriber.audio import HOP_LENGTH, SAMPLE_RATE
+
+
+def chunk(start, end, own_start, own_end):
+    return chunking.Chunk(*(int(seconds * SAMPLE_RATE) for seconds in (start, end, own_start, own_end)))
+
+
+def segment(start, end, text, seek=0, **fields):
+    return {"seek": seek, "start": start, "end": end, "text": text, **fields}
+
+
+def result(*segments, language="en"):
+    return {"text": "".join(s["text"] for s in segments), "segments": list(segments), "language": language}
+
+
+def test_segment_is_kept_by_the_chunk_owning_its_midpoint():
+    chunks = [chunk(0, 12, 0, 10), chunk(8, 20, 10, 20)]
+    first = result(segment(0.0, 4.0, " a"), segment(4.0, 9.0, " b"), segment(9.0, 11.5, " c (first)"))
+    # Relative to the second chunk's start (8 s).
+    second = result(segment(0.0, 1.0, " b (second)"), segment(1.0, 3.0, " c"), segment(3.0, 7.0, " d"))
+
+    stitched = chunking.stitch_results([first, second], chunks)
+
+    assert [s["text"] for s in stitched["segments"]] == [" a", " b", " c", " d"]
+    assert [s["id"] for s in stitched["segments"]] == [0, 1, 2, 3]
+    assert stitched["text"] == " a b c d"
+    assert stitched["language"] == "en"
+
+
+def test_stitched_times_are_on_the_global_timeline():
+    chunks = [chunk(0, 12, 0, 10), chunk(8, 20, 10, 20)]
+    second = result(segment(3.0, 5.0, " x", seek=100, words=[{"word": " x", "start": 3.5, "end": 4.5}]))
+
+    stitched = chunking.stitch_results([result(), second], chunks)
+
+    (x,) = stitched["segments"]
+    assert (x["start"], x["end"]) == (11.0, 13.0)
+    assert x["seek"] == 100 + 8 * SAMPLE_RATE // HOP_LENGTH
+    assert (x["words"][0]["start"], x["words"][0]["end"]) == (11.5, 12.5)
+
+
+def test_last_chunk_owns_everything_after_its_start():
+    chunks = [chunk(0, 12, 0, 10), chunk(8, 20, 10, 20)]
+    # Midpoint 20.5 s, past the nominal end of the last chunk.
+    second = result(segment(11.0, 14.0, " tail"))
+
+    stitched = chunking.stitch_results([result(), second], chunks)
+
+    assert [s["text"] for s in stitched["segments"]] == [" tail"]
+
+
+def test_segment_mostly_overlapping_the_previous_one_is_dropped():
+    chunks = [chunk(0, 12, 0, 10), chunk(8, 20, 10, 20)]
+    first = result(segment(6.0, 10.6, " end of first"))
+    # 9.8-10.8 s: midpoint owned by the second chunk, but 0.8 of its 1.0 s repeat the previous segment.
+    second = result(segment(1.8, 2.8, " repeated"), segment(3.0, 5.0, " new"))
+
+    stitched = chunking.stitch_results([first, second], chunks)
+
+    assert [s["text"] for s in stitched["segments"]] == [" end of first", " new"]
+
+
+def test_no_results():
+    assert chunking.stitch_results([], []) == {"text": "", "segments": [], "language": None}
+
+
+def test_failed_chunk_cancels_the_queued_ones(monkeypatch):
+    started = []
+
+    def transcribe_chunk(audio, model_type, language, dtype="float32"):
+        started.append(len(audio))
+        if len(started) == 1:
+            raise ValueError("out of memory")
+        time.sleep(0.05)
+        return result()
+
+    monkeypatch.setattr(pool, "worker_pool", lambda *args, **kwargs: ThreadPoolExecutor(1))
+    monkeypatch.setattr(chunking, "_detect_language", lambda *args: "en")
+    monkeypatch.setattr(chunking, "_transcribe_chunk", transcribe_chunk)
+    audio = np.zeros(10 * 30 * SAMPLE_RATE, dtype=np.float32)
+
+    with pytest.raises(RuntimeError, match=r"Chunk 1/\d+ failed: out of memory"):
+        chunking.transcribe_in_chunks(audio, "base", workers=1, chunk_length=30.0)
+
+    # At most the chunk the worker picked up while the failure was handled also ran.
+    assert len(started) <= 2
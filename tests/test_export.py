@@ -0,0 +1,108 @@
+import os
+
+import pytest
+
+from opentranscriber import export
+
+# The expected files below are what whisper's own writers (openai-whisper 20250625)
+# produce for RESULT, so these tests check byte-for-byte compatibility without
+# whisper installed. The comparison against the installed whisper is at the end.
+RESULT = {
+    "text": " Hello there. A --> B\tC Ünïcödé",
+    "language": "en",
+    "segments": [
+        {"id": 0, "seek": 0, "start": 0.0, "end": 1.2344, "text": " Hello there."},
+        {"id": 1, "seek": 100, "start": 1.2345, "end": 61.5, "text": " A --> B\tC"},
+        {"id": 2, "seek": 360000, "start": 3600.0, "end": 3725.0006, "text": " Ünïcödé "},
+    ],
+}
+
+
+def test_render_srt():
+    assert export.render(RESULT, "srt") == (
+        "1\n00:00:00,000 --> 00:00:01,234\nHello there.\n\n"
+        "2\n00:00:01,234 --> 00:01:01,500\nA -> B\tC\n\n"
+        "3\n01:00:00,000 --> 01:02:05,001\nÜnïcödé\n\n"
+    )
+
+
+def test_render_vtt():
+    assert export.render(RESULT, "vtt") == (
+        "WEBVTT\n\n"
+        "00:00.000 --> 00:01.234\nHello there.\n\n"
+        "00:01.234 --> 01:01.500\nA -> B\tC\n\n"
+        "01:00:00.000 --> 01:02:05.001\nÜnïcödé\n\n"
+    )
+
+
+def test_render_txt_and_tsv():
+    assert export.render(RESULT, "txt") == "Hello there.\nA --> B\tC\nÜnïcödé\n"
+    assert export.render(RESULT, "tsv") == (
+        "start\tend\ttext\n0\t1234\tHello there.\n1234\t61500\tA --> B C\n3600000\t3725001\tÜnïcödé\n"
+    )
+
+
+def test_render_json():
+    assert export.render(RESULT, "json") == (
+        '{"text": " Hello there. A --> B\\tC \\u00dcn\\u00efc\\u00f6d\\u00e9", "language": "en", "segments": ['
+        '{"id": 0, "seek": 0, "start": 0.0, "end": 1.2344, "text": " Hello there."}, '
+        '{"id": 1, "seek": 100, "start": 1.2345, "end": 61.5, "text": " A --> B\\tC"}, '
+        '{"id": 2, "seek": 360000, "start": 3600.0, "end": 3725.0006, "text": " \\u00dcn\\u00efc\\u00f6d\\u00e9 "}]}'
+    )
+
+
+@pytest.mark.parametrize("output_format", ["txt", "srt", "vtt", "tsv"])
+def test_file_is_the_header_and_its_rendered_segments(output_format):
+    segments = [export.render_segment(s, output_format, i) for i, s in enumerate(RESULT["segments"])]
+
+    assert export.HEADERS.get(output_format, "") + "".join(segments) == export.render(RESULT, output_format)
+
+
+def test_render_segment_rejects_whole_file_formats():
+    with pytest.raises(ValueError):
+        export.render_segment(RESULT["segments"][0], "json", 0)
+
+
+@pytest.mark.parametrize(
+    "seconds, hours, marker, expected",
+    [
+        (0.0, False, ".", "00:00.000"),
+        (59.9995, False, ".", "01:00.000"),
+        (3599.999, True, ",", "00:59:59,999"),
+        (36000.5, False, ".", "10:00:00.500"),
+        (-1.0, False, ".", "00:00.000"),
+    ],
+)
+def test_format_timestamp(seconds, hours, marker, expected):
+    assert export.format_timestamp(seconds, always_include_hours=hours, decimal_marker=marker) == expected
+
+
+def test_parse_formats():
+    assert export.parse_formats("srt, VTT,srt") == ["srt", "vtt"]
+    assert export.parse_formats("all") == export.FORMATS
+    with pytest.raises(ValueError):
+        export.parse_formats("docx")
+    with pytest.raises(ValueError):
+        export.parse_formats(" , ")
+
+
+def test_write_outputs(tmp_path):
+    paths = export.write_outputs(RESULT, "/media/talk.mp4", ["srt", "txt"], str(tmp_path))
+
+    assert paths == [str(tmp_path / "talk.srt"), str(tmp_path / "talk.txt")]
+    with open(paths[1], encoding="utf-8") as f:
+        assert f.read() == export.render(RESULT, "txt")
+
+
+@pytest.mark.parametrize("output_format", export.FORMATS)
+def test_output_matches_whisper_writers_byte_for_byte(tmp_path, output_format):
+    whisper_utils = pytest.importorskip("whisper.utils")
+
+    whisper_directory = tmp_path / "whisper"
+    whisper_directory.mkdir()
+    writer = whisper_utils.get_writer(output_format, str(whisper_directory))
+    writer(RESULT, "talk.mp4", {"max_line_width": None, "max_line_count": None, "highlight_words": False})
+    (path,) = export.write_outputs(RESULT, "talk.mp4", output_format, str(tmp_path))
+
+    with open(os.path.join(whisper_directory, f"talk.{output_format}"), "rb") as expected, open(path, "rb") as actual:
+        assert actual.read() == expected.read()
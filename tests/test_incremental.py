@@ -0,0 +1,105 @@
+import json
+import os
+
+import pytest
+
+from opentranscriber import incremental, streaming
+
+# (start, end, text) of the windows the fake stream transcribes, one segment each.
+WINDOWS = [(0.0, 10.0, " one"), (10.0, 20.0, " two"), (20.0, 30.0, " three")]
+
+
+class Killed(Exception):
+    pass
+
+
+def fake_stream(starts, kill_after=None):
+    """Stands in for `streaming.stream_segments`; raises `Killed` after `kill_after` windows."""
+
+    def stream_segments(model, file_path, window_seconds, start, first_id, previous_text, use_vad, language):
+        starts.append((start, first_id, previous_text, language))
+        segment_id = first_id
+        for done, (window_start, window_end, text) in enumerate(w for w in WINDOWS if w[0] >= start):
+            if done == kill_after:
+                raise Killed()
+            yield [{"id": segment_id, "start": window_start, "end": window_end - 1.0, "text": text}], "en", window_end
+            segment_id += 1
+
+    return stream_segments
+
+
+@pytest.fixture
+def media(tmp_path):
+    path = tmp_path / "talk.wav"
+    path.write_bytes(b"media")
+    return str(path)
+
+
+def run(media, monkeypatch, output_format="srt", model_type="base", kill_after=None):
+    starts = []
+    monkeypatch.setattr(streaming, "stream_segments", fake_stream(starts, kill_after))
+    return incremental.transcribe_incremental(None, media, model_type, output_format), starts
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+@pytest.mark.parametrize("output_format", incremental.INCREMENTAL_FORMATS)
+def test_resume_after_a_crash_matches_an_uninterrupted_run(media, monkeypatch, output_format):
+    output_path, _ = run(media, monkeypatch, output_format)
+    expected = read(output_path)
+    os.remove(output_path)
+
+    with pytest.raises(Killed):
+        run(media, monkeypatch, output_format, kill_after=1)
+    checkpoint_path = output_path + incremental.CHECKPOINT_SUFFIX
+    with open(checkpoint_path, encoding="utf-8") as f:
+        assert json.load(f)["offset"] == 10.0
+    # A segment half-written when the process died.
+    with open(output_path, "ab") as f:
+        f.write(b"2\n00:00:10,0")
+
+    output_path, starts = run(media, monkeypatch, output_format)
+
+    assert starts == [(10.0, 1, " one", "en")]
+    assert read(output_path) == expected
+    assert not os.path.exists(checkpoint_path)
+
+
+def test_checkpoint_of_another_model_is_ignored(media, monkeypatch):
+    with pytest.raises(Killed):
+        run(media, monkeypatch, kill_after=1)
+
+    output_path, starts = run(media, monkeypatch, model_type="small")
+
+    assert starts == [(0.0, 0, "", None)]
+    assert read(output_path).decode("utf-8").count("-->") == len(WINDOWS)
+
+
+def test_unreadable_checkpoint_starts_over(media, monkeypatch):
+    with pytest.raises(Killed):
+        run(media, monkeypatch, kill_after=1)
+    checkpoint_path = os.path.splitext(media)[0] + ".srt" + incremental.CHECKPOINT_SUFFIX
+    with open(checkpoint_path, "w", encoding="utf-8") as f:
+        f.write("{")
+
+    _, starts = run(media, monkeypatch)
+
+    assert starts == [(0.0, 0, "", None)]
+
+
+def test_segments_render_like_the_export_writers():
+    from opentranscriber import export
+
+    segments = [
+        {"id": 0, "start": 0.0, "end": 1.5, "text": " a --> b"},
+        {"id": 1, "start": 3601.25, "end": 3602.0, "text": " tab\there"},
+    ]
+    result = {"segments": segments}
+
+    for output_format in ("txt", "srt", "vtt", "tsv"):
+        header = export.HEADERS.get(output_format, "")
+        rendered = header + "".join(incremental.format_segment(output_format, s) for s in segments)
+        assert rendered == export.render(result, output_format)
@@ -0,0 +1,211 @@
+import threading
+
+import pytest
+
+from opentranscriber import models
+
+
+class FakeModel:
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+
+class StubRegistry(models.ModelRegistry):
+    """A registry whose loads make a `FakeModel`; a load waits while `gates[name]` is unset."""
+
+    def __init__(self, sizes=None, **kwargs):
+        super().__init__(**kwargs)
+        self.sizes = sizes or {}
+        self.gates = {}
+        self.loads = []
+
+    def _load(self, name, device, dtype, cancel_event=None):
+        self.loads.append(name)
+        gate = self.gates.get(name)
+        while gate is not None and not gate.wait(0.01):
+            models._check_cancelled(cancel_event)
+        return FakeModel(name, self.sizes.get(name, 1))
+
+    def _free_memory(self):
+        pass
+
+
+@pytest.fixture(autouse=True)
+def fake_sizes(monkeypatch):
+    monkeypatch.setattr(models, "model_memory_bytes", lambda model: model.size)
+
+
+def names(registry):
+    return [key[0] for key in registry.loaded()]
+
+
+def in_thread(function, *args, **kwargs):
+    """Runs `function` on a thread; returns the thread and a dict that gets its result or error."""
+    outcome = {}
+
+    def run():
+        try:
+            outcome["result"] = function(*args, **kwargs)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=run, daemon=True)
+    thread.start()
+    return thread, outcome
+
+
+def wait_until(condition):
+    for _ in range(500):
+        if condition():
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("Timed out")
+
+
+def test_least_recently_used_model_is_evicted():
+    registry = StubRegistry(max_models=2, max_memory_mb=None)
+    released = []
+    registry.on_release(released.append)
+
+    registry.get("tiny", "cpu")
+    registry.get("base", "cpu")
+    assert registry.get("tiny", "cpu").name == "tiny"
+    registry.get("small", "cpu")
+
+    assert names(registry) == ["tiny", "small"]
+    assert released == [[("base", "cpu", "float32")]]
+    assert registry.loads == ["tiny", "base", "small"]
+
+
+def test_memory_budget_evicts_but_keeps_the_requested_model():
+    mb = 1024 * 1024
+    registry = StubRegistry({"tiny": 100 * mb, "base": 200 * mb, "large": 900 * mb}, max_models=5, max_memory_mb=400)
+
+    registry.get("tiny", "cpu")
+    registry.get("base", "cpu")
+    assert names(registry) == ["tiny", "base"]
+    registry.get("large", "cpu")
+
+    assert names(registry) == ["large"]
+    assert registry.memory_bytes() == 900 * mb
+
+
+def test_release_notifies_listeners():
+    registry = StubRegistry(max_models=3, max_memory_mb=None)
+    released = []
+    registry.on_release(released.append)
+    registry.get("tiny", "cpu")
+    registry.get("tiny", "cpu", dtype="float16")
+    registry.get("base", "cpu")
+
+    assert registry.release("tiny") == 2
+    assert registry.release("tiny") == 0
+
+    assert names(registry) == ["base"]
+    assert released == [[("tiny", "cpu", "float32"), ("tiny", "cpu", "float16")]]
+
+
+def test_concurrent_requests_for_one_model_load_it_once():
+    registry = StubRegistry()
+    registry.gates["base"] = threading.Event()
+    first, first_outcome = in_thread(registry.get, "base", "cpu")
+    second, second_outcome = in_thread(registry.get, "base", "cpu")
+    wait_until(lambda: registry.loads)
+
+    registry.gates["base"].set()
+    first.join(5)
+    second.join(5)
+
+    assert registry.loads == ["base"]
+    assert first_outcome["result"] is second_outcome["result"]
+
+
+def test_slow_load_does_not_block_other_models():
+    registry = StubRegistry()
+    registry.gates["large"] = threading.Event()
+    slow, outcome = in_thread(registry.get, "large", "cpu")
+    wait_until(lambda: registry.loads)
+
+    assert registry.get("tiny", "cpu").name == "tiny"
+    assert registry.loaded() == [("tiny", "cpu", "float32")]
+
+    registry.gates["large"].set()
+    slow.join(5)
+    assert outcome["result"].name == "large"
+
+
+def test_waiting_for_another_threads_load_can_be_cancelled():
+    registry = StubRegistry()
+    registry.gates["large"] = threading.Event()
+    loader, _ = in_thread(registry.get, "large", "cpu")
+    wait_until(lambda: registry.loads)
+    cancel_event = threading.Event()
+    waiter, outcome = in_thread(registry.get, "large", "cpu", cancel_event=cancel_event)
+
+    cancel_event.set()
+    waiter.join(5)
+
+    assert isinstance(outcome["error"], models.LoadCancelled)
+    registry.gates["large"].set()
+    loader.join(5)
+
+
+def test_cancelled_load_leaves_the_model_to_the_next_request():
+    registry = StubRegistry()
+    registry.gates["large"] = threading.Event()
+    cancel_event = threading.Event()
+    loader, outcome = in_thread(registry.get, "large", "cpu", cancel_event=cancel_event)
+    wait_until(lambda: registry.loads)
+
+    cancel_event.set()
+    loader.join(5)
+    registry.gates["large"].set()
+
+    assert isinstance(outcome["error"], models.LoadCancelled)
+    assert registry.get("large", "cpu").name == "large"
+    assert registry.loads == ["large", "large"]
+
+
+def test_preloader_cancels_the_superseded_load():
+    registry = StubRegistry()
+    registry.gates["large"] = threading.Event()
+    preloader = models.Preloader(registry)
+
+    preloader.request("large", "cpu")
+    wait_until(lambda: registry.loads)
+    preloader.request("tiny", "cpu")
+    wait_until(lambda: registry.loaded())
+
+    assert registry.loaded() == [("tiny", "cpu", "float32")]
+    assert preloader.wanted == ("tiny", "cpu", "float32")
+
+
+def test_preloader_releases_a_model_that_finished_after_it_was_superseded(monkeypatch):
+    registry = StubRegistry()
+    registry.gates["large"] = threading.Event()
+    # A load that cannot be interrupted, like whisper.load_model.
+    monkeypatch.setattr(models, "_check_cancelled", lambda cancel_event: None)
+    preloader = models.Preloader(registry)
+
+    preloader.request("large", "cpu")
+    wait_until(lambda: registry.loads)
+    preloader.request("tiny", "cpu")
+    wait_until(lambda: ("tiny", "cpu", "float32") in registry.loaded())
+    registry.gates["large"].set()
+
+    wait_until(lambda: registry.loads == ["large", "tiny"] and registry.loaded() == [("tiny", "cpu", "float32")])
+
+
+def test_preloader_loads_again_after_its_model_was_released():
+    registry = StubRegistry()
+    preloader = models.Preloader(registry)
+    preloader.request("base", "cpu")
+    wait_until(lambda: registry.loaded())
+
+    registry.release("base")
+    assert preloader.wanted is None
+    preloader.request("base", "cpu")
+
+    wait_until(lambda: registry.loaded())
+    assert registry.loads == ["base", "base"]
@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+
+from opentranscriber import profiling
+
+
+class FakeModel:
+    def __init__(self):
+        self.encoder = SimpleNamespace(forward=self._encode)
+
+    def _encode(self, mel):
+        return mel
+
+    def decode(self, mel, options=None):
+        self.encoder.forward(mel)
+        return "text"
+
+    def detect_language(self, mel):
+        return None, {"en": 1.0}
+
+
+@pytest.fixture
+def profiler():
+    profiler = profiling.Profiler()
+    # `activate` also wraps whisper's functions; the spans under test only need the active profiler.
+    token = profiling._active.set(profiler)
+    yield profiler
+    profiling._active.reset(token)
+
+
+def test_instrument_times_decoder_and_encoder_per_window(profiler):
+    model = FakeModel()
+
+    with profiling.instrument(model):
+        model.decode("mel")
+        model.decode("mel", SimpleNamespace(temperature=0.2))
+        model.decode("mel")
+
+    assert [(s["name"], s["args"]["window"]) for s in profiler.spans if s["name"] == "decoder"] == [
+        ("decoder", 0),
+        ("decoder", 0),
+        ("decoder", 1),
+    ]
+    assert profiler.totals()["encoder"][0] == 3
+    assert profiler.counters["temperature_fallbacks"] == 1
+
+
+def test_nested_instrument_times_each_call_once_and_restores_the_model(profiler):
+    model = FakeModel()
+
+    with profiling.instrument(model):
+        with profiling.instrument(model):
+            model.decode("mel")
+        model.decode("mel")
+        model.detect_language("mel")
+
+    totals = profiler.totals()
+    assert totals["decoder"][0] == 2
+    assert totals["encoder"][0] == 2
+    assert totals["language_detection"][0] == 1
+    assert "decode" not in vars(model)
+    assert "detect_language" not in vars(model)
+    assert model.encoder.forward == model._encode
+
+
+def test_instrument_for_another_profiler_restores_the_outer_wrappers(profiler):
+    model = FakeModel()
+
+    with profiling.instrument(model):
+        outer_decode = model.decode
+        inner = profiling.Profiler()
+        token = profiling._active.set(inner)
+        try:
+            with profiling.instrument(model):
+                model.decode("mel")
+        finally:
+            profiling._active.reset(token)
+        assert model.decode is outer_decode
+        model.decode("mel")
+
+    assert inner.totals()["decoder"][0] == 1
+    assert profiler.totals()["decoder"][0] == 1
+    assert "decode" not in vars(model)
+
+
+def test_instrument_without_a_profiler_changes_nothing():
+    model = FakeModel()
+
+    with profiling.instrument(model):
+        assert "decode" not in vars(model)
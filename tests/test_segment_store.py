@@ -0,0 +1,175 @@
+import json
+import os
+
+import pytest
+
+from opentranscriber import segment_store
+
+RESULT = {
+    "text": " one two três",
+    "language": "en",
+    "segments": [
+        {"id": 0, "seek": 0, "start": 0.0, "end": 1.0, "text": " one", "tokens": [1]},
+        {"id": 1, "seek": 0, "start": 1.0, "end": 2.5, "text": " two", "tokens": [2], "words": [{"word": " two"}]},
+        {"id": 2, "seek": 0, "start": 2.5, "end": 4.0, "text": " três", "tokens": [3]},
+    ],
+}
+
+
+@pytest.fixture
+def journal(tmp_path):
+    return str(tmp_path / "journals" / "key.jsonl")
+
+
+def store():
+    return segment_store.SegmentStore.from_result(RESULT)
+
+
+def lines(path):
+    with open(path, encoding="utf-8") as f:
+        return f.readlines()
+
+
+def test_from_result_keeps_times_and_texts():
+    segments = store()
+
+    assert len(segments) == 3
+    assert list(segments.texts()) == ["one", "two", "três"]
+    assert list(segments.starts) == [0.0, 1.0, 2.5]
+    assert list(segments.ends) == [1.0, 2.5, 4.0]
+    assert segments.to_result() == {
+        "text": " one two três",
+        "language": "en",
+        "segments": [
+            {"id": 0, "start": 0.0, "end": 1.0, "text": " one"},
+            {"id": 1, "start": 1.0, "end": 2.5, "text": " two"},
+            {"id": 2, "start": 2.5, "end": 4.0, "text": " três"},
+        ],
+    }
+
+
+def test_to_result_keeps_the_other_fields_of_the_full_result():
+    segments = store()
+    segments.set_text(1, "deux")
+
+    result = segments.to_result(RESULT)
+
+    assert [s["text"] for s in result["segments"]] == [" one", " deux", " três"]
+    assert result["text"] == " one deux três"
+    assert result["segments"][0] == RESULT["segments"][0]
+    # The edited segment's tokens and words belong to the old text.
+    assert result["segments"][1] == {"id": 1, "seek": 0, "start": 1.0, "end": 2.5, "text": " deux"}
+
+
+def test_text_is_the_same_with_and_without_the_full_result():
+    segments = store()
+    segments.set_text(1, "  deux ")
+
+    assert segments.to_result()["text"] == segments.to_result(RESULT)["text"] == " one deux três"
+
+
+def test_mismatched_full_result_is_ignored(caplog):
+    segments = store()
+
+    result = segments.to_result({**RESULT, "segments": RESULT["segments"][:2]})
+
+    assert [s["text"] for s in result["segments"]] == [" one", " two", " três"]
+    assert "tokens" not in result["segments"][0]
+    assert "does not match" in caplog.text
+
+
+def test_journal_is_replayed(journal):
+    segments = store()
+    assert segments.open_journal(journal) == 0
+    segments.set_text(0, "uno")
+    segments.set_text(2, "tres")
+    segments.set_text(0, "eins")
+    segments.close()
+
+    reopened = store()
+
+    assert reopened.open_journal(journal) == 2
+    assert list(reopened.texts()) == ["eins", "two", "tres"]
+    reopened.close()
+
+
+def test_torn_last_line_is_truncated(journal):
+    segments = store()
+    segments.open_journal(journal)
+    segments.set_text(1, "dos")
+    segments.close()
+    intact = os.path.getsize(journal)
+    with open(journal, "ab") as f:
+        f.write(b'{"i": 2, "text": "tr')
+
+    reopened = store()
+
+    assert reopened.open_journal(journal) == 1
+    assert list(reopened.texts()) == ["one", "dos", "três"]
+    assert os.path.getsize(journal) == intact
+    # New edits go after the last complete entry.
+    reopened.set_text(2, "drei")
+    reopened.close()
+    again = store()
+    again.open_journal(journal)
+    assert list(again.texts()) == ["one", "dos", "drei"]
+    again.close()
+
+
+def test_superseded_entries_are_compacted(journal):
+    segments = store()
+    segments.open_journal(journal)
+    for n in range(200):
+        segments.set_text(1, f"two {n}")
+    segments.close()
+    assert len(lines(journal)) == 201
+
+    reopened = store()
+    reopened.open_journal(journal)
+    reopened.close()
+
+    assert [json.loads(line) for line in lines(journal)] == [
+        {"v": segment_store.JOURNAL_VERSION, "segments": 3},
+        {"i": 1, "text": "two 199"},
+    ]
+
+
+def test_journal_of_another_transcript_is_replaced(journal):
+    other = segment_store.SegmentStore.from_result({**RESULT, "segments": RESULT["segments"][:2]})
+    other.open_journal(journal)
+    other.set_text(0, "other")
+    other.close()
+
+    segments = store()
+
+    assert segments.open_journal(journal) == 0
+    assert list(segments.texts()) == ["one", "two", "três"]
+    segments.close()
+    assert len(lines(journal)) == 1
+
+
+def test_reverted_text_is_not_an_edit(journal):
+    segments = store()
+    segments.open_journal(journal)
+    segments.set_text(0, "uno")
+    assert segments.edited == 1
+    segments.set_text(0, "one")
+    assert segments.edited == 0
+    segments.close()
+
+    reopened = store()
+
+    assert reopened.open_journal(journal) == 0
+    reopened.close()
+
+
+def test_discard_journal(journal):
+    segments = store()
+    segments.open_journal(journal)
+    segments.set_text(0, "uno")
+    segments.discard_journal()
+
+    assert not os.path.exists(journal)
+    reopened = store()
+    assert reopened.open_journal(journal) == 0
+    reopened.close()
@@ -0,0 +1,263 @@
+import http.client
+import json
+import os
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from opentranscriber import pool, server
+
+RESULT = {"text": " hello", "segments": [{"id": 0, "start": 0.0, "end": 1.0, "text": " hello"}], "language": "en"}
+
+
+class StubExecutor:
+    """
+    Stands in for the worker pool: runs each job on a thread once `release` is set,
+    and records the order jobs were started in. `broken` makes the next submits fail
+    the way a pool with a dead worker does.
+    """
+
+    def __init__(self, started, release, broken):
+        self.started = started
+        self.release = release
+        self.broken = broken
+
+    def submit(self, function, job_id, file_path, model_type, options, progress):
+        if self.broken:
+            self.broken.pop()
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+
+        def run():
+            self.started.append(file_path)
+            self.release.wait(10)
+            future.set_result({**RESULT, "file": file_path, "options": options})
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.release.set()
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """The stub pools the service creates, and the order their jobs started in."""
+    state = {"pools": [], "started": [], "release": threading.Event(), "broken": []}
+
+    def worker_pool(model_type, count, dtype="float32"):
+        executor = StubExecutor(state["started"], state["release"], state["broken"])
+        state["pools"].append(executor)
+        return executor
+
+    monkeypatch.setattr(pool, "worker_pool", worker_pool)
+    yield state
+    state["release"].set()
+
+
+@pytest.fixture
+def service(workers):
+    service = server.TranscriptionService("tiny", workers=1, max_queue=2)
+    yield service
+    workers["release"].set()
+    service.close()
+
+
+def wait_for(job, *statuses):
+    for _ in range(500):
+        if job.status in statuses:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError(f"Job is still {job.status}")
+
+
+def test_lower_priority_values_run_first(service, workers):
+    first = service.submit("first.mp4")
+    wait_for(first, "running")
+    later = service.submit("later.mp4", priority=5)
+    urgent = service.submit("urgent.mp4", priority=-1)
+
+    workers["release"].set()
+    for job in (first, later, urgent):
+        wait_for(job, "done")
+
+    assert workers["started"] == ["first.mp4", "urgent.mp4", "later.mp4"]
+    assert service.result(urgent)["file"] == "urgent.mp4"
+
+
+def test_queue_limit_counts_only_waiting_jobs(service):
+    running = service.submit("a.mp4")
+    wait_for(running, "running")
+    service.submit("b.mp4")
+    waiting = service.submit("c.mp4")
+
+    with pytest.raises(server.QueueFull):
+        service.submit("d.mp4")
+
+    assert service.cancel(waiting.id)
+    assert not service.cancel(running.id)
+    service.submit("d.mp4")
+
+
+def test_broken_pool_is_replaced_and_the_job_retried(service, workers):
+    workers["broken"].append(True)
+    workers["release"].set()
+
+    job = service.submit("a.mp4")
+    wait_for(job, "done", "failed")
+
+    assert job.status == "done"
+    assert len(workers["pools"]) == 2
+    assert service.stats()["worker_restarts"] == 1
+
+
+def test_job_fails_when_the_new_pool_breaks_too(service, workers):
+    workers["broken"].extend([True, True])
+
+    job = service.submit("a.mp4")
+    wait_for(job, "done", "failed")
+
+    assert job.status == "failed"
+    assert "worker process died" in job.error
+    assert len(workers["pools"]) == 3
+
+    workers["release"].set()
+    next_job = service.submit("b.mp4")
+    wait_for(next_job, "done")
+
+
+def test_old_finished_jobs_and_their_results_are_forgotten(service, workers):
+    workers["release"].set()
+    old = service.submit("a.mp4")
+    wait_for(old, "done")
+    assert os.path.exists(old.result_path)
+
+    old.finished -= server.FINISHED_JOB_TTL + 1
+    service.submit("b.mp4")
+
+    assert service.get(old.id) is None
+    assert not os.path.exists(old.result_path)
+
+
+@pytest.fixture
+def client(service, tmp_path):
+    media = tmp_path / "media"
+    media.mkdir()
+    (media / "talk.mp4").write_bytes(b"media")
+    (tmp_path / "secret.mp4").write_bytes(b"media")
+
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), server.RequestHandler)
+    httpd.service = service
+    httpd.max_upload_bytes = 1024
+    httpd.allowed_paths = [os.path.realpath(media)]
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+
+    def request(method, path, body=None, content_type="application/json", query=""):
+        connection = http.client.HTTPConnection(*httpd.server_address, timeout=10)
+        if isinstance(body, (dict, list)) or body is None and content_type == "application/json":
+            body = json.dumps(body).encode() if body is not None else None
+        connection.request(method, path + query, body=body, headers={"Content-Type": content_type})
+        response = connection.getresponse()
+        data = response.read()
+        connection.close()
+        is_json = response.getheader("Content-Type", "").startswith("application/json")
+        return response.status, json.loads(data) if is_json else data.decode(), response
+
+    request.media = media
+    request.root = tmp_path
+    request.service = service
+    yield request
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_path_submit_runs_and_serves_the_result(client, workers):
+    workers["release"].set()
+    status, job, response = client("POST", "/jobs", {"path": str(client.media / "talk.mp4"), "vad": True})
+    assert status == 202
+    assert response.getheader("Location") == f"/jobs/{job['id']}"
+
+    wait_for(client.service.get(job["id"]), "done")
+
+    status, result, _ = client("GET", f"/jobs/{job['id']}/result")
+    assert status == 200
+    assert result["options"] == {"dtype": "float32", "use_vad": True}
+    status, text, _ = client("GET", f"/jobs/{job['id']}/result", query="?format=txt")
+    assert (status, text) == (200, "hello\n")
+
+
+@pytest.mark.parametrize(
+    "path",
+    ["secret.mp4", "media/../secret.mp4", "/etc/passwd"],
+)
+def test_paths_outside_the_allowed_directories_are_refused(client, path):
+    path = path if os.path.isabs(path) else str(client.root / path)
+
+    status, body, _ = client("POST", "/jobs", {"path": path})
+
+    assert status == 403
+
+
+def test_symlink_out_of_an_allowed_directory_is_refused(client):
+    os.symlink(client.root / "secret.mp4", client.media / "link.mp4")
+
+    status, _, _ = client("POST", "/jobs", {"path": str(client.media / "link.mp4")})
+
+    assert status == 403
+
+
+@pytest.mark.parametrize(
+    "body, error",
+    [
+        ([1, 2], "must be an object"),
+        ({"path": 3}, "'path' must be a file path"),
+        ({"path": "MEDIA/missing.mp4"}, "File not found"),
+        ({"path": "MEDIA/talk.mp4", "model": "huge"}, "model must be one of"),
+        ({"path": "MEDIA/talk.mp4", "priority": None}, "int()"),
+        ({"path": "MEDIA/talk.mp4", "stream": True, "stream_window": 5}, "at least 30 seconds"),
+    ],
+)
+def test_invalid_submits_get_400(client, body, error):
+    if isinstance(body, dict) and isinstance(body.get("path"), str):
+        body = {**body, "path": body["path"].replace("MEDIA", str(client.media))}
+
+    status, response, _ = client("POST", "/jobs", body)
+
+    assert status == 400
+    assert error in response["error"]
+
+
+def test_oversized_bodies_get_413(client):
+    status, _, _ = client("POST", "/jobs", b"{" + b" " * server.MAX_JSON_BYTES + b"}")
+    assert status == 413
+
+    status, _, _ = client(
+        "POST", "/jobs", b"x" * 2048, content_type="application/octet-stream", query="?filename=a.mp4"
+    )
+    assert status == 413
+
+
+def test_full_queue_gets_503_with_retry_after(client):
+    talk = {"path": str(client.media / "talk.mp4")}
+    _, running, _ = client("POST", "/jobs", talk)
+    wait_for(client.service.get(running["id"]), "running")
+    statuses = [client("POST", "/jobs", talk)[0] for _ in range(2)]
+
+    status, _, response = client("POST", "/jobs", talk)
+
+    assert statuses == [202, 202]
+    assert status == 503
+    assert response.getheader("Retry-After")
+
+
+def test_result_of_an_unfinished_job_is_a_conflict(client):
+    _, job, _ = client("POST", "/jobs", {"path": str(client.media / "talk.mp4")})
+
+    status, body, _ = client("GET", f"/jobs/{job['id']}/result")
+
+    assert status == 409
+    assert client("GET", "/jobs/unknown")[0] == 404
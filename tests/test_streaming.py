@@ -0,0 +1,46 @@
+import os
+import sys
+import textwrap
+import threading
+
+import pytest
+
+from opentranscriber import streaming
+
+
+@pytest.fixture
+def noisy_ffmpeg(tmp_path, monkeypatch):
+    """An ffmpeg that floods stderr with decode errors while it writes audio; fails for *.bad inputs."""
+    script = tmp_path / "bin" / "ffmpeg"
+    script.parent.mkdir()
+    script.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{sys.executable}
+            import sys
+            bad = sys.argv[sys.argv.index("-i") + 1].endswith(".bad")
+            for i in range(3 if bad else 20000):
+                sys.stderr.write(f"[mp3 @ 0x1] decode error {{i}}\\n")
+                sys.stdout.buffer.write(bytes(320))
+            sys.exit(1 if bad else 0)
+            """
+        )
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_read_pcm_windows_survives_a_flood_of_decode_errors(noisy_ffmpeg):
+    windows = []
+    # A daemon thread, so a deadlock fails the test instead of hanging the run.
+    reader = threading.Thread(target=lambda: windows.extend(streaming.read_pcm_windows("talk.mp3", 60)), daemon=True)
+    reader.start()
+    reader.join(timeout=30)
+
+    assert not reader.is_alive()
+    assert [len(window) for window in windows] == [960000, 960000, 960000, 320000]
+
+
+def test_read_pcm_windows_reports_ffmpeg_errors(noisy_ffmpeg):
+    with pytest.raises(RuntimeError, match="decode error 2"):
+        list(streaming.read_pcm_windows("talk.bad", window_seconds=60))
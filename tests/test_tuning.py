@@ -0,0 +1,75 @@
+import os
+import sys
+import textwrap
+
+import pytest
+
+from opentranscriber import tuning
+from opentranscriber.audio import SAMPLE_RATE
+
+
+@pytest.mark.parametrize(
+    "text, cpus",
+    [
+        ("0", [0]),
+        ("0-3", [0, 1, 2, 3]),
+        ("0-7,16,18", [0, 1, 2, 3, 4, 5, 6, 7, 16, 18]),
+        (" 4 , 2-3,2 ", [2, 3, 4]),
+        ("1,", [1]),
+    ],
+)
+def test_parse_cpu_list(text, cpus):
+    assert tuning.parse_cpu_list(text) == cpus
+
+
+@pytest.mark.parametrize("text", ["", ",", "a", "1-b", "0-3,x"])
+def test_parse_cpu_list_rejects_invalid_lists(text):
+    with pytest.raises(ValueError, match="Invalid CPU list"):
+        tuning.parse_cpu_list(text)
+
+
+def test_split_cpus():
+    assert tuning.split_cpus([0, 1, 2, 3, 4], 2) == [[0, 1, 2], [3, 4]]
+    assert tuning.split_cpus([0, 1], 4) == [[0], [1]]
+    assert tuning.split_cpus([0, 1, 2], 0) == [[0, 1, 2]]
+
+
+def test_max_workers_for_memory():
+    mb = 1024 * 1024
+    model = 1500 * mb
+
+    assert tuning.max_workers_for_memory(model, available=8000 * mb) == 8000 // (1500 + tuning.WORKER_OVERHEAD_MB)
+    assert tuning.max_workers_for_memory(model, available=100 * mb) == 1
+
+
+@pytest.fixture
+def long_media(tmp_path, monkeypatch):
+    """An ffmpeg that decodes ten minutes of silence, or as much as `-t` asks for."""
+    script = tmp_path / "bin" / "ffmpeg"
+    script.parent.mkdir()
+    script.write_text(
+        textwrap.dedent(
+            f"""\
+            #!{sys.executable}
+            import sys
+            seconds = float(sys.argv[sys.argv.index("-t") + 1]) if "-t" in sys.argv else 600.0
+            sys.stdout.buffer.write(bytes(2 * int(seconds * {SAMPLE_RATE})))
+            """
+        )
+    )
+    script.chmod(0o755)
+    monkeypatch.setenv("PATH", f"{script.parent}{os.pathsep}{os.environ['PATH']}")
+
+
+def test_read_sample_decodes_only_the_sample(long_media):
+    assert len(tuning.read_sample("talk.mp4", 12.5)) == 12.5 * SAMPLE_RATE
+
+
+def test_saved_settings_apply_to_the_cpu_count_they_were_tuned_on(tmp_path, monkeypatch):
+    monkeypatch.setenv("OPENTRANSCRIBER_TUNING_FILE", str(tmp_path / "tuning.json"))
+    monkeypatch.setattr(tuning, "available_cpus", lambda: list(range(16)))
+    tuning.save_settings("base", "float32", {"threads": 4, "workers": 2, "cpu_count": 8})
+
+    assert tuning.saved_settings("base") == {}
+    assert tuning.saved_settings("base", cpus=[0, 1, 2, 3, 4, 5, 6, 7])["workers"] == 2
+    assert tuning.saved_settings("small", cpus=[0, 1, 2, 3, 4, 5, 6, 7]) == {}
@@ -0,0 +1,106 @@
+import numpy as np
+import pytest
+from conftest import quiet, voiced
+
+from opentranscriber import vad
+from opentranscriber.audio import HOP_LENGTH, SAMPLE_RATE
+
+# Frame length plus rounding: how far a detected edge may be from the true one.
+TOLERANCE = 0.1
+
+
+def seconds(regions):
+    return [(start / SAMPLE_RATE, end / SAMPLE_RATE) for start, end in regions]
+
+
+def test_detects_speech_between_silences():
+    audio = np.concatenate([quiet(2), voiced(3), quiet(3, seed=1), voiced(2, 150.0), quiet(2, seed=2)])
+
+    regions = seconds(vad.detect_speech(audio))
+
+    expected = [(2.0 - vad.PADDING, 5.0 + vad.PADDING), (8.0 - vad.PADDING, 10.0 + vad.PADDING)]
+    assert len(regions) == len(expected)
+    for (start, end), (expected_start, expected_end) in zip(regions, expected):
+        assert start == pytest.approx(expected_start, abs=TOLERANCE)
+        assert end == pytest.approx(expected_end, abs=TOLERANCE)
+
+
+def test_short_pauses_are_bridged_and_short_bursts_dropped():
+    audio = np.concatenate(
+        [quiet(2), voiced(2), quiet(0.5, seed=1), voiced(2), quiet(3, seed=2), voiced(0.1), quiet(3, seed=3)]
+    )
+
+    regions = seconds(vad.detect_speech(audio))
+
+    assert len(regions) == 1
+    assert regions[0][0] == pytest.approx(2.0 - vad.PADDING, abs=TOLERANCE)
+    assert regions[0][1] == pytest.approx(6.5 + vad.PADDING, abs=TOLERANCE)
+
+
+def test_silence_and_noise_have_no_speech():
+    rng = np.random.default_rng(0)
+    noise = (0.2 * rng.standard_normal(5 * SAMPLE_RATE)).astype(np.float32)
+
+    assert vad.detect_speech(quiet(5)) == []
+    assert vad.detect_speech(np.concatenate([quiet(2), noise, quiet(2, seed=1)])) == []
+    assert vad.detect_speech(np.zeros(0, dtype=np.float32)) == []
+
+
+def test_speech_only_joins_the_regions():
+    audio = np.concatenate([quiet(2), voiced(3), quiet(3, seed=1), voiced(2, 150.0), quiet(2, seed=2)])
+
+    speech, regions = vad.speech_only(audio)
+
+    assert len(speech) == sum(end - start for start, end in regions)
+    start, end = regions[1]
+    np.testing.assert_array_equal(speech[-(end - start) :], audio[start:end])
+    assert len(vad.speech_only(quiet(3))[0]) == 0
+
+
+REGIONS = [(1 * SAMPLE_RATE, 3 * SAMPLE_RATE), (5 * SAMPLE_RATE, 6 * SAMPLE_RATE)]
+
+
+@pytest.mark.parametrize(
+    "joined, end, original",
+    [
+        (0.0, False, 1.0),
+        (0.5, False, 1.5),
+        (2.0, False, 5.0),  # on the seam: a start goes to the second region...
+        (2.0, True, 3.0),  # ...an end stays in the first
+        (2.5, True, 5.5),
+        (3.0, True, 6.0),
+        (9.0, True, 6.0),  # past the speech: clamped to the last region
+    ],
+)
+def test_to_original_time(joined, end, original):
+    assert vad.to_original_time(joined, REGIONS, end=end) == pytest.approx(original)
+
+
+def test_remap_result_moves_segments_and_words_back():
+    result = {
+        "text": " a b",
+        "language": "en",
+        "segments": [
+            {"id": 0, "seek": 0, "start": 0.5, "end": 2.0, "text": " a", "words": [{"start": 0.5, "end": 1.0}]},
+            {"id": 1, "seek": 0, "start": 2.0, "end": 2.75, "text": " b", "words": [{"start": 2.1, "end": 2.75}]},
+        ],
+    }
+
+    remapped = vad.remap_result(result, REGIONS)
+
+    a, b = remapped["segments"]
+    assert (a["start"], a["end"]) == pytest.approx((1.5, 3.0))
+    assert (b["start"], b["end"]) == pytest.approx((5.0, 5.75))
+    assert b["seek"] == round(3.0 * SAMPLE_RATE / HOP_LENGTH)
+    assert (a["words"][0]["start"], a["words"][0]["end"]) == pytest.approx((1.5, 2.0))
+    assert (b["words"][0]["start"], b["words"][0]["end"]) == pytest.approx((5.1, 5.75))
+    assert remapped["language"] == "en"
+    assert result["segments"][0]["start"] == 0.5  # the input is left alone
+
+
+def test_transcribe_speech_skips_a_silent_input():
+    class Model:
+        def transcribe(self, audio, **options):
+            raise AssertionError("silence must not reach the model")
+
+    assert vad.transcribe_speech(Model(), quiet(3), language="de") == vad.empty_result("de")
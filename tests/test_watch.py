@@ -0,0 +1,259 @@
+import json
+import os
+import time
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+
+import pytest
+
+from opentranscriber import pool, watch
+
+
+class StubExecutor:
+    """
+    Stands in for the worker pool. Jobs finish when the test calls `finish`, or at
+    once with `auto`; `broken` makes the next submits fail the way a pool with a
+    dead worker does.
+    """
+
+    def __init__(self, auto, broken):
+        self.auto = auto
+        self.broken = broken
+        self.jobs = {}  # file path -> future
+        self.shut_down = False
+
+    def submit(self, function, file_path, model_type, formats, output_directory, options):
+        if self.broken:
+            self.broken.pop()
+            raise BrokenProcessPool("A child process terminated abruptly")
+        future = Future()
+        self.jobs[file_path] = future
+        if self.auto:
+            future.set_result(1.0)
+        return future
+
+    def finish(self, file_path, error=None):
+        future = self.jobs[file_path]
+        if error:
+            future.set_exception(error)
+        else:
+            future.set_result(1.0)
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut_down = True
+
+
+@pytest.fixture
+def workers(monkeypatch):
+    """The stub pools the hot folder creates."""
+    state = {"pools": [], "auto": False, "broken": []}
+
+    def worker_pool(model_type, count, dtype="float32"):
+        executor = StubExecutor(state["auto"], state["broken"])
+        state["pools"].append(executor)
+        return executor
+
+    monkeypatch.setattr(pool, "worker_pool", worker_pool)
+    return state
+
+
+@pytest.fixture
+def folder(tmp_path):
+    directory = tmp_path / "inbox"
+    directory.mkdir()
+    return directory
+
+
+def drop(directory, name, content=b"media", age=10.0):
+    """Writes a file last modified `age` seconds ago."""
+    path = directory / name
+    path.write_bytes(content)
+    mtime = time.time() - age
+    os.utime(path, (mtime, mtime))
+    return str(path)
+
+
+def hot_folder(directory, **kwargs):
+    kwargs = {"use_inotify": False, "settle": 2.0, **kwargs}
+    hot = watch.HotFolder(str(directory), "tiny", ["srt"], **kwargs)
+    hot.executor = pool.worker_pool("tiny", 1)
+    return hot
+
+
+def test_index_is_replayed_on_restart(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    media = tmp_path / "a.mp4"
+    media.write_bytes(b"media")
+    stat = os.stat(media)
+    index = watch.ProcessedIndex(path)
+    index.record("d1", "failed", str(media), stat, "bad audio")
+    index.record("d1", "done", str(media), stat)
+    index.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write("{not json\n")
+
+    index = watch.ProcessedIndex(path)
+
+    assert index.statuses == {"d1": "done"}
+    assert index.known_digest(str(media), stat) == "d1"
+    media.write_bytes(b"other media")
+    assert index.known_digest(str(media), os.stat(media)) is None
+    index.close()
+
+
+def test_index_of_mostly_superseded_entries_is_compacted(tmp_path):
+    path = str(tmp_path / "index.jsonl")
+    media = tmp_path / "a.mp4"
+    media.write_bytes(b"media")
+    stat = os.stat(media)
+    index = watch.ProcessedIndex(path)
+    for _ in range(70):
+        index.record("d1", "failed", str(media), stat)
+    index.record("d1", "done", str(media), stat)
+    index.close()
+
+    watch.ProcessedIndex(path).close()
+
+    with open(path, encoding="utf-8") as f:
+        entries = [json.loads(line) for line in f]
+    assert [(entry["digest"], entry["status"]) for entry in entries] == [("d1", "done")]
+
+
+def test_polling_reports_added_and_removed_files(folder):
+    drop(folder, "old.mp4")
+    watcher = watch.DirectoryWatcher(str(folder), use_inotify=False)
+    assert watcher.mode == "polling"
+    assert watcher.list() == {"old.mp4"}
+    (folder / "sub").mkdir()
+
+    assert watcher.changes(0) == ({}, set())
+    drop(folder, "new.mp4")
+    os.remove(folder / "old.mp4")
+
+    assert watcher.changes(0) == ({"new.mp4": True}, {"old.mp4"})
+    assert watcher.changes(0) == ({}, set())
+
+
+def test_arrivals_are_ready_once_unchanged_for_the_settle_time(folder, workers):
+    hot = hot_folder(folder)
+    settled = drop(folder, "settled.mp4")
+    drop(folder, "fresh.mp4", age=0.0)
+    drop(folder, "growing.mp4")
+    hot._arrived({"settled.mp4": True, "fresh.mp4": True, "growing.mp4": True, "notes.txt": True, "a.mp4.part": True})
+    assert set(hot.arrivals) == {"settled.mp4", "fresh.mp4", "growing.mp4"}
+
+    hot._check_arrivals()  # first sight: only records the size and mtime
+    assert not hot.ready
+    drop(folder, "growing.mp4", b"more media")
+    hot._check_arrivals()
+
+    assert [path for path, _ in hot.ready] == [settled]
+    assert set(hot.arrivals) == {"fresh.mp4", "growing.mp4"}
+    hot.index.close()
+
+
+def test_files_not_seen_closed_wait_longer(folder, workers):
+    hot = hot_folder(folder)
+    drop(folder, "open.mp4", age=watch.OPEN_FILE_SETTLE / 2)
+    hot._arrived({"open.mp4": False})
+
+    hot._check_arrivals()
+    hot._check_arrivals()
+    assert not hot.ready
+
+    hot._arrived({"open.mp4": True})  # closed now
+    hot._check_arrivals()
+    assert len(hot.ready) == 1
+    hot.index.close()
+
+
+def test_removed_and_already_processed_arrivals_are_dropped(folder, workers):
+    hot = hot_folder(folder)
+    done = drop(folder, "done.mp4")
+    hot.index.record("d1", "done", done, os.stat(done))
+    hot._arrived({"done.mp4": True, "gone.mp4": True})
+
+    hot._check_arrivals()
+
+    assert not hot.arrivals and not hot.ready
+    hot.index.close()
+
+
+def test_at_most_max_in_flight_files_are_submitted(folder, workers):
+    hot = hot_folder(folder, max_in_flight=2)
+    paths = [drop(folder, f"{i}.mp4", f"media {i}".encode()) for i in range(4)]
+    hot.ready.extend((path, os.stat(path)) for path in paths)
+    executor = workers["pools"][0]
+
+    hot._submit()
+    assert list(executor.jobs) == paths[:2]
+
+    executor.finish(paths[0])
+    assert hot._reap(timeout=0) == 1
+    hot._submit()
+
+    assert list(executor.jobs) == paths[:3]
+    assert hot.processed == 1
+    assert hot.index.statuses[hot.index.digest(paths[0], os.stat(paths[0]))] == "done"
+    hot.index.close()
+
+
+def test_copies_and_processed_content_are_skipped(folder, workers):
+    hot = hot_folder(folder, max_in_flight=5)
+    first = drop(folder, "a.mp4")
+    copy = drop(folder, "copy-of-a.mp4")
+    seen = drop(folder, "b.mp4", b"other media")
+    hot.index.record(hot.index.digest(seen, os.stat(seen)), "failed", "elsewhere.mp4", os.stat(seen))
+    hot.ready.extend((path, os.stat(path)) for path in (first, copy, seen))
+
+    hot._submit()
+
+    assert list(workers["pools"][0].jobs) == [first]
+    hot.index.close()
+
+
+def test_broken_pool_is_replaced_on_submit(folder, workers):
+    hot = hot_folder(folder)
+    path = drop(folder, "a.mp4")
+    hot.ready.append((path, os.stat(path)))
+    workers["broken"].append(True)
+
+    hot._submit()
+
+    assert len(workers["pools"]) == 2
+    assert workers["pools"][0].shut_down
+    assert list(workers["pools"][1].jobs) == [path]
+    assert hot.worker_restarts == 1
+    hot.index.close()
+
+
+def test_file_lost_with_its_worker_is_queued_again_then_failed(folder, workers):
+    hot = hot_folder(folder)
+    path = drop(folder, "a.mp4")
+    hot.ready.append((path, os.stat(path)))
+
+    for attempt in range(2):
+        hot._submit()
+        workers["pools"][-1].finish(path, BrokenProcessPool("A child process terminated abruptly"))
+        workers["broken"].append(True)  # the pool stays broken
+        hot._reap(timeout=0)
+        assert [queued for queued, _ in hot.ready] == ([path] if attempt == 0 else [])
+
+    assert len(workers["pools"]) == 2
+    assert hot.failed == 1
+    assert set(hot.index.statuses.values()) == {"failed"}
+    hot.index.close()
+
+
+def test_run_once_outlives_a_worker_death(folder, workers):
+    workers["auto"] = True
+    workers["broken"].append(True)
+    drop(folder, "a.mp4")
+    drop(folder, "b.mp4", b"other media")
+    hot = watch.HotFolder(str(folder), "tiny", ["srt"], use_inotify=False, settle=0.0, poll_interval=0.01)
+
+    assert hot.run(once=True) == 0
+
+    assert hot.processed == 2
+    assert hot.worker_restarts == 1
+    assert workers["pools"][-1].shut_down